@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de concorrência do servidor HTTP
+
+Dispara N requisições simultâneas contra um endpoint e reporta vazão,
+latência (p50/p95/p99) e erros. Serve para comparar o servidor de
+desenvolvimento com o gunicorn em gthread e gevent.
+
+Exemplo (um terminal por servidor, mesma máquina):
+
+    # 1. Servidor de desenvolvimento (threaded=True)
+    cd src && python run.py
+
+    # 2. gunicorn gthread
+    WEB_CONCURRENCY=4 GUNICORN_THREADS=16 ./run_production.sh
+
+    # 3. gunicorn gevent
+    GUNICORN_WORKER_CLASS=gevent WEB_CONCURRENCY=4 ./run_production.sh
+
+    python benchmarks/bench_concurrency.py --url http://localhost:5000/api/health \\
+        --concurrency 200 --requests 2000
+
+Para simular as chamadas longas ao LLM use um endpoint que aguarde I/O
+(ex.: /api/analyze com GEMINI_MODEL apontando para um mock lento) via
+--method POST --body payload.json. Com o servidor de desenvolvimento a
+latência cresce linearmente com a concorrência; com gthread/gevent ela se
+mantém até o limite de threads/conexões por worker.
+"""
+
+import json
+import time
+import argparse
+import statistics
+import threading
+import urllib.request
+import urllib.error
+import concurrent.futures
+from typing import Optional, Tuple
+
+
+def send(url: str, method: str, body: Optional[bytes], timeout: float) -> Tuple[float, Optional[int], Optional[str]]:
+    request = urllib.request.Request(url, data=body, method=method)
+    if body is not None:
+        request.add_header('Content-Type', 'application/json')
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return time.perf_counter() - start, response.status, None
+    except urllib.error.HTTPError as e:
+        return time.perf_counter() - start, e.code, None
+    except Exception as e:
+        return time.perf_counter() - start, None, type(e).__name__
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de concorrência HTTP')
+    parser.add_argument('--url', default='http://localhost:5000/api/health')
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--body', help='Arquivo JSON enviado como corpo da requisição')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    body = None
+    if args.body:
+        with open(args.body, encoding='utf-8') as f:
+            body = json.dumps(json.load(f)).encode('utf-8')
+
+    latencies = []
+    statuses = {}
+    errors = {}
+    lock = threading.Lock()
+
+    def worker(_):
+        latency, status, error = send(args.url, args.method, body, args.timeout)
+        with lock:
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+            else:
+                latencies.append(latency)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(worker, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    print(f"URL: {args.method} {args.url}")
+    print(f"Concorrência: {args.concurrency} | Requisições: {args.requests} | Tempo total: {elapsed:.2f}s")
+    print(f"Vazão: {args.requests / elapsed:.1f} req/s")
+    if latencies:
+        print(f"Latência p50 {percentile(latencies, 0.50) * 1000:.0f} ms | "
+              f"p95 {percentile(latencies, 0.95) * 1000:.0f} ms | "
+              f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms | "
+              f"média {statistics.mean(latencies) * 1000:.0f} ms")
+    print(f"Status: {statuses}")
+    if errors:
+        print(f"Erros de conexão: {errors}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de tempo de importação (cold start)
+
+Importa os módulos de entrada da aplicação em um processo novo com
+``python -X importtime`` e reporta o tempo cumulativo de cada módulo. Falha
+(código de saída 1) quando:
+
+- o tempo total passa do orçamento (--budget-ms), ou
+- alguma dependência pesada que deveria ser carregada sob demanda
+  (reportlab, pandas, PyPDF2, docx, tiktoken, openai, transformers, ...)
+  é importada no boot.
+
+Uso:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --module routes.analysis --budget-ms 1500 --top 25
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+SRC = os.path.join(ROOT, 'src')
+
+# Dependências que não podem ser importadas no boot
+DEFERRED_MODULES = [
+    'reportlab', 'pandas', 'PyPDF2', 'pypdf', 'docx', 'openpyxl',
+    'tiktoken', 'openai', 'transformers', 'google.generativeai'
+]
+
+
+def measure_imports(module: str) -> List[Tuple[str, int, int]]:
+    """Importa o módulo em um processo novo e retorna (módulo, self_us, cumulativo_us)"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SRC, ROOT, env.get('PYTHONPATH')]))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SRC, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        tail = '\n'.join(result.stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"Falha ao importar {module}:\n{tail}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # "import time:       123 |        456 |   package.module"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            _, values = line.split(':', 1)
+            self_us, cumulative_us, name = values.split('|', 2)
+            entries.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return entries
+
+
+def find_deferred(entries: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Dependências pesadas importadas no boot, com seu tempo cumulativo"""
+    found = {}
+    for name, _, cumulative in entries:
+        for heavy in DEFERRED_MODULES:
+            if name == heavy:
+                found[heavy] = max(found.get(heavy, 0), cumulative)
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark de tempo de importação')
+    parser.add_argument('--module', action='append',
+                        help='Módulo a importar (padrão: run, routes.analysis)')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_TIME_BUDGET_MS', 2000)),
+                        help='Orçamento de tempo total por módulo de entrada')
+    parser.add_argument('--top', type=int, default=20, help='Quantos módulos mais lentos listar')
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.module or ['run', 'routes.analysis']:
+        try:
+            entries = measure_imports(module)
+        except RuntimeError as e:
+            print(f"[ERRO] {e}")
+            failed = True
+            continue
+
+        total_ms = next((cumulative for name, _, cumulative in entries if name == module), 0) / 1000
+        print(f"\n=== import {module}: {total_ms:.1f} ms (orçamento {args.budget_ms:.0f} ms) ===")
+
+        # Apenas pacotes de primeiro nível e os módulos da aplicação
+        top_level = [entry for entry in entries if '.' not in entry[0] or entry[0].startswith(('routes.', 'services.'))]
+        for name, self_us, cumulative_us in sorted(top_level, key=lambda e: e[2], reverse=True)[:args.top]:
+            print(f"{cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {name}")
+
+        deferred = find_deferred(entries)
+        if deferred:
+            failed = True
+            for name, cumulative_us in deferred.items():
+                print(f"[FALHA] {name} importado no boot ({cumulative_us / 1000:.1f} ms); use lazy_import()")
+
+        if total_ms > args.budget_ms:
+            failed = True
+            print(f"[FALHA] {module} excedeu o orçamento: {total_ms:.1f} ms > {args.budget_ms:.0f} ms")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da geração de PDF
+
+Mede tempo e pico de memória (tracemalloc) da renderização de relatórios
+grandes em memória, comparando a folha de estilos reconstruída a cada
+relatório com a folha de estilos em cache e, com --parallel, a
+renderização por seção em um pool de processos. O pico de memória medido é
+o do processo principal.
+
+Uso:
+    python benchmarks/bench_pdf.py --items 200 --runs 5 --parallel
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from routes import pdf_generator  # noqa: E402
+
+
+def build_report(items: int) -> dict:
+    """Relatório sintético com listas de tamanho configurável"""
+    texto = "Texto de exemplo para medir o custo de layout de parágrafos longos no ReportLab. " * 3
+    return {
+        'escopo': {
+            'segmento_principal': 'Benchmark',
+            'produto_ideal': 'Produto de teste',
+            'proposta_valor': texto,
+            'tamanho_mercado': {f'indicador_{i}': f'R$ {i * 1000}' for i in range(20)}
+        },
+        'avatar_ultra_detalhado': {
+            'persona_principal': {f'campo_{i}': texto for i in range(20)}
+        },
+        'mapeamento_dores_ultra_detalhado': {
+            'dores_nivel_1_criticas': [
+                {'dor': f'{i}: {texto}', 'intensidade': 'Alta', 'frequencia': 'Diária'} for i in range(items)
+            ],
+            'dores_nivel_2': [{'dor': texto, 'impacto': 'Médio'} for _ in range(items)],
+            'dores_nivel_3': [{'dor': texto, 'causa_raiz': texto} for _ in range(items)]
+        },
+        'analise_concorrencia_detalhada': {
+            'concorrentes_diretos': [
+                {'nome': f'Concorrente {i}', 'preco_range': 'R$ 997', 'posicionamento': texto} for i in range(items)
+            ],
+            'gaps_oportunidades': [texto for _ in range(items)]
+        },
+        'insights_exclusivos': [f'{i}: {texto}' for i in range(items)],
+        'projecoes_cenarios': {
+            'cenario_realista': {f'metrica_{i}': f'{i}%' for i in range(20)}
+        }
+    }
+
+
+def measure(report: dict, runs: int, cached_styles: bool, parallel: bool = False) -> dict:
+    timings = []
+    peaks = []
+    size = 0
+    for _ in range(runs):
+        if not cached_styles:
+            pdf_generator._styles = None
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        buffer = pdf_generator.generate_enhanced_pdf(report, parallel=parallel)
+        timings.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        size = len(buffer.getvalue())
+
+    return {
+        'median_s': statistics.median(timings),
+        'max_s': max(timings),
+        'peak_mb': max(peaks) / (1024 * 1024),
+        'pdf_kb': size / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da geração de PDF')
+    parser.add_argument('--items', type=int, default=200, help='Itens por lista do relatório')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--parallel', action='store_true', help='Inclui a renderização paralela (requer pypdf)')
+    args = parser.parse_args()
+
+    report = build_report(args.items)
+    pdf_generator.generate_enhanced_pdf(report, parallel=False)  # aquecimento (fontes, imports)
+
+    scenarios = [('estilos reconstruídos', False, False), ('estilos em cache', True, False)]
+    if args.parallel:
+        pdf_generator.generate_enhanced_pdf(report, parallel=True)  # inicia o pool de processos
+        scenarios.append(('paralelo por seção', True, True))
+
+    for label, cached, parallel in scenarios:
+        result = measure(report, args.runs, cached, parallel)
+        print(f"{label:22s} mediana {result['median_s'] * 1000:8.1f} ms | "
+              f"max {result['max_s'] * 1000:8.1f} ms | pico {result['peak_mb']:7.1f} MB | "
+              f"PDF {result['pdf_kb']:.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
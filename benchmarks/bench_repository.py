@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do repositório de análises: PostgREST (Supabase) x Postgres direto
+
+Executa as consultas mais frequentes das rotas (/api/analyses,
+/api/analyses/<id>, /api/segmentos) nos dois backends e reporta a latência
+(p50/p95) e a vazão de cada uma. Requer SUPABASE_URL,
+SUPABASE_SERVICE_ROLE_KEY e DATABASE_URL (use a porta 5432; com o PgBouncer
+em modo transação rode com DB_PGBOUNCER_TRANSACTION_MODE=true).
+
+Apenas leituras: as gravações passam pela fila de persistência e alterariam
+a tabela de produção.
+
+Uso:
+    python benchmarks/bench_repository.py --iterations 200 --concurrency 8
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import concurrent.futures
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from dotenv import load_dotenv  # noqa: E402
+from supabase import create_client  # noqa: E402
+
+from services.analysis_records import resolve_analysis_columns  # noqa: E402
+from services.analysis_repository import PostgresAnalysisRepository, SupabaseAnalysisRepository  # noqa: E402
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run(operation: Callable[[], object], iterations: int, concurrency: int) -> Dict:
+    operation()  # Aquecimento (conexão, PREPARE)
+
+    def timed(_):
+        start = time.perf_counter()
+        operation()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, range(iterations)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'rps': iterations / elapsed
+    }
+
+
+def main() -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Benchmark PostgREST x Postgres direto')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+    database_url = os.getenv('DATABASE_URL')
+    if not (supabase_url and supabase_key and database_url):
+        print("[ERRO] Defina SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY e DATABASE_URL")
+        return 1
+
+    repositories = {
+        'supabase': SupabaseAnalysisRepository(create_client(supabase_url, supabase_key)),
+        'postgres': PostgresAnalysisRepository(database_url, pool_size=args.concurrency)
+    }
+
+    summary_columns = resolve_analysis_columns('summary')
+    sample = repositories['postgres'].list_page(summary_columns, 1)
+    if not sample:
+        print("[ERRO] Tabela analyses vazia")
+        return 1
+    analysis_uid = sample[0]['analysis_uid']
+
+    operations = {
+        'list_page (summary, 20)': lambda repo: repo.list_page(summary_columns, 21),
+        'get (analysis_uid, *)': lambda repo: repo.get(analysis_uid),
+        'list_segmentos': lambda repo: repo.list_segmentos('', 200)
+    }
+
+    print(f"{'consulta':28} {'backend':9} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>9}")
+    for name, operation in operations.items():
+        for backend, repository in repositories.items():
+            result = run(lambda: operation(repository), args.iterations, args.concurrency)
+            print(f"{name:28} {backend:9} {result['p50_ms']:9.1f} {result['p95_ms']:9.1f} {result['rps']:9.1f}")
+
+    print(f"\nPostgres: {repositories['postgres'].get_stats()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
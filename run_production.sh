@@ -0,0 +1,29 @@
+#!/usr/bin/env bash
+# ARQV30 Enhanced v2.0 - Servidor de produção (gunicorn)
+#
+# Uso:
+#   ./run_production.sh                               # gthread, 16 threads por worker
+#   GUNICORN_WORKER_CLASS=gevent ./run_production.sh  # gevent (requer o pacote gevent)
+#   WEB_CONCURRENCY=8 GUNICORN_THREADS=32 ./run_production.sh
+
+set -euo pipefail
+
+cd "$(dirname "$0")"
+
+if [ ! -d "src" ]; then
+    echo "ERRO: Diretorio 'src' nao encontrado!"
+    exit 1
+fi
+
+if [ -f ".env" ]; then
+    set -a
+    # shellcheck disable=SC1091
+    . ./.env
+    set +a
+fi
+
+export PYTHONPATH="$(pwd)${PYTHONPATH:+:$PYTHONPATH}"
+export FLASK_ENV="${FLASK_ENV:-production}"
+
+cd src
+exec gunicorn -c gunicorn.conf.py wsgi:app
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced - Variante ASGI da API de análise
+
+Expõe /api/analyze, /api/upload_attachment e /api/analyses sobre Starlette.
+A chamada ao Gemini é assíncrona (generate_content_async), então milhares de
+análises em andamento ocupam apenas alguns processos; as chamadas bloqueantes
+restantes (Supabase, pesquisa, extração de anexos) rodam em threads via
+asyncio.to_thread. Os serviços e a persistência são os mesmos do app Flask.
+
+    uvicorn asgi:app --workers 4 --port 5000
+"""
+
+import os
+import uuid
+import asyncio
+import logging
+import concurrent.futures
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from werkzeug.datastructures import FileStorage
+
+load_dotenv()
+
+from routes import analysis as analysis_api  # noqa: E402
+from services.analysis_records import normalize_analysis_input  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+async def analyze_market(request: Request) -> JSONResponse:
+    """Análise ultra-detalhada de mercado (mesmo pipeline de /api/analyze do Flask)"""
+    try:
+        data = await request.json()
+
+        # Aceitar tanto 'segmento' quanto 'nicho' para compatibilidade
+        if not (data.get('segmento') or data.get('nicho')):
+            return JSONResponse({'error': 'Segmento é obrigatório'}, status_code=400)
+
+        analysis_data = normalize_analysis_input(data)
+        logger.info(f"Iniciando analise assincrona para segmento: {analysis_data['segmento']}")
+
+        search_context, websailor_used = await asyncio.to_thread(analysis_api.build_search_context, analysis_data)
+        attachments_context = await asyncio.to_thread(
+            analysis_api.attachment_service.get_session_attachments_content,
+            analysis_data['session_id'], analysis_api.build_attachment_query(analysis_data)
+        )
+
+        similar_matches, duplicate_result = await asyncio.to_thread(
+            analysis_api.find_similar_analyses, data, analysis_data, search_context, attachments_context
+        )
+        if duplicate_result:
+            return JSONResponse(duplicate_result)
+
+        analysis_id = analysis_api.save_initial_analysis(analysis_data)
+
+        if analysis_api.gemini_client:
+            analysis_result = await analysis_api.gemini_client.generate_ultra_detailed_analysis_async(
+                analysis_data,
+                search_context=search_context,
+                attachments_context=attachments_context,
+                reference_context=analysis_api.similar_analysis_service.build_reference_context(similar_matches)
+            )
+        else:
+            analysis_result = analysis_api.create_fallback_analysis(analysis_data)
+
+        analysis_api.finalize_analysis_result(
+            analysis_result, analysis_data, analysis_id,
+            search_context, websailor_used, attachments_context, similar_matches
+        )
+        return JSONResponse(analysis_result)
+
+    except Exception as e:
+        logger.error(f"Erro na analise: {e}")
+        return JSONResponse({'error': 'Erro interno do servidor', 'details': str(e)}, status_code=500)
+
+
+async def upload_attachment(request: Request) -> JSONResponse:
+    """Upload e processamento de anexos para análise"""
+    try:
+        form = await request.form()
+        upload = form.get('file')
+        session_id = form.get('session_id') or str(uuid.uuid4())
+
+        if upload is None or isinstance(upload, str):
+            return JSONResponse({'error': 'Nenhum arquivo enviado'}, status_code=400)
+        if not upload.filename:
+            return JSONResponse({'error': 'Nenhum arquivo selecionado'}, status_code=400)
+
+        # O AttachmentService trabalha com FileStorage (werkzeug)
+        file = FileStorage(stream=upload.file, filename=upload.filename, content_type=upload.content_type)
+        result = await asyncio.to_thread(analysis_api.attachment_service.process_attachment, file, session_id)
+
+        if not result['success']:
+            return JSONResponse({'error': result['error']}, status_code=400)
+
+        return JSONResponse({
+            'status': 'success',
+            'message': f"Anexo '{upload.filename}' processado com sucesso.",
+            'session_id': session_id,
+            'attachment_id': result['attachment_id']
+        })
+
+    except Exception as e:
+        logger.error(f"Erro no upload de anexo: {e}")
+        return JSONResponse({'error': f'Erro no upload: {str(e)}'}, status_code=500)
+
+
+async def get_analyses(request: Request) -> JSONResponse:
+    """Lista de análises recentes (mesmos parâmetros de /api/analyses do Flask)"""
+    try:
+        if not analysis_api.analysis_repository:
+            return JSONResponse({'error': 'Banco de dados não configurado'}, status_code=500)
+
+        params = request.query_params
+        try:
+            limit = int(params.get('limit', 10))
+        except ValueError:
+            limit = 10
+
+        try:
+            page = await asyncio.to_thread(
+                analysis_api.list_analyses,
+                fields=params.get('fields'),
+                limit=limit,
+                cursor=params.get('cursor'),
+                segmento=params.get('segmento') or params.get('nicho')
+            )
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+
+        return JSONResponse(page)
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar análises: {e}")
+        return JSONResponse({'error': 'Erro interno do servidor'}, status_code=500)
+
+
+async def health_check(request: Request) -> JSONResponse:
+    return JSONResponse({'status': 'healthy', 'server': 'asgi'})
+
+
+def on_startup():
+    # asyncio.to_thread usa o executor padrão (min(32, cpus + 4) threads);
+    # ampliado para não enfileirar as chamadas bloqueantes ao Supabase
+    asyncio.get_running_loop().set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(
+            max_workers=int(os.getenv('ASGI_THREADPOOL_SIZE', 64)),
+            thread_name_prefix='asgi-blocking'
+        )
+    )
+
+
+def on_shutdown():
+    if analysis_api.persistence_queue:
+        analysis_api.persistence_queue.flush()
+
+
+cors_origins = os.getenv('CORS_ORIGINS', '*')
+
+app = Starlette(
+    routes=[
+        Route('/api/analyze', analyze_market, methods=['POST']),
+        Route('/api/upload_attachment', upload_attachment, methods=['POST']),
+        Route('/api/analyses', get_analyses, methods=['GET']),
+        Route('/api/health', health_check, methods=['GET'])
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=cors_origins.split(','), allow_methods=['*'], allow_headers=['*']),
+        Middleware(GZipMiddleware, minimum_size=int(os.getenv('COMPRESSION_MIN_SIZE', 1024)))
+    ],
+    on_startup=[on_startup],
+    on_shutdown=[on_shutdown]
+)
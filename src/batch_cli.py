@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced - Reanálise em lote (CLI)
+
+Processa um CSV/JSONL de entradas do formulário pelo mesmo pipeline de
+análise, sem os limites de tamanho e timeout do /api/analyze_batch.
+
+Uso:
+    python batch_cli.py entradas.csv -o resultados.jsonl --workers 4
+    python batch_cli.py entradas.jsonl -o resultados.jsonl --parquet resultados.parquet --supabase
+
+Os itens concluídos são registrados em um arquivo de checkpoint; ao rodar de
+novo com o mesmo checkpoint, os itens já processados são pulados. O
+analysis_uid de cada item é derivado da sua chave, então reprocessar um item
+(após uma interrupção) gera o mesmo registro, e o JSONL guarda no máximo um
+resultado e uma falha por chave.
+"""
+
+import os
+import sys
+import csv
+import json
+import uuid
+import hashlib
+import logging
+import argparse
+import threading
+import concurrent.futures
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional, Set
+
+from dotenv import load_dotenv
+
+from services.analysis_records import build_completed_record
+
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stderr)]
+)
+
+logger = logging.getLogger('batch_cli')
+
+
+def item_key(item: Dict) -> str:
+    """Chave estável de um item de entrada (usada no checkpoint)"""
+    if item.get('analysis_uid'):
+        return str(item['analysis_uid'])
+    canonical = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def item_analysis_uid(item: Dict, key: str) -> str:
+    """analysis_uid do item: o informado na entrada ou um UUID derivado da chave"""
+    return str(item.get('analysis_uid') or uuid.uuid5(uuid.NAMESPACE_URL, f'arqv30-batch:{key}'))
+
+
+def read_items(path: str) -> Iterator[Dict]:
+    """Lê as entradas de um CSV ou JSONL em streaming"""
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                yield {key: value for key, value in row.items() if key and value not in (None, '')}
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"Linha {line_number} ignorada (JSON inválido): {e}")
+
+
+class Checkpoint:
+    """Arquivo append-only com as chaves dos itens concluídos"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[str] = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def mark_done(self, key: str):
+        with self._lock:
+            self._file.write(key + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.done.add(key)
+
+    def close(self):
+        self._file.close()
+
+
+def record_kind(record: Dict) -> str:
+    return 'error' if 'error' in record else 'result'
+
+
+class JsonlWriter:
+    """
+    Escrita thread-safe de resultados em JSONL (modo append)
+
+    Guarda no máximo um registro de cada tipo (resultado, falha) por chave:
+    as chaves já presentes no arquivo são lidas na abertura, e uma nova
+    execução não repete o resultado de um item gravado antes do checkpoint
+    nem acumula falhas do mesmo item.
+    """
+
+    def __init__(self, path: str):
+        self.written: Set[tuple] = set()
+        if os.path.exists(path):
+            for record in read_records(path):
+                self.written.add((record.get('key'), record_kind(record)))
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict) -> bool:
+        """Grava o registro; False se a chave já tinha um registro do mesmo tipo"""
+        entry = (record['key'], record_kind(record))
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            if entry in self.written:
+                return False
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.written.add(entry)
+            return True
+
+    def close(self):
+        self._file.close()
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """Registros de um JSONL de resultados (linhas truncadas por uma interrupção são ignoradas)"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def create_persistence_queue():
+    """Fila de gravação no Supabase (None se não configurado)"""
+    from supabase import create_client
+    from services.persistence_queue import PersistenceQueue
+
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+    if not url or not key:
+        logger.warning("Supabase não configurado, resultados não serão gravados no banco")
+        return None
+    return PersistenceQueue(create_client(url, key))
+
+
+def analyze_item(pipeline, item: Dict, key: str) -> Dict:
+    """
+    Executa a análise de um item pelo pipeline da aplicação e devolve o registro de saída
+
+    force_new evita que o item receba a análise armazenada de outro item
+    quase idêntico. Um relatório de fallback (Gemini indisponível ou
+    resposta inválida) conta como falha, para ser refeito na próxima execução.
+    """
+    item = dict(item, force_new=True, analysis_uid=item_analysis_uid(item, key))
+    analysis_data, report = pipeline(item, persist=False)
+
+    if (report.get('metadata') or {}).get('status') == 'fallback_analysis':
+        raise RuntimeError("Análise de fallback gerada (Gemini indisponível ou resposta inválida)")
+
+    return {
+        'key': key,
+        'analysis_uid': analysis_data['analysis_uid'],
+        'analysis_data': analysis_data,
+        'report': report,
+        'processed_at': datetime.now(timezone.utc).isoformat()
+    }
+
+
+def write_parquet(jsonl_path: str, parquet_path: str):
+    """Converte o JSONL de resultados em Parquet (requer pandas + pyarrow)"""
+    try:
+        import pandas as pd
+    except ImportError:
+        logger.error("pandas não instalado, exportação Parquet ignorada")
+        return
+
+    # Um resultado por chave (o último, se houver mais de um em arquivos antigos)
+    latest: Dict[str, Dict] = {}
+    for record in read_records(jsonl_path):
+        if 'error' not in record:
+            latest[record['key']] = record
+
+    rows = []
+    for record in latest.values():
+        analysis_data = record['analysis_data']
+        rows.append({
+            'analysis_uid': record['analysis_uid'],
+            'nicho': analysis_data.get('segmento'),
+            'produto': analysis_data.get('produto'),
+            'publico': analysis_data.get('publico'),
+            'preco': analysis_data.get('preco_float'),
+            'processed_at': record['processed_at'],
+            'analysis_data': json.dumps(analysis_data, ensure_ascii=False, default=str),
+            'report': json.dumps(record['report'], ensure_ascii=False, default=str)
+        })
+
+    pd.DataFrame(rows).to_parquet(parquet_path, index=False)
+    logger.info(f"{len(rows)} resultados exportados para {parquet_path}")
+
+
+def run(args) -> int:
+    # Mesmo pipeline do /api/analyze (pesquisa, WebSailor, anexos, análises semelhantes)
+    from routes import analysis as analysis_routes
+
+    if not analysis_routes.gemini_client:
+        logger.error("Gemini não configurado (GEMINI_API_KEY)")
+        return 1
+    persistence_queue = create_persistence_queue() if args.supabase else None
+
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint")
+    writer = JsonlWriter(args.output)
+    stats = {'processed': 0, 'skipped': 0, 'failed': 0}
+
+    def handle(future, key: str, item: Dict):
+        try:
+            record = future.result()
+        except Exception as e:
+            stats['failed'] += 1
+            logger.error(f"Falha no item {key[:12]}: {e}")
+            writer.write({'key': key, 'input': item, 'error': str(e),
+                          'processed_at': datetime.now(timezone.utc).isoformat()})
+            return
+
+        if not writer.write(record):
+            logger.info(f"Item {key[:12]} já estava no resultado (interrupção antes do checkpoint)")
+        if persistence_queue:
+            persistence_queue.enqueue(build_completed_record(record['analysis_data'], record['report']))
+            # PDF da versão anterior do item, se já tinha sido gerado
+            analysis_routes.pdf_artifacts.invalidate(record['analysis_uid'])
+        checkpoint.mark_done(key)
+        stats['processed'] += 1
+        logger.info(f"Item {key[:12]} concluído ({stats['processed']} processados)")
+
+    # Janela limitada de itens em andamento: a entrada é lida em streaming
+    max_in_flight = args.workers * 2
+    in_flight: Dict[concurrent.futures.Future, tuple] = {}
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
+            for item in read_items(args.input):
+                key = item_key(item)
+                if key in checkpoint.done:
+                    stats['skipped'] += 1
+                    continue
+                if args.limit and stats['processed'] + stats['failed'] + len(in_flight) >= args.limit:
+                    break
+
+                in_flight[executor.submit(analyze_item, analysis_routes.run_analysis_pipeline, item, key)] = (key, item)
+
+                if len(in_flight) >= max_in_flight:
+                    done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        handle(future, *in_flight.pop(future))
+
+            for future in concurrent.futures.as_completed(list(in_flight)):
+                handle(future, *in_flight.pop(future))
+    finally:
+        writer.close()
+        checkpoint.close()
+        if persistence_queue and not persistence_queue.flush(timeout=60):
+            logger.warning("Nem todos os registros foram gravados no Supabase")
+
+    if args.parquet:
+        write_parquet(args.output, args.parquet)
+
+    logger.info(f"Concluído: {stats['processed']} processados, {stats['skipped']} já no checkpoint, "
+                f"{stats['failed']} com falha")
+    return 1 if stats['failed'] else 0
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description='Reanálise em lote de entradas do formulário')
+    parser.add_argument('input', help='Arquivo CSV ou JSONL com as entradas')
+    parser.add_argument('-o', '--output', required=True, help='Arquivo JSONL de resultados (append)')
+    parser.add_argument('--parquet', help='Exporta também os resultados para este arquivo Parquet')
+    parser.add_argument('--checkpoint', help='Arquivo de checkpoint (padrão: <output>.checkpoint)')
+    parser.add_argument('-w', '--workers', type=int, default=int(os.getenv('BATCH_WORKERS', 4)),
+                        help='Número de análises simultâneas')
+    parser.add_argument('--limit', type=int, default=0, help='Processa no máximo N itens novos')
+    parser.add_argument('--supabase', action='store_true', help='Grava os resultados também no Supabase')
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error('--workers deve ser >= 1')
+
+    try:
+        return run(args)
+    except KeyboardInterrupt:
+        logger.warning("Interrompido; execute novamente para continuar do checkpoint")
+        return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import os
+import gzip
+import logging
+import threading
+from typing import Dict, Optional
+
+from flask import request
+
+from services.lazy_imports import optional_import
+
+logger = logging.getLogger(__name__)
+
+brotli = optional_import('brotli')
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'image/svg+xml',
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/csv'
+}
+
+
+class ResponseCompressor:
+    """
+    Compressão gzip/brotli das respostas, negociada pelo Accept-Encoding
+
+    Só comprime respostas acima de COMPRESSION_MIN_SIZE bytes e de tipos
+    textuais (JSON, HTML, CSS, JS). Arquivos servidos com send_file (PDFs,
+    estáticos) e respostas em streaming passam direto. Brotli é preferido
+    quando o pacote está instalado e o cliente aceita 'br'.
+    """
+
+    def __init__(self, app=None, min_size: Optional[int] = None,
+                 gzip_level: Optional[int] = None, brotli_quality: Optional[int] = None):
+        self.min_size = min_size or int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+        self.gzip_level = gzip_level or int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+        # Qualidade 11 (padrão do brotli) é lenta demais para respostas dinâmicas
+        self.brotli_quality = brotli_quality or int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+        self.enabled = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+        self._lock = threading.Lock()
+        self._stats = {'compressed': 0, 'bytes_in': 0, 'bytes_out': 0, 'gzip': 0, 'br': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+        app.extensions['response_compressor'] = self
+
+    def _choose_encoding(self) -> Optional[str]:
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def compress_response(self, response):
+        if not self.enabled or response.direct_passthrough or response.is_streamed:
+            return response
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+        if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self._choose_encoding()
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=self.gzip_level)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+
+        # A representação comprimida não é idêntica byte a byte: ETag fraco
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        with self._lock:
+            self._stats['compressed'] += 1
+            self._stats[encoding] += 1
+            self._stats['bytes_in'] += len(data)
+            self._stats['bytes_out'] += len(compressed)
+        return response
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None
+        stats['brotli_available'] = brotli is not None
+        stats['min_size'] = self.min_size
+        return stats
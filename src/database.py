@@ -1,3 +1,154 @@
+import os
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
 from flask_sqlalchemy import SQLAlchemy
+
+logger = logging.getLogger(__name__)
+
 db = SQLAlchemy()
 
+
+class DatabaseWarmup:
+    """
+    Aquecimento do pool de conexões em segundo plano
+
+    O engine é criado sem conectar; uma thread abre pool_size conexões
+    (pré-preenchendo o pool) e marca o banco como pronto. Até lá o worker já
+    atende requisições, e /ready informa que o banco ainda não está
+    disponível. Falhas são repetidas com backoff.
+
+    Processos criados por fork depois do start (workers do gunicorn com
+    preload, qualquer que seja o módulo da aplicação) descartam as conexões
+    herdadas e aquecem o próprio pool, via os.register_at_fork.
+    """
+
+    NOT_CONFIGURED = 'not_configured'
+    WARMING = 'warming'
+    READY = 'ready'
+    ERROR = 'error'
+
+    def __init__(self):
+        self.state = self.NOT_CONFIGURED
+        self.last_error: Optional[str] = None
+        self.ready_at: Optional[str] = None
+        self.connections_opened = 0
+        self.attempts = 0
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._fork_hook_registered = False
+        self._lock = threading.Lock()
+
+    def start(self, app):
+        """Inicia o aquecimento (uma vez por processo)"""
+        with self._lock:
+            self._app = app
+            if not self._fork_hook_registered and hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self.after_fork)
+                self._fork_hook_registered = True
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self.state = self.WARMING
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='db-warmup', daemon=True)
+            self._thread.start()
+
+    def after_fork(self):
+        """
+        Executado no processo filho após o fork: descarta as conexões
+        herdadas do pai sem fechá-las e aquece um pool próprio
+        """
+        # O lock pode ter sido copiado travado por outra thread do pai
+        self._lock = threading.Lock()
+        if self._app is None:
+            return
+        with self._app.app_context():
+            db.engine.dispose(close=False)
+        self.connections_opened = 0
+        self.start(self._app)
+
+    def _run(self):
+        max_backoff = float(os.getenv('DB_WARMUP_MAX_BACKOFF', 30))
+        attempt = 0
+        while True:
+            attempt += 1
+            self.attempts = attempt
+            try:
+                self._fill_pool()
+                self.state = self.READY
+                self.last_error = None
+                self.ready_at = datetime.now(timezone.utc).isoformat()
+                logger.info(f"[OK] Pool do banco aquecido com {self.connections_opened} conexoes")
+                return
+            except Exception as e:
+                self.state = self.ERROR
+                self.last_error = str(e)[:200]
+                wait = random.uniform(0, min(max_backoff, 2 ** attempt))
+                logger.warning(f"[WARN] Banco indisponivel (tentativa {attempt}): {self.last_error}; "
+                               f"nova tentativa em {wait:.1f}s")
+                time.sleep(wait)
+
+    def _fill_pool(self):
+        from sqlalchemy import text
+
+        with self._app.app_context():
+            engine = db.engine
+            size = engine.pool.size() if hasattr(engine.pool, 'size') else 1
+
+            # Abrir as conexões ao mesmo tempo força o pool a criar 'size' conexões;
+            # ao fechar, elas voltam para o pool prontas para uso
+            connections = []
+            try:
+                for _ in range(max(1, size)):
+                    connection = engine.connect()
+                    connections.append(connection)
+                    connection.execute(text('SELECT 1'))
+                self.connections_opened = len(connections)
+            finally:
+                for connection in connections:
+                    connection.close()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == self.READY
+
+    def get_status(self) -> Dict:
+        return {
+            'state': self.state,
+            'ready_at': self.ready_at,
+            'attempts': self.attempts,
+            'connections_opened': self.connections_opened,
+            'last_error': self.last_error
+        }
+
+
+db_warmup = DatabaseWarmup()
+
+
+def init_database(app, database_url: str) -> Dict:
+    """
+    Configura o SQLAlchemy da aplicação e inicia o aquecimento do pool
+
+    O pool de cada worker é dimensionado pelo orçamento de conexões (ver
+    db_pool.py). O engine é criado sem conectar: o worker aceita requisições
+    imediatamente e /ready responde 503 até o pool estar aquecido. Usado pelos
+    dois apps (run.create_app, servido por wsgi:app, e main.py).
+    """
+    from db_pool import build_engine_options, compute_pool_settings, pool_metrics
+
+    pool_settings = compute_pool_settings()
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(pool_settings)
+    app.config['DB_POOL_SETTINGS'] = pool_settings
+
+    db.init_app(app)
+    with app.app_context():
+        pool_metrics.attach(db.engine)
+    db_warmup.start(app)
+    return pool_settings
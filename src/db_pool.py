@@ -0,0 +1,212 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+def compute_pool_settings() -> Dict:
+    """
+    Dimensiona o pool de cada worker a partir do orçamento global de conexões
+
+    O Postgres do Supabase aceita um número fixo de conexões para todos os
+    processos (DB_CONNECTION_BUDGET, descontadas DB_RESERVED_CONNECTIONS para
+    migrações, painel e jobs). Cada worker do gunicorn recebe sua fatia, e não
+    precisa de mais conexões do que threads. Metade fica persistente no pool
+    e o restante é overflow para picos.
+
+    Com DB_PGBOUNCER_TRANSACTION_MODE=true o pooling é feito pelo PgBouncer
+    (porta 6543 do Supabase): usamos NullPool e cada checkout abre uma conexão
+    barata com o PgBouncer.
+
+    Com ANALYSIS_REPOSITORY=postgres o repositório de análises mantém um
+    segundo pool (psycopg2) no mesmo banco: ele sai da fatia do worker
+    (ANALYSIS_REPOSITORY_POOL_SIZE, padrão metade da fatia, até 4) e o
+    SQLAlchemy fica com o restante.
+    """
+    workers = max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+    # Requisições simultâneas por worker (threads do gthread ou greenlets do gevent)
+    threads = max(1, int(os.getenv('DB_WORKER_CONCURRENCY') or os.getenv('GUNICORN_THREADS', 1)))
+    budget = int(os.getenv('DB_CONNECTION_BUDGET', 60))
+    reserved = int(os.getenv('DB_RESERVED_CONNECTIONS', 10))
+    pgbouncer = os.getenv('DB_PGBOUNCER_TRANSACTION_MODE', 'false').lower() == 'true'
+
+    per_worker = max(1, (budget - reserved) // workers)
+
+    repository_pool = 0
+    if os.getenv('ANALYSIS_REPOSITORY', 'supabase').lower() == 'postgres' and os.getenv('DATABASE_URL'):
+        repository_pool = int(os.getenv('ANALYSIS_REPOSITORY_POOL_SIZE', 0)) or min(4, per_worker // 2)
+        # Pelo menos uma conexão para cada pool
+        repository_pool = max(1, min(repository_pool, per_worker - 1))
+    sqlalchemy_slice = max(1, per_worker - repository_pool)
+    limit = min(sqlalchemy_slice, threads)
+
+    pool_size = int(os.getenv('DB_POOL_SIZE', 0)) or max(1, math.ceil(limit / 2))
+    max_overflow = int(os.getenv('DB_MAX_OVERFLOW', -1))
+    if max_overflow < 0:
+        max_overflow = max(0, limit - pool_size)
+
+    if pool_size + max_overflow > sqlalchemy_slice:
+        logger.warning(f"Pool configurado ({pool_size}+{max_overflow}) excede a fatia de {sqlalchemy_slice} "
+                       f"conexoes por worker; limitando ao orcamento")
+        pool_size = min(pool_size, sqlalchemy_slice)
+        max_overflow = sqlalchemy_slice - pool_size
+
+    return {
+        'pgbouncer_transaction_mode': pgbouncer,
+        'workers': workers,
+        'threads': threads,
+        'connection_budget': budget,
+        'reserved_connections': reserved,
+        'per_worker_connections': per_worker,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'analysis_repository_pool_size': repository_pool
+    }
+
+
+class PoolMetrics:
+    """Métricas do pool de conexões (tempo de espera no checkout, uso, overflow)"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=window)
+        self.checkouts = 0
+        self.checkins = 0
+        self.connections_created = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.overflow_checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.peak_in_use = 0
+        self.peak_overflow = 0
+        self._engine = None
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self._waits.append(seconds)
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def attach(self, engine):
+        """Registra os listeners de eventos no pool do engine"""
+        self._engine = engine
+
+        @event.listens_for(engine, 'connect')
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connections_created += 1
+
+        @event.listens_for(engine, 'checkout')
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            pool = engine.pool
+            in_use = pool.checkedout() if hasattr(pool, 'checkedout') else 0
+            overflow = max(0, pool.overflow()) if hasattr(pool, 'overflow') else 0
+            with self._lock:
+                self.checkouts += 1
+                self.peak_in_use = max(self.peak_in_use, in_use)
+                if overflow > 0:
+                    self.overflow_checkouts += 1
+                    self.peak_overflow = max(self.peak_overflow, overflow)
+
+        @event.listens_for(engine, 'checkin')
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checkins += 1
+
+        @event.listens_for(engine, 'invalidate')
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'connections_created': self.connections_created,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'overflow_checkouts': self.overflow_checkouts,
+                'peak_in_use': self.peak_in_use,
+                'peak_overflow': self.peak_overflow,
+                'wait_ms': {
+                    'avg': round(self.total_wait / len(waits) * 1000, 2) if waits else 0.0,
+                    'p50': round(waits[len(waits) // 2] * 1000, 2) if waits else 0.0,
+                    'p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0.0,
+                    'max': round(self.max_wait * 1000, 2)
+                }
+            }
+
+        # engine.pool muda após dispose() (ex.: pós-fork); os listeners acompanham
+        if self._engine is not None:
+            pool = self._engine.pool
+            stats['pool'] = {
+                'class': type(pool).__name__,
+                'size': pool.size() if hasattr(pool, 'size') else None,
+                'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+                'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+                'status': pool.status()
+            }
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede o tempo de espera por uma conexão livre"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception as e:
+            # TimeoutError do pool: requisições enfileiradas além de pool_timeout
+            if type(e).__name__ == 'TimeoutError':
+                pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+def build_engine_options(settings: Optional[Dict] = None) -> Dict:
+    """SQLALCHEMY_ENGINE_OPTIONS dimensionado para este worker"""
+    settings = settings or compute_pool_settings()
+    connect_args = {
+        'sslmode': 'require',
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 10)),
+        'application_name': 'ARQV2_Gemini_App',
+        'keepalives_idle': 600,
+        'keepalives_interval': 30,
+        'keepalives_count': 3
+    }
+
+    if settings['pgbouncer_transaction_mode']:
+        # O PgBouncer já valida e reaproveita as conexões com o Postgres
+        return {
+            'poolclass': NullPool,
+            'connect_args': connect_args
+        }
+
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 300)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'pool_size': settings['pool_size'],
+        'max_overflow': settings['max_overflow'],
+        'connect_args': connect_args
+    }
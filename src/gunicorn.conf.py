@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Configuração do gunicorn para o ARQV30 Enhanced
+
+As requisições de análise passam a maior parte do tempo esperando o Gemini,
+a busca profunda e o Supabase (I/O), então cada worker atende muitas
+requisições em paralelo:
+
+- gthread (padrão): WEB_CONCURRENCY processos x GUNICORN_THREADS threads
+- gevent: WEB_CONCURRENCY processos x GUNICORN_WORKER_CONNECTIONS greenlets
+
+Variáveis: PORT, WEB_CONCURRENCY, GUNICORN_WORKER_CLASS, GUNICORN_THREADS,
+GUNICORN_WORKER_CONNECTIONS, GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT,
+GUNICORN_KEEPALIVE, GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER,
+GUNICORN_PRELOAD, GUNICORN_LOG_LEVEL.
+"""
+
+import os
+import sys
+import multiprocessing
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # O patch precisa acontecer antes do preload importar requests/ssl/supabase
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Processos: limitados pela CPU (parse de JSON, PDFs), não pelo I/O
+workers = int(os.getenv('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count() * 2)))
+
+# Concorrência de I/O dentro de cada processo
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Exportados para o dimensionamento do pool do banco de cada worker
+# (db_pool.compute_pool_settings, aplicado por database.init_database)
+os.environ.setdefault('WEB_CONCURRENCY', str(workers))
+os.environ.setdefault('DB_WORKER_CONCURRENCY', str(threads if worker_class == 'gthread' else worker_connections))
+
+# Uma análise completa (pesquisa + Gemini com retries) pode levar minutos
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 60))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Reciclagem de workers contra crescimento de memória; o jitter evita
+# que todos reiniciem ao mesmo tempo
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Carrega create_app() (wsgi:app) uma vez no master; os workers herdam via
+# fork. Threads e pools (fila de persistência, pool de PDFs, conexões do
+# repositório Postgres) são iniciados sob demanda em cada worker; o
+# aquecimento do banco (database.init_database) se refaz no fork
+# (os.register_at_fork).
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    server.log.info(
+        f"ARQV30 pronto: {workers} workers {worker_class} "
+        f"({threads if worker_class == 'gthread' else worker_connections} conexões por worker)"
+    )
+
+
+def worker_exit(server, worker):
+    # Grava as análises pendentes da fila write-behind antes de o worker sair
+    analysis_routes = sys.modules.get('routes.analysis')
+    queue = getattr(analysis_routes, 'persistence_queue', None)
+    if queue is not None and not queue.flush(timeout=graceful_timeout / 2):
+        server.log.warning(f"Worker {worker.pid} saiu com registros pendentes na fila de persistência")
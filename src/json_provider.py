@@ -0,0 +1,63 @@
+import logging
+
+from flask.json.provider import DefaultJSONProvider
+
+from services.lazy_imports import optional_import
+
+logger = logging.getLogger(__name__)
+
+orjson = optional_import('orjson')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Provedor JSON do Flask baseado em orjson (com fallback para o json da stdlib)
+
+    As análises completas (com deep_search_results e contextos brutos) passam
+    de centenas de KB; o orjson serializa direto para bytes em uma fração do
+    tempo do encoder da stdlib. Datas continuam no formato HTTP do Flask
+    (passthrough para o default do provedor padrão) e a saída é UTF-8 sem
+    escapes \\uXXXX. Sem orjson instalado, ou com opções específicas da stdlib
+    (indent, cls...), o comportamento é o do DefaultJSONProvider.
+    """
+
+    def _options(self, pretty: bool = False) -> int:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _dump_bytes(self, obj, pretty: bool = False) -> bytes:
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options(pretty))
+        except TypeError:
+            # Inteiros acima de 64 bits e outros casos que o orjson recusa
+            return super().dumps(obj).encode('utf-8')
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dump_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self._dump_bytes(obj, pretty) + b'\n', mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """Instala o OrjsonProvider no app (app.json)"""
+    app.json = OrjsonProvider(app)
+    if orjson is None:
+        logger.info("orjson nao instalado; usando o serializador JSON padrao")
+    return app.json
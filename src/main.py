@@ -5,9 +5,12 @@ import logging
 from flask import Flask, send_from_directory, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
-from database import db
+from database import db_warmup, init_database
+from json_provider import init_json_provider
+from compression import ResponseCompressor
 from routes.user import user_bp
 from routes.analysis import analysis_bp
+from routes.health import health_bp
 
 # Configurar encoding UTF-8 no Windows
 if sys.platform.startswith('win'):
@@ -46,44 +49,25 @@ CORS(app, origins=os.getenv('CORS_ORIGINS', '*'))
 # Configuração da aplicação
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'a-default-secret-key-that-should-be-changed')
 
+# Serialização JSON com orjson e compressão gzip/brotli das respostas
+init_json_provider(app)
+ResponseCompressor(app)
+
 # Registrar blueprints
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(analysis_bp, url_prefix='/api')
+app.register_blueprint(health_bp)
 
 # Configuração do banco de dados usando suas variáveis
 database_url = os.getenv('DATABASE_URL')
+pool_settings = None
 if database_url:
     try:
-        # Configuração otimizada para Supabase
-        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'pool_pre_ping': True,
-            'pool_recycle': 300,
-            'pool_timeout': 60,
-            'pool_size': 3,
-            'max_overflow': 5,
-            'connect_args': {
-                'sslmode': 'require',
-                'connect_timeout': 60,
-                'application_name': 'ARQV2_Gemini_App',
-                'keepalives_idle': 600,
-                'keepalives_interval': 30,
-                'keepalives_count': 3
-            }
-        }
-        
-        db.init_app(app)
-        
-        # Teste de conexão opcional - não bloqueia a aplicação
-        with app.app_context():
-            try:
-                from sqlalchemy import text
-                result = db.session.execute(text('SELECT 1'))
-                safe_print("[OK] Conexao com Supabase estabelecida com sucesso!")
-            except Exception as e:
-                safe_print(f"[WARN] Conexao com banco nao disponivel no momento: {str(e)[:100]}...")
-                safe_print("[INFO] Aplicacao funcionara com funcionalidades limitadas")
+        # Pool dimensionado pelo orçamento de conexões e aquecido em segundo plano
+        pool_settings = init_database(app, database_url)
+        safe_print(f"[INFO] Pool do banco: {pool_settings['pool_size']}+{pool_settings['max_overflow']} conexoes "
+                   f"por worker (PgBouncer: {pool_settings['pgbouncer_transaction_mode']})")
+        safe_print("[INFO] Conexao com o banco sendo estabelecida em segundo plano")
                 
     except Exception as e:
         safe_print(f"[WARN] Erro na configuracao do banco de dados: {str(e)[:100]}...")
@@ -91,7 +75,7 @@ if database_url:
 else:
     safe_print("[INFO] DATABASE_URL nao encontrada. Executando sem funcionalidades de banco de dados.")
 
-# Rota de health check
+# Liveness: responde sem tocar no banco
 @app.route('/health')
 def health_check():
     # Verificar status das APIs e banco
@@ -99,17 +83,6 @@ def health_check():
     supabase_status = 'configured' if os.getenv('SUPABASE_URL') else 'not_configured'
     database_status = 'configured' if database_url else 'not_configured'
     
-    # Teste rápido de conexão com banco
-    db_connection = 'disconnected'
-    if database_url:
-        try:
-            with app.app_context():
-                from sqlalchemy import text
-                db.session.execute(text('SELECT 1'))
-                db_connection = 'connected'
-        except:
-            db_connection = 'error'
-    
     return jsonify({
         'status': 'healthy',
         'message': 'UP Lancamentos - Arqueologia do Avatar com Gemini Pro 2.5',
@@ -117,7 +90,7 @@ def health_check():
             'gemini_ai': gemini_status,
             'supabase': supabase_status,
             'database': database_status,
-            'db_connection': db_connection
+            'db_connection': db_warmup.state
         },
         'version': '3.0.0',
         'features': [
@@ -1,18 +1,30 @@
 # -*- coding: utf-8 -*-
 import sys
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, send_file
 import json
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 import logging
-from supabase import create_client, Client
 from services.gemini_client import GeminiClient
 from services.attachment_service import AttachmentService
-import requests
-import re
+from services.attachment_condenser import AttachmentCondenser
+from services.attachment_retrieval import build_query as build_attachment_query
+from services.analysis_records import (
+    normalize_analysis_input, build_initial_record, build_completed_record,
+    resolve_analysis_columns, encode_keyset_cursor, decode_keyset_cursor,
+    ANALYSIS_JSONB_SEARCH_COLUMNS
+)
+from services.persistence_queue import PersistenceQueue
+from services.analysis_repository import create_analysis_repository
+from services.ttl_cache import TTLCache
+from services.similar_analysis_service import SimilarAnalysisService
+from services.pdf_artifact_cache import PDFArtifactCache
+from services.lazy_imports import lazy_import
+from services.text_dedup import dedup_stats
+import atexit
 from typing import Dict, List, Optional, Tuple
 import concurrent.futures
-from functools import lru_cache
 import uuid
+import tempfile
 import os
 
 # Configurar encoding UTF-8 no Windows
@@ -42,18 +54,32 @@ logger = logging.getLogger(__name__)
 
 analysis_bp = Blueprint('analysis', __name__)
 
+# Cliente Supabase (httpx, postgrest, gotrue...) importado só quando configurado
+supabase_sdk = lazy_import('supabase')
+
 # Configure Supabase
 supabase_url = os.getenv('SUPABASE_URL')
 supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-supabase: Client = None
+supabase = None
+persistence_queue: Optional[PersistenceQueue] = None
 
 if supabase_url and supabase_key:
     try:
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = supabase_sdk.create_client(supabase_url, supabase_key)
         safe_print("Cliente Supabase configurado com sucesso")
     except Exception as e:
         safe_print(f"Erro ao configurar Supabase: {e}")
 
+# Consultas e gravações da tabela analyses: PostgREST ou Postgres direto (ANALYSIS_REPOSITORY)
+analysis_repository = create_analysis_repository(supabase)
+
+if analysis_repository:
+    # Gravações das análises fora da thread da requisição
+    persistence_queue = PersistenceQueue(
+        supabase, table='analyses', conflict_column='analysis_uid', write_fn=analysis_repository.upsert
+    )
+    atexit.register(persistence_queue.flush)
+
 # Initialize services
 try:
     gemini_client = GeminiClient()
@@ -63,7 +89,28 @@ except Exception as e:
     gemini_client = None
 
 # Initialize enhanced services
-attachment_service = AttachmentService()
+# Anexos grandes são resumidos em paralelo (modelo rápido) antes da análise
+attachment_service = AttachmentService(
+    condenser=AttachmentCondenser(gemini_client.summarize_text) if gemini_client else None
+)
+
+# Análises passadas semelhantes (índice vetorial) como contexto de referência
+similar_analysis_service = SimilarAnalysisService(
+    supabase, embed_fn=gemini_client.embed_text if gemini_client else None
+)
+
+BATCH_PDF_MAX_ANALYSES = int(os.getenv('BATCH_PDF_MAX_ANALYSES', 200))
+
+# PDFs pré-renderizados por análise
+# ReportLab só é importado na primeira geração de PDF
+pdf_generator = lazy_import('routes.pdf_generator')
+pdf_artifacts = PDFArtifactCache(
+    lambda report: pdf_generator.generate_enhanced_pdf(report),
+    lambda: pdf_generator.PDF_TEMPLATE_VERSION
+)
+
+# Cache curto para a lista de segmentos (autocomplete)
+segmentos_cache = TTLCache(ttl=float(os.getenv('SEGMENTOS_CACHE_TTL', 60)), max_entries=512)
 
 # WebSailor service - simplified for now
 class SimpleWebSailorService:
@@ -93,57 +140,97 @@ def analyze_market():
         if not segmento:
             return jsonify({'error': 'Segmento é obrigatório'}), 400
         
-        # Extract and validate form data
-        analysis_data = {
-            'segmento': segmento.strip(),
-            'produto': data.get('produto', '').strip(),
-            'descricao': data.get('descricao', '').strip(),
-            'preco': data.get('preco', ''),
-            'publico': data.get('publico', '').strip(),
-            'concorrentes': data.get('concorrentes', '').strip(),
-            'dados_adicionais': data.get('dadosAdicionais', '').strip(),
-            'objetivo_receita': data.get('objetivoReceita', ''),
-            'prazo_lancamento': data.get('prazoLancamento', ''),
-            'orcamento_marketing': data.get('orcamentoMarketing', ''),
-            'user_query': data.get('query', '').strip(),  # Nova funcionalidade de pesquisa
-            'session_id': data.get('session_id', str(uuid.uuid4()))  # Para gerenciar anexos
-        }
+        _, analysis_result = run_analysis_pipeline(data)
         
-        # Safe numeric conversion
-        def safe_float_conversion(value, default=None):
-            if value is None or value == '':
-                return default
-            try:
-                return float(str(value).replace(',', '.'))
-            except (ValueError, TypeError):
-                return default
-        
-        analysis_data['preco_float'] = safe_float_conversion(analysis_data['preco'], 997.0)
-        analysis_data['objetivo_receita_float'] = safe_float_conversion(analysis_data['objetivo_receita'], 100000.0)
-        analysis_data['orcamento_marketing_float'] = safe_float_conversion(analysis_data['orcamento_marketing'], 50000.0)
-        
-        safe_print(f"Iniciando analise ultra-detalhada para segmento: {analysis_data['segmento']}")
-        
-        # Busca profunda na internet com WebSailor (prioritário) ou DeepSeek (fallback)
-        search_context = None
-        websailor_used = False
-        
-        # Implementar busca profunda se query fornecida
-        if analysis_data.get('user_query'):
-            try:
-                # Tentar usar WebSailor primeiro
-                if websailor_service.is_available():
-                    websailor_result = websailor_service.perform_deep_web_research(
-                        analysis_data['user_query'], 
-                        analysis_data
-                    )
-                    if websailor_result['success']:
-                        search_context = websailor_result['results']
-                        websailor_used = True
-                
-                # Fallback para busca simulada
-                if not search_context:
-                    search_context = f"""
+        safe_print("✅ Análise ultra-detalhada concluída com sucesso")
+        return jsonify(analysis_result)
+        
+    except Exception as e:
+        safe_print(f"❌ Erro na análise: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor', 'details': str(e)}), 500
+
+def run_analysis_pipeline(data: Dict, persist: bool = True) -> Tuple[Dict, Dict]:
+    """
+    Pipeline completo de uma análise: pesquisa profunda, anexos da sessão,
+    análises semelhantes, geração com o Gemini e persistência
+    
+    Usado por /analyze, /analyze_batch e pelo CLI de lote. Com persist=False
+    nada é gravado no banco (o CLI grava os resultados por conta própria).
+    
+    Returns:
+        Dados normalizados da entrada e o resultado da análise
+    """
+    if not (data.get('segmento') or data.get('nicho')):
+        raise ValueError('Segmento é obrigatório')
+    
+    # Extract and validate form data
+    analysis_data = normalize_analysis_input(data)
+    
+    safe_print(f"Iniciando analise ultra-detalhada para segmento: {analysis_data['segmento']}")
+    
+    search_context, websailor_used = build_search_context(analysis_data)
+    
+    # Recuperar anexos da sessão
+    attachments_context = attachment_service.get_session_attachments_content(
+        analysis_data['session_id'], query=build_attachment_query(analysis_data)
+    )
+    
+    # Buscar análises anteriores semelhantes
+    similar_matches, duplicate_result = find_similar_analyses(
+        data, analysis_data, search_context, attachments_context
+    )
+    if duplicate_result:
+        return analysis_data, duplicate_result
+    
+    # Save initial analysis record (write-behind)
+    analysis_id = save_initial_analysis(analysis_data) if persist else None
+    
+    # Generate comprehensive analysis with Gemini Pro 2.5
+    if gemini_client:
+        safe_print("🤖 Usando Gemini Pro 1.5 com pesquisa profunda e análise de anexos")
+        analysis_result = gemini_client.generate_ultra_detailed_analysis(
+            analysis_data,
+            search_context=search_context,
+            attachments_context=attachments_context,
+            reference_context=similar_analysis_service.build_reference_context(similar_matches)
+        )
+    else:
+        safe_print("⚠️ Gemini não disponível, usando análise de fallback")
+        analysis_result = create_fallback_analysis(analysis_data)
+    
+    finalize_analysis_result(
+        analysis_result, analysis_data, analysis_id,
+        search_context, websailor_used, attachments_context, similar_matches
+    )
+    return analysis_data, analysis_result
+
+def build_search_context(analysis_data: Dict) -> Tuple[Optional[str], bool]:
+    """
+    Busca profunda para a query do usuário
+    
+    Returns:
+        Contexto de pesquisa (ou None) e se o WebSailor foi usado
+    """
+    # Busca profunda na internet com WebSailor (prioritário) ou DeepSeek (fallback)
+    search_context = None
+    websailor_used = False
+    
+    # Implementar busca profunda se query fornecida
+    if analysis_data.get('user_query'):
+        try:
+            # Tentar usar WebSailor primeiro
+            if websailor_service.is_available():
+                websailor_result = websailor_service.perform_deep_web_research(
+                    analysis_data['user_query'], 
+                    analysis_data
+                )
+                if websailor_result['success']:
+                    search_context = websailor_result['results']
+                    websailor_used = True
+            
+            # Fallback para busca simulada
+            if not search_context:
+                search_context = f"""
 PESQUISA PROFUNDA SIMULADA:
 Query: {analysis_data['user_query']}
 Segmento: {analysis_data['segmento']}
@@ -158,48 +245,65 @@ Dados coletados:
 Nota: Esta é uma simulação. Para pesquisa real na internet, 
 configure as APIs WebSailor ou DeepSeek.
 """
-                    websailor_used = False
-                    
-            except Exception as e:
-                safe_print(f"Erro na busca profunda: {e}")
-                search_context = f"Erro na pesquisa: {str(e)}"
                 websailor_used = False
-        
-        # Recuperar anexos da sessão
-        attachments_context = attachment_service.get_session_attachments_content(analysis_data['session_id'])
-        
-        # Save initial analysis record
-        analysis_id = save_initial_analysis(analysis_data)
-        
-        # Generate comprehensive analysis with Gemini Pro 2.5
-        if gemini_client:
-            safe_print("🤖 Usando Gemini Pro 1.5 com pesquisa profunda e análise de anexos")
-            analysis_result = gemini_client.generate_ultra_detailed_analysis(
-                analysis_data,
-                search_context=search_context,
-                attachments_context=attachments_context
-            )
-        else:
-            safe_print("⚠️ Gemini não disponível, usando análise de fallback")
-            analysis_result = create_fallback_analysis(analysis_data)
-        
-        # Adicionar contextos à resposta para transparência
-        analysis_result['search_context_used'] = bool(search_context)
-        analysis_result['websailor_used'] = websailor_used
-        analysis_result['attachments_used'] = bool(attachments_context)
-        analysis_result['deep_search_results'] = search_context if search_context else None
-        
-        # Update analysis record with results
-        if supabase and analysis_id:
-            update_analysis_record(analysis_id, analysis_result)
-            analysis_result['analysis_id'] = analysis_id
-        
-        safe_print("✅ Análise ultra-detalhada concluída com sucesso")
-        return jsonify(analysis_result)
-        
-    except Exception as e:
-        safe_print(f"❌ Erro na análise: {str(e)}")
-        return jsonify({'error': 'Erro interno do servidor', 'details': str(e)}), 500
+                
+        except Exception as e:
+            safe_print(f"Erro na busca profunda: {e}")
+            search_context = f"Erro na pesquisa: {str(e)}"
+            websailor_used = False
+    
+    return search_context, websailor_used
+
+def find_similar_analyses(data: Dict, analysis_data: Dict, search_context: Optional[str],
+                          attachments_context: Optional[str]) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Busca análises anteriores semelhantes
+    
+    Returns:
+        Análises semelhantes e, quando há uma quase duplicata sem contexto
+        novo (pesquisa/anexos), a resposta pronta com a análise armazenada
+    """
+    if not similar_analysis_service.is_available():
+        return [], None
+    
+    analysis_data['embedding'] = similar_analysis_service.embed_analysis_input(analysis_data)
+    similar_matches = similar_analysis_service.find_similar(analysis_data['embedding'])
+    
+    if search_context or attachments_context or data.get('force_new'):
+        return similar_matches, None
+    
+    duplicate = similar_analysis_service.get_near_duplicate(similar_matches, analysis_data)
+    if not duplicate:
+        return similar_matches, None
+    
+    safe_print(f"♻️ Servindo analise quase identica {duplicate['analysis_uid']} "
+               f"(similaridade {duplicate['similarity']:.3f})")
+    analysis_result = dict(duplicate['analysis'])
+    analysis_result['analysis_id'] = duplicate['analysis_uid']
+    analysis_result['served_from_similar'] = {
+        'analysis_id': duplicate['analysis_uid'],
+        'similarity': duplicate['similarity']
+    }
+    return similar_matches, analysis_result
+
+def finalize_analysis_result(analysis_result: Dict, analysis_data: Dict, analysis_id: Optional[str],
+                             search_context: Optional[str], websailor_used: bool,
+                             attachments_context: Optional[str], similar_matches: List[Dict]):
+    """Adiciona os contextos usados à resposta, persiste e agenda o PDF"""
+    # Adicionar contextos à resposta para transparência
+    analysis_result['search_context_used'] = bool(search_context)
+    analysis_result['websailor_used'] = websailor_used
+    analysis_result['attachments_used'] = bool(attachments_context)
+    analysis_result['deep_search_results'] = search_context if search_context else None
+    analysis_result['similar_analyses_used'] = [match['analysis_uid'] for match in similar_matches]
+    
+    # Update analysis record with results (write-behind)
+    if analysis_id:
+        update_analysis_record(analysis_data, analysis_result)
+        analysis_result['analysis_id'] = analysis_id
+        # Um analysis_uid reaproveitado não pode servir o PDF da análise anterior
+        pdf_artifacts.invalidate(analysis_id)
+        pdf_artifacts.render_async(analysis_id, analysis_result, replace=True)
 
 @analysis_bp.route('/upload_attachment', methods=['POST'])
 def upload_attachment():
@@ -265,36 +369,19 @@ def analyze_batch_data():
         return jsonify({'error': f'Erro na análise em lote: {str(e)}'}), 500
 
 def process_single_analysis_enhanced(data_item: Dict) -> Dict:
-    """Processa uma análise individual com funcionalidades aprimoradas"""
-    user_query = data_item.get('query')
-    session_id = data_item.get('session_id', str(uuid.uuid4()))
-    
-    # Busca profunda se query fornecida
-    search_context = None
-    websailor_used = False
-    
-    if user_query:
-        search_context = f"Pesquisa profunda simulada para: {user_query}"
-        websailor_used = False
-
-    # Recuperar anexos da sessão
-    attachments_context = attachment_service.get_session_attachments_content(session_id)
-
+    """Processa uma análise individual do lote pelo pipeline completo"""
     if not gemini_client:
         raise Exception('Serviço Gemini não configurado para processamento em lote')
-
-    analysis_result = gemini_client.generate_ultra_detailed_analysis(
-        data_item, 
-        search_context=search_context,
-        attachments_context=attachments_context
-    )
+    
+    _, analysis_result = run_analysis_pipeline(data_item)
     
     return {
         'data': data_item, 
         'report': analysis_result,
-        'search_context_used': bool(search_context),
-        'websailor_used': websailor_used,
-        'attachments_used': bool(attachments_context)
+        'analysis_id': analysis_result.get('analysis_id'),
+        'search_context_used': analysis_result.get('search_context_used', False),
+        'websailor_used': analysis_result.get('websailor_used', False),
+        'attachments_used': analysis_result.get('attachments_used', False)
     }
 
 @analysis_bp.route('/generate_pdf', methods=['POST'])
@@ -305,18 +392,17 @@ def generate_pdf_report():
         if not data or 'report_content' not in data:
             return jsonify({'error': 'Conteúdo do relatório não fornecido'}), 400
 
-        report_content = data['report_content']
-        
-        # Importar gerador de PDF
-        from .pdf_generator import generate_enhanced_pdf
-        pdf_buffer = generate_enhanced_pdf(report_content)
+        pdf_buffer = pdf_generator.generate_enhanced_pdf(data['report_content'])
         
-        return Response(
-            pdf_buffer.getvalue(), 
-            mimetype='application/pdf', 
-            headers={'Content-Disposition': 'attachment;filename=relatorio_analise_aprimorado.pdf'}
+        return send_file(
+            pdf_buffer,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name='relatorio_analise_aprimorado.pdf'
         )
         
+    except ValueError as e:
+        return jsonify({'error': f'Conteúdo do relatório inválido: {e}'}), 400
     except Exception as e:
         safe_print(f"Erro ao gerar PDF: {e}")
         return jsonify({'error': f'Erro ao gerar PDF: {e}'}), 500
@@ -351,65 +437,28 @@ def clear_session_attachments(session_id):
         safe_print(f"Erro ao limpar sessao: {str(e)}")
         return jsonify({'error': f'Erro ao limpar sessão: {str(e)}'}), 500
 
-def save_initial_analysis(data: Dict) -> Optional[int]:
-    """Salva registro inicial da análise no Supabase"""
-    if not supabase:
+def save_initial_analysis(data: Dict) -> Optional[str]:
+    """Enfileira o registro inicial da análise no Supabase e retorna seu analysis_uid"""
+    if not persistence_queue:
         safe_print("Supabase nao configurado, pulando salvamento")
         return None
     
     try:
-        analysis_record = {
-            'nicho': data['segmento'],  # Manter compatibilidade com schema
-            'produto': data['produto'],
-            'descricao': data['descricao'],
-            'preco': data['preco_float'],
-            'publico': data['publico'],
-            'concorrentes': data['concorrentes'],
-            'dados_adicionais': data['dados_adicionais'],
-            'objetivo_receita': data['objetivo_receita_float'],
-            'orcamento_marketing': data['orcamento_marketing_float'],
-            'prazo_lancamento': data['prazo_lancamento'],
-            'user_query': data.get('user_query', ''),  # Nova coluna
-            'session_id': data.get('session_id', ''),  # Nova coluna
-            'status': 'processing',
-            'created_at': datetime.now(timezone.utc).isoformat()
-        }
-        
-        result = supabase.table('analyses').insert(analysis_record).execute()
-        if result.data:
-            analysis_id = result.data[0]['id']
-            safe_print(f"Analise salva no Supabase com ID: {analysis_id}")
-            return analysis_id
+        persistence_queue.enqueue(build_initial_record(data))
+        return data['analysis_uid']
     except Exception as e:
-        safe_print(f"Erro ao salvar no Supabase: {str(e)}")
+        safe_print(f"Erro ao enfileirar analise para o Supabase: {str(e)}")
     
     return None
 
-def update_analysis_record(analysis_id: int, results: Dict):
-    """Atualiza registro da análise com resultados aprimorados"""
+def update_analysis_record(data: Dict, results: Dict):
+    """Enfileira a atualização da análise com os resultados aprimorados"""
     try:
-        update_data = {
-            'avatar_data': results.get('avatar_ultra_detalhado', {}),
-            'positioning_data': results.get('escopo', {}),
-            'competition_data': results.get('analise_concorrencia_detalhada', {}),
-            'marketing_data': results.get('estrategia_palavras_chave', {}),
-            'metrics_data': results.get('metricas_performance_detalhadas', {}),
-            'funnel_data': results.get('projecoes_cenarios', {}),
-            'market_intelligence': results.get('inteligencia_mercado', {}),
-            'action_plan': results.get('plano_acao_detalhado', {}),
-            'comprehensive_analysis': results,  # Análise completa
-            'search_context_used': results.get('search_context_used', False),  # Novo campo
-            'websailor_used': results.get('websailor_used', False),  # Novo campo
-            'attachments_used': results.get('attachments_used', False),  # Novo campo
-            'status': 'completed',
-            'updated_at': datetime.now(timezone.utc).isoformat()
-        }
-        
-        supabase.table('analyses').update(update_data).eq('id', analysis_id).execute()
-        safe_print(f"Analise {analysis_id} atualizada no Supabase")
+        persistence_queue.enqueue(build_completed_record(data, results))
+        safe_print(f"Analise {data['analysis_uid']} enfileirada para atualizacao no Supabase")
         
     except Exception as e:
-        safe_print(f"Erro ao atualizar analise no Supabase: {str(e)}")
+        safe_print(f"Erro ao enfileirar atualizacao da analise: {str(e)}")
 
 def create_fallback_analysis(data: Dict) -> Dict:
     """Cria análise de fallback quando Gemini falha"""
@@ -442,47 +491,134 @@ def create_fallback_analysis(data: Dict) -> Dict:
         ]
     }
 
+def conditional_json(payload: Dict) -> Response:
+    """Resposta JSON com ETag; devolve 304 quando If-None-Match confere"""
+    response = jsonify(payload)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 # Rotas existentes mantidas com adaptações para 'segmento'
 @analysis_bp.route('/analyses', methods=['GET'])
 def get_analyses():
-    """Get list of recent analyses"""
+    """
+    Get list of recent analyses
+    
+    Query params:
+        fields: summary (padrão), inputs, results, full ou lista de colunas
+        limit: tamanho da página (máx. 100)
+        cursor: cursor da página anterior (paginação keyset por created_at, id)
+        segmento/nicho: filtro por segmento
+    """
     try:
-        if not supabase:
+        if not analysis_repository:
             return jsonify({'error': 'Banco de dados não configurado'}), 500
         
-        limit = request.args.get('limit', 10, type=int)
-        segmento = request.args.get('segmento') or request.args.get('nicho')  # Compatibilidade
+        try:
+            page = list_analyses(
+                fields=request.args.get('fields'),
+                limit=request.args.get('limit', 10, type=int),
+                cursor=request.args.get('cursor'),
+                segmento=request.args.get('segmento') or request.args.get('nicho')  # Compatibilidade
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        query = supabase.table('analyses').select('*').order('created_at', desc=True)
+        return conditional_json(page)
         
-        if segmento:
-            query = query.eq('nicho', segmento)  # Campo no DB ainda é 'nicho'
+    except Exception as e:
+        safe_print(f"Erro ao buscar análises: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+def list_analyses(fields: Optional[str] = None, limit: int = 10, cursor: Optional[str] = None,
+                  segmento: Optional[str] = None) -> Dict:
+    """
+    Página de análises recentes (paginação keyset por created_at, id)
+    
+    Lança ValueError para campos ou cursor inválidos.
+    """
+    limit = max(1, min(limit or 10, 100))
+    columns = resolve_analysis_columns(fields)
+    keyset = decode_keyset_cursor(cursor) if cursor else None
+    
+    # Uma linha extra indica se existe próxima página
+    data = analysis_repository.list_page(columns, limit + 1, keyset=keyset, segmento=segmento)
+    
+    rows = data[:limit]
+    next_cursor = encode_keyset_cursor(rows[-1]) if len(data) > limit else None
+    
+    return {
+        'analyses': rows,
+        'count': len(rows),
+        'next_cursor': next_cursor
+    }
+
+@analysis_bp.route('/analyses/search', methods=['GET'])
+def search_analyses():
+    """
+    Busca análises armazenadas
+    
+    Query params:
+        q: busca textual em português (sintaxe websearch: "frase", -termo, OR)
+           sobre segmento, produto, descrição e insights
+        contains: JSON contido em comprehensive_analysis (ex.: {"escopo": {"nicho_especifico": "Fitness"}})
+        contains_market_intelligence / contains_action_plan: idem para essas colunas
+        segmento/nicho, fields, limit: como em /api/analyses
+    """
+    try:
+        if not analysis_repository:
+            return jsonify({'error': 'Banco de dados não configurado'}), 500
         
-        result = query.limit(limit).execute()
+        text_query = (request.args.get('q') or '').strip()
+        segmento = request.args.get('segmento') or request.args.get('nicho')
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
         
-        return jsonify({
-            'analyses': result.data,
-            'count': len(result.data)
+        try:
+            columns = resolve_analysis_columns(request.args.get('fields'))
+            containment = {}
+            for column in ANALYSIS_JSONB_SEARCH_COLUMNS:
+                param = 'contains' if column == 'comprehensive_analysis' else f'contains_{column}'
+                raw_value = request.args.get(param)
+                if raw_value:
+                    value = json.loads(raw_value)
+                    if not isinstance(value, (dict, list)):
+                        raise ValueError(f"'{param}' deve ser um objeto ou lista JSON")
+                    containment[column] = value
+        except json.JSONDecodeError as e:
+            return jsonify({'error': f'JSON inválido no filtro de contenção: {e}'}), 400
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not text_query and not containment:
+            return jsonify({'error': "Informe 'q' ou um filtro 'contains'"}), 400
+        
+        data = analysis_repository.search(
+            columns, limit, text_query=text_query, containment=containment, segmento=segmento
+        )
+        
+        return conditional_json({
+            'analyses': data,
+            'count': len(data),
+            'query': text_query,
+            'filters': list(containment)
         })
         
     except Exception as e:
-        safe_print(f"Erro ao buscar análises: {str(e)}")
+        safe_print(f"Erro na busca de análises: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
-@analysis_bp.route('/analyses/<int:analysis_id>', methods=['GET'])
+@analysis_bp.route('/analyses/<analysis_id>', methods=['GET'])
 def get_analysis(analysis_id):
-    """Get specific analysis by ID"""
+    """Get specific analysis by numeric ID or analysis_uid"""
     try:
-        if not supabase:
+        if not analysis_repository:
             return jsonify({'error': 'Banco de dados não configurado'}), 500
         
-        result = supabase.table('analyses').select('*').eq('id', analysis_id).execute()
+        analysis = analysis_repository.get(analysis_id)
         
-        if not result.data:
+        if not analysis:
             return jsonify({'error': 'Análise não encontrada'}), 404
         
-        analysis = result.data[0]
-        
         # Retorna análise completa se disponível
         if analysis.get('comprehensive_analysis'):
             return jsonify(analysis['comprehensive_analysis'])
@@ -510,19 +646,106 @@ def get_analysis(analysis_id):
         safe_print(f"Erro ao buscar análise: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@analysis_bp.route('/analyses/<analysis_id>/pdf', methods=['GET'])
+def download_analysis_pdf(analysis_id):
+    """Download do PDF de uma análise (cache de artefatos, ETag e Range)"""
+    try:
+        analysis_uid = analysis_id
+        path = None if analysis_id.isdigit() else pdf_artifacts.get(analysis_uid)
+        
+        if not path:
+            if not analysis_repository:
+                return jsonify({'error': 'Banco de dados não configurado'}), 500
+            
+            analysis = analysis_repository.get(analysis_id, ['analysis_uid', 'status', 'comprehensive_analysis'])
+            
+            if not analysis:
+                return jsonify({'error': 'Análise não encontrada'}), 404
+            if analysis['status'] != 'completed' or not analysis.get('comprehensive_analysis'):
+                return jsonify({'error': 'Análise ainda não concluída'}), 409
+            
+            analysis_uid = analysis['analysis_uid']
+            path = pdf_artifacts.get(analysis_uid) or pdf_artifacts.render(analysis_uid, analysis['comprehensive_analysis'])
+        
+        response = send_file(
+            path,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f'relatorio_analise_{analysis_uid}.pdf',
+            conditional=True,
+            etag=pdf_artifacts.etag_for(analysis_uid, path),
+            max_age=86400
+        )
+        response.headers['Accept-Ranges'] = 'bytes'
+        return response
+        
+    except Exception as e:
+        safe_print(f"Erro ao servir PDF da analise: {str(e)}")
+        return jsonify({'error': f'Erro ao gerar PDF: {e}'}), 500
+
+@analysis_bp.route('/analyses/batch_pdf', methods=['POST'])
+def download_batch_pdf():
+    """PDF único combinando várias análises concluídas"""
+    try:
+        if not analysis_repository:
+            return jsonify({'error': 'Banco de dados não configurado'}), 500
+        
+        data = request.get_json() or {}
+        analysis_ids = [str(item) for item in data.get('analysis_ids', []) if item]
+        if not analysis_ids:
+            return jsonify({'error': 'Informe analysis_ids'}), 400
+        if len(analysis_ids) > BATCH_PDF_MAX_ANALYSES:
+            return jsonify({'error': f'Máximo de {BATCH_PDF_MAX_ANALYSES} análises por PDF'}), 400
+        
+        def iter_reports():
+            # Uma análise por consulta: o JSON completo não fica todo em memória
+            for analysis_id in analysis_ids:
+                report = analysis_repository.get_completed_report(analysis_id)
+                if report:
+                    yield report
+                else:
+                    safe_print(f"Analise {analysis_id} ignorada no PDF em lote (nao concluida)")
+        
+        output = tempfile.TemporaryFile()
+        if not pdf_generator.generate_batch_pdf(iter_reports(), output):
+            output.close()
+            return jsonify({'error': 'Nenhuma análise concluída encontrada'}), 404
+        output.seek(0)
+        
+        return send_file(
+            output,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name='relatorio_analises_lote.pdf'
+        )
+        
+    except Exception as e:
+        safe_print(f"Erro ao gerar PDF em lote: {str(e)}")
+        return jsonify({'error': f'Erro ao gerar PDF em lote: {e}'}), 500
+
 @analysis_bp.route('/segmentos', methods=['GET'])
 def get_segmentos():
-    """Get list of unique segments from analyses"""
+    """
+    Get list of unique segments from analyses
+    
+    Query params:
+        search: prefixo para autocomplete (sem diferenciar maiúsculas)
+        limit: máximo de segmentos retornados (padrão 200, máx. 1000)
+    """
     try:
-        if not supabase:
+        if not analysis_repository:
             return jsonify({'error': 'Banco de dados não configurado'}), 500
         
-        result = supabase.table('analyses').select('nicho').execute()
+        prefix = (request.args.get('search') or '').strip().lower()
+        limit = max(1, min(request.args.get('limit', 200, type=int), 1000))
         
-        segmentos = list(set([item['nicho'] for item in result.data if item['nicho']]))
-        segmentos.sort()
+        cache_key = (prefix, limit)
+        segmentos = segmentos_cache.get(cache_key)
+        if segmentos is None:
+            segmentos = fetch_segmentos(prefix, limit)
+            segmentos_cache.set(cache_key, segmentos)
         
-        return jsonify({
+        return conditional_json({
             'segmentos': segmentos,
             'count': len(segmentos)
         })
@@ -531,6 +754,10 @@ def get_segmentos():
         safe_print(f"Erro ao buscar segmentos: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+def fetch_segmentos(prefix: str, limit: int) -> List[str]:
+    """Busca segmentos distintos na tabela materializada analysis_segmentos"""
+    return analysis_repository.list_segmentos(prefix, limit)
+
 # Manter rota antiga para compatibilidade
 @analysis_bp.route('/nichos', methods=['GET'])
 def get_nichos():
@@ -538,6 +765,12 @@ def get_nichos():
     return get_segmentos()
 
 # Novas rotas para funcionalidades aprimoradas
+def get_search_cache_stats() -> Optional[Dict]:
+    """Métricas do cache de buscas do WebSailor (None se as ferramentas não foram carregadas)"""
+    # Sem importar o webagent aqui: o pacote carrega o agente e o qwen_agent
+    module = sys.modules.get('webagent.tools.search_cache')
+    return module.search_cache.get_stats() if module else None
+
 @analysis_bp.route('/status', methods=['GET'])
 def status_check():
     """Endpoint para verificar o status do serviço"""
@@ -552,14 +785,21 @@ def status_check():
     
     status = {
         'supabase_configured': supabase is not None,
+        'analysis_repository': analysis_repository.get_stats() if analysis_repository else None,
         'gemini_configured': gemini_client is not None,
         'gemini_working': gemini_status,
         'attachment_service_configured': attachment_service.is_configured(),
         'websailor_configured': websailor_service.is_available(),
         'websailor_status': websailor_service.get_service_status(),
+        'gemini_resilience': gemini_client.get_resilience_stats() if gemini_client else None,
+        'persistence_queue': persistence_queue.get_stats() if persistence_queue else None,
+        'segmentos_cache': segmentos_cache.get_stats(),
+        'pdf_artifacts': pdf_artifacts.get_stats(),
+        'text_dedup': dedup_stats.get_stats(),
+        'search_cache': get_search_cache_stats(),
         'timestamp': datetime.utcnow().isoformat(),
         'version': '2.0.0',
-        'model': 'gemini-1.5-pro'
+        'model': gemini_client.router.primary_model if gemini_client else None
     }
     return jsonify(status), 200
 
@@ -0,0 +1,34 @@
+from flask import Blueprint, current_app, jsonify
+
+from database import DatabaseWarmup, db_warmup
+from db_pool import pool_metrics
+
+health_bp = Blueprint('health', __name__)
+
+
+# Readiness: 503 até o pool do banco estar aquecido
+@health_bp.route('/ready')
+def readiness_check():
+    if db_warmup.state == DatabaseWarmup.NOT_CONFIGURED:
+        # Sem banco (DATABASE_URL ausente ou configuração falhou): nada a aguardar
+        return jsonify({'status': 'ready', 'database': db_warmup.get_status()})
+    
+    status_code = 200 if db_warmup.is_ready else 503
+    return jsonify({
+        'status': 'ready' if db_warmup.is_ready else 'not_ready',
+        'database': db_warmup.get_status()
+    }), status_code
+
+
+# Métricas do pool de conexões (espera no checkout, uso, overflow)
+@health_bp.route('/metrics/db_pool')
+def db_pool_metrics():
+    pool_settings = current_app.config.get('DB_POOL_SETTINGS')
+    if not pool_settings:
+        return jsonify({'error': 'Banco de dados não configurado'}), 404
+    
+    return jsonify({
+        'settings': pool_settings,
+        'metrics': pool_metrics.get_stats(),
+        'warmup': db_warmup.get_status()
+    })
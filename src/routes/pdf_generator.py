@@ -1,6 +1,12 @@
 import os
 import io
+import json
+import threading
+import collections
+import multiprocessing
+import concurrent.futures
 from datetime import datetime
+from typing import Iterable, List, Optional
 from flask import Blueprint, request, jsonify, send_file
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -10,129 +16,209 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.platypus.flowables import HRFlowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas as pdf_canvas
 import logging
 
 logger = logging.getLogger(__name__)
 
 pdf_bp = Blueprint("pdf", __name__)
 
+# Incrementar ao alterar layout/estilos: invalida os PDFs em cache
+PDF_TEMPLATE_VERSION = '2'
+
+# Ordem das seções do relatório
+REPORT_SECTIONS = [
+    'capa', 'resumo', 'persona', 'escopo', 'dores', 'marketing',
+    'competicao', 'metricas', 'plano_acao', 'insights', 'cenarios', 'conclusao'
+]
+
+# Renderização paralela: grupos de seções independentes (cada um começa em nova página)
+PARALLEL_SECTION_GROUPS = [
+    ['capa'],
+    ['resumo', 'persona', 'escopo'],
+    ['dores'],
+    ['marketing', 'competicao'],
+    ['metricas', 'plano_acao'],
+    ['insights', 'cenarios'],
+    ['conclusao']
+]
+# Desligado por padrão: cada worker web manteria um pool de processos (spawn)
+PDF_PARALLEL_ENABLED = os.getenv('PDF_PARALLEL_ENABLED', 'false').lower() == 'true'
+PDF_PARALLEL_MIN_ITEMS = int(os.getenv('PDF_PARALLEL_MIN_ITEMS', 300))
+PDF_RENDER_PROCESSES = int(os.getenv('PDF_RENDER_PROCESSES', min(4, os.cpu_count() or 1)))
+
+_process_pool = None
+_process_pool_pid = None
+_process_pool_lock = threading.Lock()
+_styles = None
+_styles_lock = threading.Lock()
+_logo = None
+_logo_loaded = False
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static', 'logo.png')
+
+
+def _draw_page_number(canvas, page_num: int):
+    canvas.setFont('Helvetica', 8)
+    canvas.setFillColor(HexColor('#666666'))
+    current_date = datetime.now().strftime('%d/%m/%Y')
+    footer_right_text = f"Data: {current_date} | Página {page_num}"
+    text_width = canvas.stringWidth(footer_right_text, 'Helvetica', 8)
+    canvas.drawString(A4[0] - inch - text_width, 0.75 * inch, footer_right_text)
+
+
+def _build_styles():
+    styles = getSampleStyleSheet()
+    
+    try:
+        styles.add(ParagraphStyle(
+            name='CustomTitle', 
+            fontSize=24, 
+            leading=28, 
+            alignment=TA_CENTER, 
+            textColor=HexColor('#333333'),
+            fontName='Helvetica-Bold',
+            spaceAfter=20
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomSubtitle', 
+            fontSize=18, 
+            leading=22, 
+            alignment=TA_CENTER, 
+            textColor=HexColor('#666666'),
+            fontName='Helvetica',
+            spaceAfter=15
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomHeading1', 
+            fontSize=16, 
+            leading=20, 
+            textColor=HexColor('#0056b3'), 
+            spaceAfter=12, 
+            fontName='Helvetica-Bold',
+            spaceBefore=15
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomHeading2', 
+            fontSize=14, 
+            leading=18, 
+            textColor=HexColor('#007bff'), 
+            spaceAfter=10, 
+            fontName='Helvetica-Bold',
+            spaceBefore=10
+        ))
+        styles.add(ParagraphStyle(
+            name='CustomBodyText', 
+            fontSize=10, 
+            leading=14, 
+            textColor=HexColor('#333333'), 
+            spaceAfter=6, 
+            alignment=TA_JUSTIFY,
+            fontName='Helvetica',
+            wordWrap='CJK'
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='BulletText', 
+            fontSize=10, 
+            leading=14, 
+            textColor=HexColor('#333333'), 
+            leftIndent=20, 
+            bulletIndent=10, 
+            bulletFontName='Helvetica-Bold', 
+            bulletFontSize=10, 
+            bulletColor=HexColor('#0056b3'),
+            spaceAfter=3
+        ))            
+        styles.add(ParagraphStyle(
+            name='CustomCaption', 
+            fontSize=8, 
+            leading=10, 
+            textColor=HexColor('#999999'), 
+            alignment=TA_CENTER, 
+            spaceAfter=6,
+            fontName='Helvetica'
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomListText', 
+            fontSize=10, 
+            leading=14, 
+            textColor=HexColor('#333333'), 
+            leftIndent=20,
+            fontName='Helvetica',
+            spaceAfter=3
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomQuote', 
+            fontSize=10, 
+            leading=14, 
+            textColor=HexColor('#555555'), 
+            leftIndent=20, 
+            rightIndent=20, 
+            spaceBefore=10, 
+            spaceAfter=10, 
+            backColor=HexColor('#f0f0f0'), 
+            borderPadding=5,
+            fontName='Helvetica-Oblique'
+        ))
+        
+    except Exception as e:
+        logger.warning(f"Error creating custom styles: {e}. Using default styles.")
+    
+    return styles
+
+
+def get_report_styles():
+    """Folha de estilos do relatório, construída uma única vez por processo"""
+    global _styles
+    if _styles is None:
+        with _styles_lock:
+            if _styles is None:
+                _styles = _build_styles()
+    return _styles
+
+
+def _get_logo():
+    """Logo do cabeçalho (carregado uma única vez; None se ausente)"""
+    global _logo, _logo_loaded
+    if not _logo_loaded:
+        with _styles_lock:
+            if not _logo_loaded:
+                if os.path.exists(LOGO_PATH):
+                    try:
+                        _logo = ImageReader(LOGO_PATH)
+                    except Exception as e:
+                        logger.warning(f"Could not load logo: {e}")
+                _logo_loaded = True
+    return _logo
+
+
 class PDFReportGenerator:
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        
-        try:
-            self.styles.add(ParagraphStyle(
-                name='CustomTitle', 
-                fontSize=24, 
-                leading=28, 
-                alignment=TA_CENTER, 
-                textColor=HexColor('#333333'),
-                fontName='Helvetica-Bold',
-                spaceAfter=20
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='CustomSubtitle', 
-                fontSize=18, 
-                leading=22, 
-                alignment=TA_CENTER, 
-                textColor=HexColor('#666666'),
-                fontName='Helvetica',
-                spaceAfter=15
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='CustomHeading1', 
-                fontSize=16, 
-                leading=20, 
-                textColor=HexColor('#0056b3'), 
-                spaceAfter=12, 
-                fontName='Helvetica-Bold',
-                spaceBefore=15
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='CustomHeading2', 
-                fontSize=14, 
-                leading=18, 
-                textColor=HexColor('#007bff'), 
-                spaceAfter=10, 
-                fontName='Helvetica-Bold',
-                spaceBefore=10
-            ))
-            self.styles.add(ParagraphStyle(
-                name='CustomBodyText', 
-                fontSize=10, 
-                leading=14, 
-                textColor=HexColor('#333333'), 
-                spaceAfter=6, 
-                alignment=TA_JUSTIFY,
-                fontName='Helvetica',
-                wordWrap='CJK'
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='BulletText', 
-                fontSize=10, 
-                leading=14, 
-                textColor=HexColor('#333333'), 
-                leftIndent=20, 
-                bulletIndent=10, 
-                bulletFontName='Helvetica-Bold', 
-                bulletFontSize=10, 
-                bulletColor=HexColor('#0056b3'),
-                spaceAfter=3
-            ))            
-            self.styles.add(ParagraphStyle(
-                name='CustomCaption', 
-                fontSize=8, 
-                leading=10, 
-                textColor=HexColor('#999999'), 
-                alignment=TA_CENTER, 
-                spaceAfter=6,
-                fontName='Helvetica'
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='CustomListText', 
-                fontSize=10, 
-                leading=14, 
-                textColor=HexColor('#333333'), 
-                leftIndent=20,
-                fontName='Helvetica',
-                spaceAfter=3
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='CustomQuote', 
-                fontSize=10, 
-                leading=14, 
-                textColor=HexColor('#555555'), 
-                leftIndent=20, 
-                rightIndent=20, 
-                spaceBefore=10, 
-                spaceAfter=10, 
-                backColor=HexColor('#f0f0f0'), 
-                borderPadding=5,
-                fontName='Helvetica-Oblique'
-            ))
-            
-        except Exception as e:
-            logger.warning(f"Error creating custom styles: {e}. Using default styles.")
+        # Os estilos são apenas lidos durante o build: a mesma instância é compartilhada
+        self.styles = get_report_styles()
 
     def _add_header_and_footer(self, canvas, doc):
+        self._draw_page_decorations(canvas, canvas.getPageNumber())
+
+    def _add_header_and_footer_unnumbered(self, canvas, doc):
+        # Renderização em partes: o número da página é carimbado após a junção
+        self._draw_page_decorations(canvas, None)
+
+    def _draw_page_decorations(self, canvas, page_num):
         canvas.saveState()
         
         canvas.setFont('Helvetica-Bold', 10)
         canvas.setFillColor(HexColor('#0056b3'))
         
-        logo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static', 'logo.png')
-        if os.path.exists(logo_path):
-            try:
-                logo = ImageReader(logo_path)
-                canvas.drawImage(logo, inch, A4[1] - 0.9 * inch, width=0.5*inch, height=0.5*inch, preserveAspectRatio=True)
-            except Exception as e:
-                logger.warning(f"Could not load logo: {e}")
+        logo = _get_logo()
+        if logo is not None:
+            canvas.drawImage(logo, inch, A4[1] - 0.9 * inch, width=0.5*inch, height=0.5*inch, preserveAspectRatio=True)
         
         canvas.drawString(inch + 0.6 * inch, A4[1] - 0.75 * inch, "Relatório de Arqueologia de Avatar")
         canvas.setFont('Helvetica', 8)
@@ -140,16 +226,13 @@ class PDFReportGenerator:
 
         canvas.setFont('Helvetica', 8)
         canvas.setFillColor(HexColor('#666666'))
-        page_num = canvas.getPageNumber()
         report_name = "Relatório de Arqueologia de Avatar"
         user_name = "Up"
-        current_date = datetime.now().strftime('%d/%m/%Y')
         
         canvas.drawString(inch, 0.75 * inch, f"{report_name} | Gerado por: {user_name}")
         
-        footer_right_text = f"Data: {current_date} | Página {page_num}"
-        text_width = canvas.stringWidth(footer_right_text, 'Helvetica', 8)
-        canvas.drawString(A4[0] - inch - text_width, 0.75 * inch, footer_right_text)
+        if page_num is not None:
+            _draw_page_number(canvas, page_num)
         
         canvas.restoreState()
 
@@ -167,202 +250,465 @@ class PDFReportGenerator:
         except:
             return default
 
-    def generate_pdf_report(self, data: dict, filename: str):
+    def generate_pdf_report(self, data: dict, filename):
+        """Gera o relatório em um caminho ou objeto file-like (ex.: BytesIO)"""
         try:
-            doc = SimpleDocTemplate(filename, pagesize=A4, topMargin=inch, bottomMargin=inch)
-            story = []
+            self.render(data, filename)
+            logger.info(f"Relatório PDF '{filename}' gerado com sucesso.")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Erro ao gerar o relatório PDF: {e}")
+            return False
+
+    def render(self, data: dict, output, sections: Optional[List[str]] = None, numbered: bool = True) -> bool:
+        """
+        Renderiza o relatório em output (caminho ou file-like); lança exceção em erro
+
+        Args:
+            sections: Renderiza apenas estas seções (parte de uma renderização paralela)
+            numbered: Desenha o número da página no rodapé
+
+        Returns:
+            False se as seções pedidas não tiverem conteúdo (nada é escrito)
+        """
+        if sections is None:
+            story = self._build_story(data)
+        else:
+            story = [flowable for name in sections for flowable in self.build_section(name, data)]
+            # Cada parte já começa em página nova
+            while story and isinstance(story[0], PageBreak):
+                story.pop(0)
+            while story and isinstance(story[-1], PageBreak):
+                story.pop()
+            if not story:
+                return False
+
+        decorate = self._add_header_and_footer if numbered else self._add_header_and_footer_unnumbered
+        doc = SimpleDocTemplate(output, pagesize=A4, topMargin=inch, bottomMargin=inch)
+        doc.build(story, onFirstPage=decorate, onLaterPages=decorate)
+        return True
+
+    def _build_story(self, data: dict) -> list:
+        story = []
+        for name in REPORT_SECTIONS:
+            story.extend(self.build_section(name, data))
+        return story
+
+    def build_section(self, name: str, data: dict) -> list:
+        """Flowables de uma seção do relatório (lista vazia se não houver dados)"""
+        return getattr(self, f'_section_{name}')(data)
+
+    def _section_capa(self, data: dict) -> list:
+        """Capa com título, segmento e data"""
+        story = []
+        segmento = self._safe_get(data, 'escopo', 'segmento_principal', default='Segmento não especificado')
+
+        story.append(Paragraph("Relatório de Arqueologia de Avatar", self.styles["CustomTitle"]))
+        story.append(Spacer(1, 0.3 * inch))
+        story.append(Paragraph(f"Análise Ultra-Detalhada: {segmento}", self.styles["CustomSubtitle"]))
+        story.append(Spacer(1, 0.5 * inch))
+        story.append(Paragraph(f"Gerado em: {datetime.now().strftime('%d/%m/%Y às %H:%M')}", self.styles["CustomCaption"]))
+        story.append(PageBreak())
+        return story
+
+    def _section_resumo(self, data: dict) -> list:
+        """Resumo executivo"""
+        story = []
+        segmento = self._safe_get(data, 'escopo', 'segmento_principal', default='Segmento não especificado')
 
-            segmento = self._safe_get(data, 'escopo', 'segmento_principal', default='Segmento não especificado')
-            avatar_data = data.get('avatar_ultra_detalhado', {})
-            persona = avatar_data.get('persona_principal', {})
+        story.append(Paragraph("Resumo Executivo", self.styles["CustomHeading1"]))
+        story.append(Paragraph(
+            f"Este relatório apresenta uma análise ultra-detalhada do segmento {segmento}, "
+            "utilizando inteligência artificial avançada e pesquisa em tempo real na internet. "
+            "A análise revela insights profundos sobre o avatar ideal, estratégias de marketing "
+            "e oportunidades de mercado.", 
+            self.styles["CustomBodyText"]
+        ))
+        story.append(Spacer(1, 0.3 * inch))
+        return story
+
+    def _section_persona(self, data: dict) -> list:
+        """Perfil do avatar principal"""
+        story = []
+        persona = data.get('avatar_ultra_detalhado', {}).get('persona_principal', {})
+
+        if persona:
+            story.append(Paragraph("Perfil do Avatar Principal", self.styles["CustomHeading1"]))
+            
+            # Dynamically add all persona fields
+            for key, value in persona.items():
+                display_key = key.replace('_', ' ').title()
+                story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomBodyText"]))
             
-            story.append(Paragraph("Relatório de Arqueologia de Avatar", self.styles["CustomTitle"]))
             story.append(Spacer(1, 0.3 * inch))
-            story.append(Paragraph(f"Análise Ultra-Detalhada: {segmento}", self.styles["CustomSubtitle"]))
-            story.append(Spacer(1, 0.5 * inch))
-            story.append(Paragraph(f"Gerado em: {datetime.now().strftime('%d/%m/%Y às %H:%M')}", self.styles["CustomCaption"]))
-            story.append(PageBreak())
+        return story
 
-            story.append(Paragraph("Resumo Executivo", self.styles["CustomHeading1"]))
-            story.append(Paragraph(
-                f"Este relatório apresenta uma análise ultra-detalhada do segmento {segmento}, "
-                "utilizando inteligência artificial avançada e pesquisa em tempo real na internet. "
-                "A análise revela insights profundos sobre o avatar ideal, estratégias de marketing "
-                "e oportunidades de mercado.", 
-                self.styles["CustomBodyText"]
-            ))
+    def _section_escopo(self, data: dict) -> list:
+        """Escopo de mercado"""
+        story = []
+        escopo = data.get('escopo', {})
+        if escopo:
+            story.append(Paragraph("Escopo de Mercado", self.styles["CustomHeading1"]))
+            story.append(Paragraph(f"Segmento Principal: {escopo.get('segmento_principal', 'N/A')}", self.styles["CustomBodyText"]))
+            story.append(Paragraph(f"Produto Ideal: {escopo.get('produto_ideal', 'N/A')}", self.styles["CustomBodyText"]))
+            story.append(Paragraph(f"Proposta de Valor: {escopo.get('proposta_valor', 'N/A')}", self.styles["CustomBodyText"]))
+            
+            tamanho_mercado = escopo.get('tamanho_mercado', {})
+            if tamanho_mercado:
+                story.append(Paragraph("Tamanho do Mercado:", self.styles["CustomHeading2"]))
+                for key, value in tamanho_mercado.items():
+                    display_key = key.replace('_medio_segmento', '').replace('_', ' ').title()
+                    story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomListText"]))
+            
             story.append(Spacer(1, 0.3 * inch))
+        return story
 
-            if persona:
-                story.append(Paragraph("Perfil do Avatar Principal", self.styles["CustomHeading1"]))
-                
-                # Dynamically add all persona fields
-                for key, value in persona.items():
-                    display_key = key.replace('_', ' ').title()
-                    story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomBodyText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            escopo = data.get('escopo', {})
-            if escopo:
-                story.append(Paragraph("Escopo de Mercado", self.styles["CustomHeading1"]))
-                story.append(Paragraph(f"Segmento Principal: {escopo.get('segmento_principal', 'N/A')}", self.styles["CustomBodyText"]))
-                story.append(Paragraph(f"Produto Ideal: {escopo.get('produto_ideal', 'N/A')}", self.styles["CustomBodyText"]))
-                story.append(Paragraph(f"Proposta de Valor: {escopo.get('proposta_valor', 'N/A')}", self.styles["CustomBodyText"]))
-                
-                tamanho_mercado = escopo.get('tamanho_mercado', {})
-                if tamanho_mercado:
-                    story.append(Paragraph("Tamanho do Mercado:", self.styles["CustomHeading2"]))
-                    for key, value in tamanho_mercado.items():
-                        display_key = key.replace('_medio_segmento', '').replace('_', ' ').title()
-                        story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            dores = data.get('mapeamento_dores_ultra_detalhado', {})
-            if dores:
-                story.append(Paragraph("Mapeamento de Dores", self.styles["CustomHeading1"]))
-                
-                dores_criticas = dores.get('dores_nivel_1_criticas', [])
-                if dores_criticas:
-                    story.append(Paragraph("Dores Críticas (Nível 1):", self.styles["CustomHeading2"]))
-                    for i, dor in enumerate(dores_criticas, 1):
-                        if isinstance(dor, dict):
-                            story.append(Paragraph(f"{i}. {dor.get('dor', 'N/A')}", self.styles["CustomListText"]))
-                            story.append(Paragraph(f"   Intensidade: {dor.get('intensidade', 'N/A')} | Frequência: {dor.get('frequencia', 'N/A')}", self.styles["CustomListText"]))
-                
-                dores_nivel_2 = dores.get('dores_nivel_2', [])
-                if dores_nivel_2:
-                    story.append(Paragraph("Dores de Nível 2:", self.styles["CustomHeading2"]))
-                    for i, dor in enumerate(dores_nivel_2, 1):
-                        if isinstance(dor, dict):
-                            story.append(Paragraph(f"{i}. {dor.get('dor', 'N/A')}", self.styles["CustomListText"]))
-                            story.append(Paragraph(f"   Impacto: {dor.get('impacto', 'N/A')}", self.styles["CustomListText"]))
-                
-                dores_nivel_3 = dores.get('dores_nivel_3', [])
-                if dores_nivel_3:
-                    story.append(Paragraph("Dores de Nível 3:", self.styles["CustomHeading2"]))
-                    for i, dor in enumerate(dores_nivel_3, 1):
-                        if isinstance(dor, dict):
-                            story.append(Paragraph(f"{i}. {dor.get('dor', 'N/A')}", self.styles["CustomListText"]))
-                            story.append(Paragraph(f"   Causa Raiz: {dor.get('causa_raiz', 'N/A')}", self.styles["CustomListText"]))
-                       
-                story.append(Spacer(1, 0.3 * inch))
-
-            marketing = data.get('estrategia_palavras_chave', {})
-            if marketing:
-                story.append(Paragraph("Estratégia de Marketing", self.styles["CustomHeading1"]))
-                
-                palavras_primarias = marketing.get('palavras_primarias', [])
-                if palavras_primarias:
-                    story.append(Paragraph("Palavras-Chave Primárias:", self.styles["CustomHeading2"]))
-                    for i, palavra in enumerate(palavras_primarias, 1):
-                        if isinstance(palavra, dict):
-                            story.append(Paragraph(
-                                f"{i}. {palavra.get('termo', 'N/A')} - Volume: {palavra.get('volume_mensal', 'N/A')} - CPC: {palavra.get('cpc_estimado', 'N/A')}", 
-                                self.styles["CustomListText"]
-                            ))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            competicao = data.get('analise_concorrencia_detalhada', {})
-            if competicao:
-                story.append(Paragraph("Análise Competitiva", self.styles["CustomHeading1"]))
-                
-                concorrentes = competicao.get('concorrentes_diretos', [])
-                if concorrentes:
-                    story.append(Paragraph("Principais Concorrentes:", self.styles["CustomHeading2"]))
-                    for i, concorrente in enumerate(concorrentes, 1):
-                        if isinstance(concorrente, dict):
-                            story.append(Paragraph(f"{i}. {concorrente.get('nome', 'N/A')}", self.styles["CustomListText"]))
-                            story.append(Paragraph(f"   Preço: {concorrente.get('preco_range', 'N/A')}", self.styles["CustomListText"]))
-                            story.append(Paragraph(f"   Posicionamento: {concorrente.get('posicionamento', 'N/A')}", self.styles["CustomListText"]))
-                
-                gaps = competicao.get('gaps_oportunidades', [])
-                if gaps:
-                    story.append(Paragraph("Oportunidades de Mercado:", self.styles["CustomHeading2"]))
-                    for i, gap in enumerate(gaps, 1):
-                        story.append(Paragraph(f"{i}. {gap}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            metricas = data.get('metricas_performance_detalhadas', {})
-            if metricas:
-                story.append(Paragraph("Métricas de Performance", self.styles["CustomHeading1"]))
-                
-                benchmarks = metricas.get('benchmarks_segmento', {})
-                if benchmarks:
-                    story.append(Paragraph("Benchmarks do Segmento:", self.styles["CustomHeading2"]))
-                    for key, value in benchmarks.items():
-                        display_key = key.replace('_medio_segmento', '').replace('_', ' ').title()
-                        story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            plano_acao = data.get('plano_acao_detalhado', [])
-            if plano_acao:
-                story.append(Paragraph("Plano de Ação", self.styles["CustomHeading1"]))
-                for fase in plano_acao:
-                    if isinstance(fase, dict):
-                        story.append(Paragraph(f"{fase.get('fase', 'Fase')}", self.styles["CustomHeading2"]))
-                        story.append(Paragraph(f"Duração: {fase.get('duracao', 'N/A')}", self.styles["CustomBodyText"]))
-                        
-                        acoes = fase.get('acoes', [])
-                        if acoes:
-                            for i, acao in enumerate(acoes, 1):
-                                if isinstance(acao, dict):
-                                    story.append(Paragraph(f"{i}. {acao.get('acao', 'N/A')}", self.styles["CustomListText"]))
-                                    story.append(Paragraph(f"   Responsável: {acao.get('responsavel', 'N/A')}", self.styles["CustomListText"]))
-                                    story.append(Paragraph(f"   Prazo: {acao.get('prazo', 'N/A')}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            insights = data.get('insights_exclusivos', [])
-            if insights:
-                story.append(Paragraph("Insights Exclusivos", self.styles["CustomHeading1"]))
-                for i, insight in enumerate(insights, 1):  # Display all insights
-                    if isinstance(insight, str):
-                        story.append(Paragraph(f"{i}. {insight}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            cenarios = data.get('projecoes_cenarios', {})
-            if cenarios:
-                story.append(Paragraph("Projeções de Cenários", self.styles["CustomHeading1"]))
-                
-                for cenario_nome in ['cenario_conservador', 'cenario_realista', 'cenario_otimista']:
-                    cenario = cenarios.get(cenario_nome, {})
-                    if cenario:
-                        nome_display = cenario_nome.replace('cenario_', '').replace('_', ' ').title()
-                        story.append(Paragraph(f"Cenário {nome_display}:", self.styles["CustomHeading2"]))
-                        for key, value in cenario.items():
-                            display_key = key.replace('_', ' ').title()
-                            story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
+    def _section_dores(self, data: dict) -> list:
+        """Mapeamento de dores (níveis 1 a 3)"""
+        story = []
+        dores = data.get('mapeamento_dores_ultra_detalhado', {})
+        if dores:
+            story.append(Paragraph("Mapeamento de Dores", self.styles["CustomHeading1"]))
+            
+            dores_criticas = dores.get('dores_nivel_1_criticas', [])
+            if dores_criticas:
+                story.append(Paragraph("Dores Críticas (Nível 1):", self.styles["CustomHeading2"]))
+                for i, dor in enumerate(dores_criticas, 1):
+                    if isinstance(dor, dict):
+                        story.append(Paragraph(f"{i}. {dor.get('dor', 'N/A')}", self.styles["CustomListText"]))
+                        story.append(Paragraph(f"   Intensidade: {dor.get('intensidade', 'N/A')} | Frequência: {dor.get('frequencia', 'N/A')}", self.styles["CustomListText"]))
+            
+            dores_nivel_2 = dores.get('dores_nivel_2', [])
+            if dores_nivel_2:
+                story.append(Paragraph("Dores de Nível 2:", self.styles["CustomHeading2"]))
+                for i, dor in enumerate(dores_nivel_2, 1):
+                    if isinstance(dor, dict):
+                        story.append(Paragraph(f"{i}. {dor.get('dor', 'N/A')}", self.styles["CustomListText"]))
+                        story.append(Paragraph(f"   Impacto: {dor.get('impacto', 'N/A')}", self.styles["CustomListText"]))
+            
+            dores_nivel_3 = dores.get('dores_nivel_3', [])
+            if dores_nivel_3:
+                story.append(Paragraph("Dores de Nível 3:", self.styles["CustomHeading2"]))
+                for i, dor in enumerate(dores_nivel_3, 1):
+                    if isinstance(dor, dict):
+                        story.append(Paragraph(f"{i}. {dor.get('dor', 'N/A')}", self.styles["CustomListText"]))
+                        story.append(Paragraph(f"   Causa Raiz: {dor.get('causa_raiz', 'N/A')}", self.styles["CustomListText"]))
+                   
+            story.append(Spacer(1, 0.3 * inch))
+        return story
 
-            story.append(PageBreak())
-            story.append(Paragraph("Conclusão", self.styles["CustomHeading1"]))
-            story.append(Paragraph(
-                "Esta análise ultra-detalhada fornece uma base sólida para o desenvolvimento de "
-                "estratégias de marketing eficazes e o lançamento bem-sucedido do produto no mercado brasileiro. "
-                "Os insights apresentados foram gerados através de inteligência artificial avançada e "
-                "pesquisa em tempo real, garantindo informações atualizadas e relevantes.", 
-                self.styles["CustomBodyText"]
-            ))
+    def _section_marketing(self, data: dict) -> list:
+        """Estratégia de palavras-chave"""
+        story = []
+        marketing = data.get('estrategia_palavras_chave', {})
+        if marketing:
+            story.append(Paragraph("Estratégia de Marketing", self.styles["CustomHeading1"]))
+            
+            palavras_primarias = marketing.get('palavras_primarias', [])
+            if palavras_primarias:
+                story.append(Paragraph("Palavras-Chave Primárias:", self.styles["CustomHeading2"]))
+                for i, palavra in enumerate(palavras_primarias, 1):
+                    if isinstance(palavra, dict):
+                        story.append(Paragraph(
+                            f"{i}. {palavra.get('termo', 'N/A')} - Volume: {palavra.get('volume_mensal', 'N/A')} - CPC: {palavra.get('cpc_estimado', 'N/A')}", 
+                            self.styles["CustomListText"]
+                        ))
+            
             story.append(Spacer(1, 0.3 * inch))
-            story.append(Paragraph(
-                "Relatório gerado pela plataforma UP Lançamentos - Arqueologia do Avatar com IA", 
-                self.styles["CustomCaption"]
-            ))
+        return story
 
-            doc.build(story, onFirstPage=self._add_header_and_footer, onLaterPages=self._add_header_and_footer)
-            logger.info(f"Relatório PDF '{filename}' gerado com sucesso.")
-            return True
+    def _section_competicao(self, data: dict) -> list:
+        """Análise competitiva"""
+        story = []
+        competicao = data.get('analise_concorrencia_detalhada', {})
+        if competicao:
+            story.append(Paragraph("Análise Competitiva", self.styles["CustomHeading1"]))
             
-        except Exception as e:
-            logger.error(f"Erro ao gerar o relatório PDF: {e}")
-            return False
+            concorrentes = competicao.get('concorrentes_diretos', [])
+            if concorrentes:
+                story.append(Paragraph("Principais Concorrentes:", self.styles["CustomHeading2"]))
+                for i, concorrente in enumerate(concorrentes, 1):
+                    if isinstance(concorrente, dict):
+                        story.append(Paragraph(f"{i}. {concorrente.get('nome', 'N/A')}", self.styles["CustomListText"]))
+                        story.append(Paragraph(f"   Preço: {concorrente.get('preco_range', 'N/A')}", self.styles["CustomListText"]))
+                        story.append(Paragraph(f"   Posicionamento: {concorrente.get('posicionamento', 'N/A')}", self.styles["CustomListText"]))
+            
+            gaps = competicao.get('gaps_oportunidades', [])
+            if gaps:
+                story.append(Paragraph("Oportunidades de Mercado:", self.styles["CustomHeading2"]))
+                for i, gap in enumerate(gaps, 1):
+                    story.append(Paragraph(f"{i}. {gap}", self.styles["CustomListText"]))
+            
+            story.append(Spacer(1, 0.3 * inch))
+        return story
+
+    def _section_metricas(self, data: dict) -> list:
+        """Benchmarks de performance"""
+        story = []
+        metricas = data.get('metricas_performance_detalhadas', {})
+        if metricas:
+            story.append(Paragraph("Métricas de Performance", self.styles["CustomHeading1"]))
+            
+            benchmarks = metricas.get('benchmarks_segmento', {})
+            if benchmarks:
+                story.append(Paragraph("Benchmarks do Segmento:", self.styles["CustomHeading2"]))
+                for key, value in benchmarks.items():
+                    display_key = key.replace('_medio_segmento', '').replace('_', ' ').title()
+                    story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomListText"]))
+            
+            story.append(Spacer(1, 0.3 * inch))
+        return story
+
+    def _section_plano_acao(self, data: dict) -> list:
+        """Plano de ação por fase"""
+        story = []
+        plano_acao = data.get('plano_acao_detalhado', [])
+        if plano_acao:
+            story.append(Paragraph("Plano de Ação", self.styles["CustomHeading1"]))
+            for fase in plano_acao:
+                if isinstance(fase, dict):
+                    story.append(Paragraph(f"{fase.get('fase', 'Fase')}", self.styles["CustomHeading2"]))
+                    story.append(Paragraph(f"Duração: {fase.get('duracao', 'N/A')}", self.styles["CustomBodyText"]))
+                    
+                    acoes = fase.get('acoes', [])
+                    if acoes:
+                        for i, acao in enumerate(acoes, 1):
+                            if isinstance(acao, dict):
+                                story.append(Paragraph(f"{i}. {acao.get('acao', 'N/A')}", self.styles["CustomListText"]))
+                                story.append(Paragraph(f"   Responsável: {acao.get('responsavel', 'N/A')}", self.styles["CustomListText"]))
+                                story.append(Paragraph(f"   Prazo: {acao.get('prazo', 'N/A')}", self.styles["CustomListText"]))
+            
+            story.append(Spacer(1, 0.3 * inch))
+        return story
+
+    def _section_insights(self, data: dict) -> list:
+        """Insights exclusivos"""
+        story = []
+        insights = data.get('insights_exclusivos', [])
+        if insights:
+            story.append(Paragraph("Insights Exclusivos", self.styles["CustomHeading1"]))
+            for i, insight in enumerate(insights, 1):  # Display all insights
+                if isinstance(insight, str):
+                    story.append(Paragraph(f"{i}. {insight}", self.styles["CustomListText"]))
+            
+            story.append(Spacer(1, 0.3 * inch))
+        return story
+
+    def _section_cenarios(self, data: dict) -> list:
+        """Projeções de cenários"""
+        story = []
+        cenarios = data.get('projecoes_cenarios', {})
+        if cenarios:
+            story.append(Paragraph("Projeções de Cenários", self.styles["CustomHeading1"]))
+            
+            for cenario_nome in ['cenario_conservador', 'cenario_realista', 'cenario_otimista']:
+                cenario = cenarios.get(cenario_nome, {})
+                if cenario:
+                    nome_display = cenario_nome.replace('cenario_', '').replace('_', ' ').title()
+                    story.append(Paragraph(f"Cenário {nome_display}:", self.styles["CustomHeading2"]))
+                    for key, value in cenario.items():
+                        display_key = key.replace('_', ' ').title()
+                        story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomListText"]))
+            
+            story.append(Spacer(1, 0.3 * inch))
+        return story
+
+    def _section_conclusao(self, data: dict) -> list:
+        """Conclusão e rodapé do relatório"""
+        story = []
+        story.append(PageBreak())
+        story.append(Paragraph("Conclusão", self.styles["CustomHeading1"]))
+        story.append(Paragraph(
+            "Esta análise ultra-detalhada fornece uma base sólida para o desenvolvimento de "
+            "estratégias de marketing eficazes e o lançamento bem-sucedido do produto no mercado brasileiro. "
+            "Os insights apresentados foram gerados através de inteligência artificial avançada e "
+            "pesquisa em tempo real, garantindo informações atualizadas e relevantes.", 
+            self.styles["CustomBodyText"]
+        ))
+        story.append(Spacer(1, 0.3 * inch))
+        story.append(Paragraph(
+            "Relatório gerado pela plataforma UP Lançamentos - Arqueologia do Avatar com IA", 
+            self.styles["CustomCaption"]
+        ))
+        return story
+
+
+def generate_enhanced_pdf(report_content, parallel: Optional[bool] = None) -> io.BytesIO:
+    """
+    Renderiza o relatório em memória e retorna o BytesIO posicionado no início
+
+    Aceita o dicionário da análise ou sua serialização JSON. Relatórios
+    grandes (PDF_PARALLEL_MIN_ITEMS) são renderizados em paralelo por seção
+    quando PDF_PARALLEL_ENABLED=true.
+    """
+    if isinstance(report_content, (str, bytes)):
+        report_content = json.loads(report_content)
+    if not isinstance(report_content, dict):
+        raise ValueError("Conteúdo do relatório deve ser um objeto JSON")
+
+    if parallel is None:
+        parallel = PDF_PARALLEL_ENABLED and count_report_items(report_content) >= PDF_PARALLEL_MIN_ITEMS
+
+    buffer = io.BytesIO()
+    if parallel:
+        try:
+            render_pdf_parallel(report_content, buffer)
+            buffer.seek(0)
+            return buffer
+        except ImportError:
+            logger.warning("pypdf não instalado, renderizando PDF de forma serial")
+            buffer = io.BytesIO()
+
+    PDFReportGenerator().render(report_content, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def count_report_items(data: dict) -> int:
+    """Estimativa do tamanho do relatório (itens nas listas renderizadas)"""
+    total = 0
+    for value in data.values():
+        if isinstance(value, list):
+            total += len(value)
+        elif isinstance(value, dict):
+            total += sum(len(item) for item in value.values() if isinstance(item, (list, dict)))
+    return total
+
+
+def _get_process_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Pool de processos para renderização (criado sob demanda em cada worker)"""
+    global _process_pool, _process_pool_pid
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_pid != os.getpid():
+            # spawn: o processo web tem threads (fila de persistência, pré-render de PDFs)
+            _process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=PDF_RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _process_pool_pid = os.getpid()
+        return _process_pool
+
+
+def _render_section_group(data: dict, sections: List[str]) -> Optional[bytes]:
+    """Executado no processo filho: renderiza um grupo de seções sem numeração"""
+    buffer = io.BytesIO()
+    if not PDFReportGenerator().render(data, buffer, sections=sections, numbered=False):
+        return None
+    return buffer.getvalue()
+
+
+def _render_report_bytes(data: dict) -> bytes:
+    """Executado no processo filho: renderiza um relatório completo"""
+    buffer = io.BytesIO()
+    PDFReportGenerator().render(data, buffer)
+    return buffer.getvalue()
+
+
+def _page_number_overlay(total_pages: int) -> io.BytesIO:
+    """PDF transparente com apenas o número de cada página"""
+    buffer = io.BytesIO()
+    overlay = pdf_canvas.Canvas(buffer, pagesize=A4)
+    for page_num in range(1, total_pages + 1):
+        _draw_page_number(overlay, page_num)
+        overlay.showPage()
+    overlay.save()
+    buffer.seek(0)
+    return buffer
+
+
+def render_pdf_parallel(data: dict, output):
+    """
+    Renderiza os grupos de seções em paralelo e junta as partes com pypdf
+
+    Cada grupo começa em uma página nova. A numeração das páginas é aplicada
+    depois da junção, com uma sobreposição gerada pelo ReportLab.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    pool = _get_process_pool()
+    futures = [pool.submit(_render_section_group, data, group) for group in PARALLEL_SECTION_GROUPS]
+
+    writer = PdfWriter()
+    for future in futures:
+        part = future.result()
+        if part:
+            writer.append(PdfReader(io.BytesIO(part)))
+
+    overlay = PdfReader(_page_number_overlay(len(writer.pages)))
+    for page, stamp in zip(writer.pages, overlay.pages):
+        page.merge_page(stamp)
+
+    writer.write(output)
+
+
+def generate_batch_pdf(reports: Iterable[dict], output) -> int:
+    """
+    Relatório único com várias análises, na ordem recebida
+
+    As análises são consumidas do iterável sob demanda e renderizadas uma a
+    uma (ou no pool de processos, com uma janela limitada, quando
+    PDF_PARALLEL_ENABLED); apenas os bytes dos PDFs prontos ficam em memória,
+    nunca as stories de todas as análises. Sem o pypdf, as análises são
+    montadas em um único documento, de forma serial.
+
+    Returns:
+        Número de análises incluídas
+    """
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        logger.warning("pypdf não instalado, gerando o PDF em lote em um único documento")
+        return _render_batch_single_document(reports, output)
+
+    writer = PdfWriter()
+    count = 0
+
+    if not PDF_PARALLEL_ENABLED:
+        for report in reports:
+            writer.append(PdfReader(io.BytesIO(_render_report_bytes(report))))
+            count += 1
+        if count:
+            writer.write(output)
+        return count
+
+    pool = _get_process_pool()
+    window = PDF_RENDER_PROCESSES * 2
+    pending = collections.deque()
+
+    def append_next():
+        writer.append(PdfReader(io.BytesIO(pending.popleft().result())))
+
+    for report in reports:
+        pending.append(pool.submit(_render_report_bytes, report))
+        count += 1
+        if len(pending) >= window:
+            append_next()
+
+    while pending:
+        append_next()
+
+    if count:
+        writer.write(output)
+    return count
+
+
+def _render_batch_single_document(reports: Iterable[dict], output) -> int:
+    """Todas as análises em um só documento do ReportLab (fallback sem pypdf)"""
+    generator = PDFReportGenerator()
+    story = []
+    count = 0
+    for report in reports:
+        if story and not isinstance(story[-1], PageBreak):
+            story.append(PageBreak())
+        story.extend(generator._build_story(report))
+        count += 1
+
+    if count:
+        doc = SimpleDocTemplate(output, pagesize=A4, topMargin=inch, bottomMargin=inch)
+        doc.build(story, onFirstPage=generator._add_header_and_footer,
+                  onLaterPages=generator._add_header_and_footer)
+    return count
 
 @pdf_bp.route("/generate-pdf", methods=["POST"])
 def generate_pdf():
@@ -377,35 +723,18 @@ def generate_pdf():
         if not report_data:
             return jsonify({"error": "Dados do relatório são obrigatórios"}), 400
 
-        generator = PDFReportGenerator()
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"relatorio_arqueologia_{user_id}_{timestamp}.pdf"
         
-        temp_path = os.path.join("/tmp", filename)
-        
-        os.makedirs("/tmp", exist_ok=True)
+        # Renderização em memória: nenhum arquivo temporário em disco
+        pdf_buffer = generate_enhanced_pdf(report_data)
         
-        success = generator.generate_pdf_report(report_data, temp_path) 
-
-        if success and os.path.exists(temp_path):
-            def remove_file():
-                try:
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                except:
-                    pass
-            
-            import atexit
-            atexit.register(remove_file)
-            
-            return send_file(
-                temp_path, 
-                as_attachment=True, 
-                download_name=filename,
-                mimetype='application/pdf'
-            )
-        else:
-            return jsonify({"error": "Falha ao gerar o relatório PDF"}), 500
+        return send_file(
+            pdf_buffer, 
+            as_attachment=True, 
+            download_name=filename,
+            mimetype='application/pdf'
+        )
 
     except Exception as e:
         logger.error(f"Erro na rota de geração de PDF: {e}")
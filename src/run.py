@@ -58,6 +58,12 @@ def create_app():
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
     app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
     
+    # Serialização JSON com orjson e compressão gzip/brotli das respostas
+    from json_provider import init_json_provider
+    from compression import ResponseCompressor
+    init_json_provider(app)
+    ResponseCompressor(app)
+    
     # Configurar CORS
     cors_origins = os.getenv('CORS_ORIGINS', '*')
     if cors_origins == '*':
@@ -77,6 +83,21 @@ def create_app():
         safe_print(f"[ERROR] Erro ao importar blueprint de analise: {e}")
         sys.exit(1)
     
+    # Banco de dados: pool aquecido em segundo plano, /ready responde 503 até lá
+    from database import db_warmup, init_database
+    from routes.health import health_bp
+    app.register_blueprint(health_bp)
+    
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        try:
+            pool_settings = init_database(app, database_url)
+            safe_print(f"[INFO] Pool do banco: {pool_settings['pool_size']}+{pool_settings['max_overflow']} conexoes "
+                       f"por worker (PgBouncer: {pool_settings['pgbouncer_transaction_mode']})")
+        except Exception as e:
+            safe_print(f"[WARN] Erro na configuracao do banco de dados: {str(e)[:100]}...")
+            safe_print("[INFO] Aplicacao funcionara sem persistencia de dados")
+    
     # Rota principal
     @app.route('/')
     def index():
@@ -155,14 +176,15 @@ def create_app():
                 'timestamp': datetime.now(timezone.utc).isoformat()
             }), 500
     
-    # Rota de health check
+    # Rota de health check (liveness: responde sem tocar no banco)
     @app.route('/health')
     def health_check():
         """Health check para balanceadores de carga"""
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.now(timezone.utc).isoformat(),
-            'version': '2.0.0'
+            'version': '2.0.0',
+            'db_connection': db_warmup.state
         })
     
     # Handler de erro 404
@@ -0,0 +1,169 @@
+import json
+import uuid
+import base64
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Conjuntos de colunas para listagens (projeções)
+ANALYSIS_FIELD_SETS = {
+    'summary': ['id', 'analysis_uid', 'nicho', 'produto', 'publico', 'preco', 'status', 'created_at', 'updated_at'],
+    'inputs': ['id', 'analysis_uid', 'nicho', 'produto', 'descricao', 'preco', 'publico', 'concorrentes',
+               'dados_adicionais', 'objetivo_receita', 'orcamento_marketing', 'prazo_lancamento',
+               'user_query', 'session_id', 'status', 'created_at', 'updated_at'],
+    'results': ['id', 'analysis_uid', 'nicho', 'status', 'created_at', 'avatar_data', 'positioning_data',
+                'competition_data', 'marketing_data', 'metrics_data', 'funnel_data',
+                'market_intelligence', 'action_plan']
+}
+
+# Colunas que podem ser pedidas individualmente via ?fields=a,b,c
+ANALYSIS_COLUMNS = set(
+    ANALYSIS_FIELD_SETS['inputs'] + ANALYSIS_FIELD_SETS['results'] +
+    ['comprehensive_analysis', 'search_context_used', 'websailor_used', 'attachments_used']
+)
+
+# Colunas JSONB com índice GIN que aceitam filtros de contenção (@>)
+ANALYSIS_JSONB_SEARCH_COLUMNS = ['comprehensive_analysis', 'market_intelligence', 'action_plan']
+
+# Colunas da chave de paginação (sempre incluídas na projeção)
+KEYSET_COLUMNS = ['created_at', 'id']
+
+
+def resolve_analysis_columns(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Resolve o parâmetro ?fields= em uma lista de colunas
+
+    Aceita o nome de um conjunto (summary, inputs, results, full) ou uma lista
+    separada por vírgulas. Retorna None para 'full' (select *) e lança
+    ValueError para colunas desconhecidas.
+    """
+    fields = (fields or 'summary').strip()
+    if fields == 'full':
+        return None
+    if fields in ANALYSIS_FIELD_SETS:
+        columns = list(ANALYSIS_FIELD_SETS[fields])
+    else:
+        columns = [column.strip() for column in fields.split(',') if column.strip()]
+        unknown = [column for column in columns if column not in ANALYSIS_COLUMNS]
+        if unknown:
+            raise ValueError(f"Campos desconhecidos: {', '.join(unknown)}")
+
+    for column in KEYSET_COLUMNS:
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def encode_keyset_cursor(row: Dict) -> str:
+    """Cursor opaco com (created_at, id) da última linha da página"""
+    raw = json.dumps([row['created_at'], row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_keyset_cursor(cursor: str) -> Tuple[str, int]:
+    """Decodifica o cursor; lança ValueError se for inválido"""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {e}")
+
+
+def safe_float_conversion(value: Any, default: Optional[float] = None) -> Optional[float]:
+    """Converte valores do formulário (aceita vírgula decimal) para float"""
+    if value is None or value == '':
+        return default
+    try:
+        return float(str(value).replace(',', '.'))
+    except (ValueError, TypeError):
+        return default
+
+
+def _text(data: Dict, *keys: str) -> str:
+    for key in keys:
+        value = data.get(key)
+        if value not in (None, ''):
+            return str(value).strip()
+    return ''
+
+
+def normalize_analysis_input(data: Dict) -> Dict:
+    """
+    Normaliza os dados de entrada de uma análise (formulário, lote ou CLI)
+
+    Aceita tanto 'segmento' quanto 'nicho' e os nomes camelCase do formulário.
+    Gera o analysis_uid usado como chave de persistência.
+    """
+    analysis_data = {
+        'segmento': _text(data, 'segmento', 'nicho'),
+        'produto': _text(data, 'produto'),
+        'descricao': _text(data, 'descricao'),
+        'preco': data.get('preco', ''),
+        'publico': _text(data, 'publico'),
+        'concorrentes': _text(data, 'concorrentes'),
+        'dados_adicionais': _text(data, 'dadosAdicionais', 'dados_adicionais'),
+        'objetivo_receita': data.get('objetivoReceita', data.get('objetivo_receita', '')),
+        'prazo_lancamento': data.get('prazoLancamento', data.get('prazo_lancamento', '')),
+        'orcamento_marketing': data.get('orcamentoMarketing', data.get('orcamento_marketing', '')),
+        'user_query': _text(data, 'query', 'user_query'),
+        'session_id': data.get('session_id') or str(uuid.uuid4()),
+        'analysis_uid': data.get('analysis_uid') or str(uuid.uuid4()),
+        'created_at': datetime.now(timezone.utc).isoformat()
+    }
+
+    analysis_data['preco_float'] = safe_float_conversion(analysis_data['preco'], 997.0)
+    analysis_data['objetivo_receita_float'] = safe_float_conversion(analysis_data['objetivo_receita'], 100000.0)
+    analysis_data['orcamento_marketing_float'] = safe_float_conversion(analysis_data['orcamento_marketing'], 50000.0)
+
+    return analysis_data
+
+
+def build_initial_record(data: Dict) -> Dict:
+    """Linha da tabela analyses para uma análise em processamento"""
+    record = {
+        'analysis_uid': data['analysis_uid'],
+        'nicho': data['segmento'],  # Manter compatibilidade com schema
+        'produto': data['produto'],
+        'descricao': data['descricao'],
+        'preco': data['preco_float'],
+        'publico': data['publico'],
+        'concorrentes': data['concorrentes'],
+        'dados_adicionais': data['dados_adicionais'],
+        'objetivo_receita': data['objetivo_receita_float'],
+        'orcamento_marketing': data['orcamento_marketing_float'],
+        'prazo_lancamento': data['prazo_lancamento'],
+        'user_query': data.get('user_query', ''),
+        'session_id': data.get('session_id', ''),
+        'status': 'processing',
+        'created_at': data['created_at']
+    }
+    if data.get('embedding'):
+        record['embedding'] = data['embedding']
+    return record
+
+
+def build_completed_record(data: Dict, results: Dict) -> Dict:
+    """
+    Linha completa da tabela analyses com os resultados
+
+    Inclui também as colunas iniciais: o upsert precisa de uma linha válida
+    (nicho é NOT NULL) mesmo quando a gravação inicial ainda não foi feita.
+    """
+    record = build_initial_record(data)
+    record.update({
+        'avatar_data': results.get('avatar_ultra_detalhado', {}),
+        'positioning_data': results.get('escopo', {}),
+        'competition_data': results.get('analise_concorrencia_detalhada', {}),
+        'marketing_data': results.get('estrategia_palavras_chave', {}),
+        'metrics_data': results.get('metricas_performance_detalhadas', {}),
+        'funnel_data': results.get('projecoes_cenarios', {}),
+        'market_intelligence': results.get('inteligencia_mercado', {}),
+        'action_plan': results.get('plano_acao_detalhado', {}),
+        'comprehensive_analysis': results,  # Análise completa
+        'search_context_used': results.get('search_context_used', False),
+        'websailor_used': results.get('websailor_used', False),
+        'attachments_used': results.get('attachments_used', False),
+        'status': 'completed',
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    })
+    return record
@@ -0,0 +1,399 @@
+import os
+import re
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Colunas JSONB da tabela analyses (dict/list gravados como JSON)
+ANALYSIS_JSONB_COLUMNS = {
+    'avatar_data', 'positioning_data', 'competition_data', 'marketing_data', 'metrics_data',
+    'funnel_data', 'market_intelligence', 'action_plan', 'comprehensive_analysis'
+}
+
+
+# Maior valor da coluna id (integer)
+MAX_INTEGER_ID = 2 ** 31 - 1
+
+
+def _id_filter(analysis_id: str) -> Optional[Tuple[str, str]]:
+    """
+    Coluna e valor normalizado para buscar uma análise pelo identificador
+
+    Números vão para id e UUIDs para analysis_uid. Qualquer outro valor
+    (ou número fora da faixa de integer) retorna None, e os dois backends
+    respondem "não encontrada" sem consultar o banco.
+    """
+    value = str(analysis_id).strip()
+    if value.isascii() and value.isdigit():
+        return ('id', str(int(value))) if 0 < int(value) <= MAX_INTEGER_ID else None
+    try:
+        return 'analysis_uid', str(uuid.UUID(value))
+    except ValueError:
+        return None
+
+
+class SupabaseAnalysisRepository:
+    """Acesso à tabela analyses via PostgREST (cliente Supabase)"""
+
+    backend = 'supabase'
+
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, rows: List[Dict], conflict_column: str = 'analysis_uid'):
+        self.client.table('analyses').upsert(rows, on_conflict=conflict_column).execute()
+
+    def list_page(self, columns: Optional[List[str]], limit: int,
+                  keyset: Optional[Tuple[str, int]] = None, segmento: Optional[str] = None) -> List[Dict]:
+        query = self.client.table('analyses').select(','.join(columns) if columns else '*')
+
+        if segmento:
+            query = query.eq('nicho', segmento)  # Campo no DB ainda é 'nicho'
+
+        if keyset:
+            created_at, last_id = keyset
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})'
+            )
+
+        return query.order('created_at', desc=True).order('id', desc=True).limit(limit).execute().data
+
+    def search(self, columns: Optional[List[str]], limit: int, text_query: str = '',
+               containment: Optional[Dict[str, Any]] = None, segmento: Optional[str] = None) -> List[Dict]:
+        query = self.client.table('analyses').select(','.join(columns) if columns else '*')
+
+        # filter() mantém o builder encadeável (text_search() do postgrest
+        # 0.10 devolve um builder sem contains/eq/order)
+        if text_query:
+            query = query.filter('search_vector', 'wfts(portuguese)', text_query)
+        for column, value in (containment or {}).items():
+            # JSON em vez de contains(): listas virariam um array do Postgres
+            query = query.filter(column, 'cs', json.dumps(value, ensure_ascii=False))
+        if segmento:
+            query = query.eq('nicho', segmento)
+
+        return query.order('created_at', desc=True).limit(limit).execute().data
+
+    def get(self, analysis_id: str, columns: Optional[List[str]] = None) -> Optional[Dict]:
+        id_filter = _id_filter(analysis_id)
+        if id_filter is None:
+            return None
+        result = self.client.table('analyses').select(','.join(columns) if columns else '*') \
+            .eq(*id_filter).limit(1).execute()
+        return result.data[0] if result.data else None
+
+    def get_completed_report(self, analysis_id: str) -> Optional[Dict]:
+        id_filter = _id_filter(analysis_id)
+        if id_filter is None:
+            return None
+        result = self.client.table('analyses').select('comprehensive_analysis') \
+            .eq(*id_filter).eq('status', 'completed').limit(1).execute()
+        return result.data[0].get('comprehensive_analysis') if result.data else None
+
+    def list_segmentos(self, prefix: str, limit: int) -> List[str]:
+        try:
+            query = self.client.table('analysis_segmentos').select('nicho')
+            if prefix:
+                query = query.like('nicho_busca', f'{_escape_like(prefix)}%')
+            result = query.order('nicho').limit(limit).execute()
+            return [item['nicho'] for item in result.data]
+        except Exception as e:
+            # Banco ainda sem a migração da tabela de segmentos
+            logger.warning(f"Tabela analysis_segmentos indisponivel, usando consulta completa: {e}")
+            result = self.client.table('analyses').select('nicho').execute()
+            segmentos = sorted(set(
+                item['nicho'] for item in result.data
+                if item['nicho'] and item['nicho'].lower().startswith(prefix)
+            ))
+            return segmentos[:limit]
+
+    def get_stats(self) -> Dict:
+        return {'backend': self.backend}
+
+
+class PostgresAnalysisRepository:
+    """
+    Acesso direto à tabela analyses via psycopg2 (DATABASE_URL)
+
+    Evita o HTTP e a serialização JSON do PostgREST nas consultas mais
+    frequentes. As conexões ficam em um ThreadedConnectionPool por processo
+    (criado no primeiro uso) e as consultas de leitura são preparadas uma vez
+    por conexão (PREPARE/EXECUTE). Com DB_PGBOUNCER_TRANSACTION_MODE=true os
+    statements preparados ficam desligados, pois o PgBouncer troca a conexão
+    do servidor a cada transação. As linhas têm o mesmo formato das do
+    Supabase (datas em ISO 8601, numéricos como float, UUIDs como texto).
+    """
+
+    backend = 'postgres'
+
+    def __init__(self, dsn: str, pool_size: Optional[int] = None,
+                 checkout_timeout: Optional[float] = None, use_prepared: Optional[bool] = None):
+        import psycopg2.extras
+        import psycopg2.pool
+
+        self._extras = psycopg2.extras
+        self._pool_module = psycopg2.pool
+        self._errors = (psycopg2.OperationalError, psycopg2.InterfaceError)
+        self.dsn = dsn
+        if pool_size is None:
+            # Fatia do orçamento de conexões do worker (DB_CONNECTION_BUDGET)
+            from db_pool import compute_pool_settings
+            pool_size = compute_pool_settings()['analysis_repository_pool_size']
+        self.pool_size = max(1, pool_size)
+        self.checkout_timeout = checkout_timeout or float(os.getenv('DB_POOL_TIMEOUT', 10))
+        if use_prepared is None:
+            use_prepared = os.getenv('DB_PGBOUNCER_TRANSACTION_MODE', 'false').lower() != 'true'
+        self.use_prepared = use_prepared
+
+        self._pool = None
+        self._pool_pid: Optional[int] = None
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._lock = threading.Lock()
+        self._prepared: Dict[int, set] = {}
+        self._stats = {'queries': 0, 'prepared': 0, 'errors': 0, 'discarded_connections': 0}
+
+    def _get_pool(self):
+        # Criado sob demanda e por processo: não conecta no boot nem
+        # compartilha sockets entre workers do gunicorn
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    # minconn == maxconn: o pool do psycopg2 fecha as conexões
+                    # devolvidas acima de minconn
+                    self._pool = self._pool_module.ThreadedConnectionPool(
+                        self.pool_size, self.pool_size, dsn=self.dsn,
+                        connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', 10)),
+                        application_name='ARQV2_Gemini_App'
+                    )
+                    self._pool_pid = os.getpid()
+                    self._prepared = {}
+        return self._pool
+
+    @contextmanager
+    def _connection(self):
+        """Conexão do pool (limitada a pool_size, com espera até checkout_timeout)"""
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise TimeoutError(f"Nenhuma conexao livre em {self.checkout_timeout}s")
+
+        try:
+            pool = self._get_pool()
+            connection = pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        discard = False
+        try:
+            connection.autocommit = True
+            yield connection
+            with self._lock:
+                self._stats['queries'] += 1
+        except self._errors:
+            # Conexão quebrada: fechar em vez de devolver ao pool
+            discard = True
+            with self._lock:
+                self._stats['errors'] += 1
+                self._stats['discarded_connections'] += 1
+                self._prepared.pop(id(connection), None)
+            raise
+        except Exception:
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            pool.putconn(connection, close=discard)
+            self._slots.release()
+
+    def _run(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        """Executa uma consulta de leitura (preparada quando possível)"""
+        with self._connection() as connection:
+            with connection.cursor(cursor_factory=self._extras.RealDictCursor) as cursor:
+                if self.use_prepared:
+                    name = self._prepare(connection, cursor, sql)
+                    if params:
+                        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+                    else:
+                        cursor.execute(f"EXECUTE {name}")
+                else:
+                    cursor.execute(re.sub(r'\$\d+', '%s', sql), params)
+                rows = cursor.fetchall()
+        return [self._to_row(row) for row in rows]
+
+    def _prepare(self, connection, cursor, sql: str) -> str:
+        name = 'arqv_' + hashlib.md5(sql.encode('utf-8')).hexdigest()[:16]
+        with self._lock:
+            prepared = self._prepared.setdefault(id(connection), set())
+            if name in prepared:
+                return name
+        cursor.execute(f"PREPARE {name} AS {sql}")
+        with self._lock:
+            prepared.add(name)
+            self._stats['prepared'] += 1
+        return name
+
+    @staticmethod
+    def _to_row(row: Dict) -> Dict:
+        # Mesmos tipos que o PostgREST devolve em JSON
+        converted = {}
+        for key, value in row.items():
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = float(value)
+            elif isinstance(value, uuid.UUID):
+                value = str(value)
+            converted[key] = value
+        return converted
+
+    @staticmethod
+    def _select(columns: Optional[List[str]]) -> str:
+        # As colunas já foram validadas por resolve_analysis_columns
+        return ', '.join(f'"{column}"' for column in columns) if columns else '*'
+
+    def _adapt(self, column: str, value: Any) -> Any:
+        if column == 'embedding' and isinstance(value, list):
+            return '[' + ','.join(str(float(item)) for item in value) + ']'
+        if column in ANALYSIS_JSONB_COLUMNS or isinstance(value, (dict, list)):
+            return self._extras.Json(value)
+        return value
+
+    def upsert(self, rows: List[Dict], conflict_column: str = 'analysis_uid'):
+        # Mesma semântica do upsert do PostgREST: atualiza as colunas enviadas
+        groups: Dict[tuple, List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        for columns, group in groups.items():
+            column_list = ', '.join(f'"{column}"' for column in columns)
+            updates = ', '.join(f'"{column}" = EXCLUDED."{column}"' for column in columns if column != conflict_column)
+            sql = (f'INSERT INTO analyses ({column_list}) VALUES %s '
+                   f'ON CONFLICT ("{conflict_column}") DO UPDATE SET {updates}')
+            values = [tuple(self._adapt(column, row[column]) for column in columns) for row in group]
+
+            with self._connection() as connection:
+                with connection.cursor() as cursor:
+                    self._extras.execute_values(cursor, sql, values, page_size=100)
+
+    def list_page(self, columns: Optional[List[str]], limit: int,
+                  keyset: Optional[Tuple[str, int]] = None, segmento: Optional[str] = None) -> List[Dict]:
+        conditions, params = [], []
+        if segmento:
+            params.append(segmento)
+            conditions.append(f'nicho = ${len(params)}')
+        if keyset:
+            params.extend(keyset)
+            conditions.append(f'(created_at, id) < (${len(params) - 1}::timestamptz, ${len(params)}::integer)')
+        params.append(limit)
+
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+        sql = (f'SELECT {self._select(columns)} FROM analyses {where}'
+               f'ORDER BY created_at DESC, id DESC LIMIT ${len(params)}')
+        return self._run(sql, tuple(params))
+
+    def search(self, columns: Optional[List[str]], limit: int, text_query: str = '',
+               containment: Optional[Dict[str, Any]] = None, segmento: Optional[str] = None) -> List[Dict]:
+        conditions, params = [], []
+        if text_query:
+            params.append(text_query)
+            conditions.append(f"search_vector @@ websearch_to_tsquery('portuguese', ${len(params)})")
+        for column, value in (containment or {}).items():
+            # Colunas já validadas contra ANALYSIS_JSONB_SEARCH_COLUMNS
+            params.append(json.dumps(value, ensure_ascii=False))
+            conditions.append(f'"{column}" @> ${len(params)}::jsonb')
+        if segmento:
+            params.append(segmento)
+            conditions.append(f'nicho = ${len(params)}')
+        params.append(limit)
+
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+        sql = (f'SELECT {self._select(columns)} FROM analyses {where}'
+               f'ORDER BY created_at DESC LIMIT ${len(params)}')
+        return self._run(sql, tuple(params))
+
+    def get(self, analysis_id: str, columns: Optional[List[str]] = None) -> Optional[Dict]:
+        id_filter = _id_filter(analysis_id)
+        if id_filter is None:
+            return None
+        id_column, value = id_filter
+        cast = 'integer' if id_column == 'id' else 'uuid'
+        rows = self._run(
+            f'SELECT {self._select(columns)} FROM analyses WHERE {id_column} = $1::{cast} LIMIT 1',
+            (value,)
+        )
+        return rows[0] if rows else None
+
+    def get_completed_report(self, analysis_id: str) -> Optional[Dict]:
+        row = self.get(analysis_id, ['comprehensive_analysis', 'status'])
+        if not row or row['status'] != 'completed':
+            return None
+        return row.get('comprehensive_analysis')
+
+    def list_segmentos(self, prefix: str, limit: int) -> List[str]:
+        pattern = f'{_escape_like(prefix)}%'
+        try:
+            rows = self._run(
+                "SELECT nicho FROM analysis_segmentos WHERE nicho_busca LIKE $1 ESCAPE '\\' "
+                "ORDER BY nicho LIMIT $2",
+                (pattern, limit)
+            )
+        except Exception as e:
+            if type(e).__name__ != 'UndefinedTable':
+                raise
+            # Banco ainda sem a migração da tabela de segmentos
+            logger.warning(f"Tabela analysis_segmentos indisponivel, usando consulta completa: {e}")
+            rows = self._run(
+                "SELECT DISTINCT nicho FROM analyses WHERE lower(nicho) LIKE $1 ESCAPE '\\' "
+                "ORDER BY nicho LIMIT $2",
+                (pattern, limit)
+            )
+        return [row['nicho'] for row in rows]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                'backend': self.backend,
+                'pool_size': self.pool_size,
+                'prepared_statements': self.use_prepared,
+                'pool_open': self._pool is not None and self._pool_pid == os.getpid()
+            }
+
+
+def _escape_like(prefix: str) -> str:
+    # Escapar curingas do LIKE digitados pelo usuário
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def create_analysis_repository(supabase_client=None):
+    """
+    Repositório de análises escolhido por ANALYSIS_REPOSITORY
+
+    'supabase' (padrão) usa o cliente PostgREST; 'postgres' usa DATABASE_URL
+    diretamente e recorre ao Supabase se o psycopg2 ou a URL não estiverem
+    disponíveis. Retorna None sem nenhum banco configurado.
+    """
+    backend = os.getenv('ANALYSIS_REPOSITORY', 'supabase').lower()
+
+    if backend == 'postgres':
+        dsn = os.getenv('DATABASE_URL')
+        if dsn:
+            try:
+                repository = PostgresAnalysisRepository(dsn)
+                logger.info("Repositorio de analises: Postgres direto")
+                return repository
+            except ImportError as e:
+                logger.error(f"psycopg2 indisponivel, usando Supabase: {e}")
+        else:
+            logger.warning("ANALYSIS_REPOSITORY=postgres sem DATABASE_URL, usando Supabase")
+
+    if supabase_client is not None:
+        return SupabaseAnalysisRepository(supabase_client)
+    return None
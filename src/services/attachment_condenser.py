@@ -0,0 +1,140 @@
+import os
+import logging
+import threading
+import concurrent.futures
+from typing import Callable, Dict, List, Optional
+
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def split_into_chunks(text: str, chunk_chars: int) -> List[str]:
+    """Divide o texto em blocos de até chunk_chars, preferindo quebras de parágrafo e de linha"""
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_chars)
+        if end < len(text):
+            # Recuar até a última quebra na segunda metade do bloco
+            for separator in ('\n\n', '\n', '. '):
+                cut = text.rfind(separator, start + chunk_chars // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+    return chunks
+
+
+class AttachmentCondenser:
+    """
+    Condensação map-reduce de anexos grandes antes da análise
+
+    Conteúdos acima do limite são divididos em blocos, resumidos em paralelo
+    (no máximo max_workers chamadas simultâneas ao modelo) e os resumos são
+    combinados em níveis, fan_in por vez, até caberem em max_chars. O
+    resultado fica em cache pelo SHA-256 do anexo, então cada documento é
+    condensado uma vez. Se um resumo falhar, o início do bloco é usado no
+    lugar, para nunca perder o anexo inteiro.
+    """
+
+    def __init__(self,
+                 summarize_fn: Callable[[str, int], str],
+                 threshold: Optional[int] = None,
+                 chunk_chars: Optional[int] = None,
+                 max_chars: Optional[int] = None,
+                 fan_in: Optional[int] = None,
+                 max_workers: Optional[int] = None):
+        self.summarize_fn = summarize_fn
+        self.threshold = threshold or int(os.getenv('ATTACHMENT_CONDENSE_THRESHOLD', 12000))
+        self.chunk_chars = chunk_chars or int(os.getenv('ATTACHMENT_CHUNK_CHARS', 8000))
+        self.max_chars = max_chars or int(os.getenv('ATTACHMENT_CONDENSED_MAX_CHARS', 4000))
+        self.fan_in = max(2, fan_in or int(os.getenv('ATTACHMENT_MERGE_FAN_IN', 4)))
+        self.max_workers = max_workers or int(os.getenv('ATTACHMENT_SUMMARY_WORKERS', 4))
+        self.enabled = os.getenv('ATTACHMENT_CONDENSE_ENABLED', 'true').lower() == 'true'
+
+        self.cache = TTLCache(ttl=float(os.getenv('ATTACHMENT_CONDENSE_CACHE_TTL', 86400)), max_entries=256)
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._stats = {'condensed': 0, 'summaries': 0, 'failed_summaries': 0, 'merge_levels': 0}
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        # Um pool por processo (workers do gunicorn após o fork)
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='attachment-summary'
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def condense(self, content: str, content_hash: Optional[str] = None) -> str:
+        """Versão do conteúdo com no máximo max_chars (o original se já couber)"""
+        if not self.enabled or len(content) <= self.threshold:
+            return content
+
+        cache_key = (content_hash, self.max_chars) if content_hash else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        chunks = split_into_chunks(content, self.chunk_chars)
+        # Map: cada bloco vira um resumo proporcional à sua fatia do limite final
+        target = max(500, self.max_chars * self.fan_in // max(len(chunks), 1))
+        summaries = self._summarize_all(chunks, min(target, self.chunk_chars // 2))
+
+        # Reduce: combinar fan_in resumos por vez até caber no limite
+        levels = 0
+        while len(summaries) > 1 and len('\n\n'.join(summaries)) > self.max_chars:
+            groups = ['\n\n'.join(summaries[i:i + self.fan_in]) for i in range(0, len(summaries), self.fan_in)]
+            group_target = max(500, self.max_chars // len(groups))
+            summaries = self._summarize_all(groups, group_target)
+            levels += 1
+
+        condensed = '\n\n'.join(summaries)
+        if len(condensed) > self.max_chars:
+            condensed = condensed[:self.max_chars]
+
+        with self._lock:
+            self._stats['condensed'] += 1
+            self._stats['merge_levels'] += levels
+        logger.info(f"Anexo condensado: {len(content)} -> {len(condensed)} caracteres "
+                    f"({len(chunks)} blocos, {levels} niveis de combinacao)")
+
+        if cache_key:
+            self.cache.set(cache_key, condensed)
+        return condensed
+
+    def _summarize_all(self, texts: List[str], max_chars: int) -> List[str]:
+        executor = self._get_executor()
+        futures = [executor.submit(self._summarize, text, max_chars) for text in texts]
+        return [future.result() for future in futures]
+
+    def _summarize(self, text: str, max_chars: int) -> str:
+        try:
+            summary = self.summarize_fn(text, max_chars)
+            if summary:
+                with self._lock:
+                    self._stats['summaries'] += 1
+                return summary[:max_chars]
+        except Exception as e:
+            logger.warning(f"Falha ao resumir bloco de anexo ({len(text)} caracteres): {e}")
+        with self._lock:
+            self._stats['failed_summaries'] += 1
+        return text[:max_chars]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            'cache': self.cache.get_stats(),
+            'threshold': self.threshold,
+            'max_chars': self.max_chars,
+            'enabled': self.enabled
+        }
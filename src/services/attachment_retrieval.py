@@ -0,0 +1,110 @@
+import os
+import re
+import math
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from services.attachment_condenser import split_into_chunks
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+# Palavras muito frequentes que não ajudam a ranquear blocos
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'no', 'na', 'nos', 'nas',
+    'um', 'uma', 'uns', 'umas', 'para', 'por', 'com', 'sem', 'que', 'se', 'ao', 'aos', 'ou',
+    'mais', 'como', 'sua', 'seu', 'suas', 'seus', 'ser', 'sao', 'esta', 'este', 'isso', 'nao',
+    'the', 'of', 'and', 'to', 'in', 'for', 'is', 'on'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos em minúsculas e sem acentos (busca 'publico' encontra 'Público')"""
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    normalized = ''.join(char for char in normalized if not unicodedata.combining(char))
+    return [token for token in _TOKEN_PATTERN.findall(normalized) if len(token) > 1 and token not in STOPWORDS]
+
+
+def build_query(analysis_data: Dict) -> str:
+    """Consulta de recuperação a partir do formulário da análise"""
+    return ' '.join(
+        str(analysis_data.get(key) or '') for key in ('segmento', 'produto', 'publico')
+    ).strip()
+
+
+class ChunkIndex:
+    """Índice invertido dos blocos de um anexo (construído uma vez, no upload)"""
+
+    def __init__(self, content: str, chunk_chars: int):
+        self.chunks = split_into_chunks(content, chunk_chars)
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for position, chunk in enumerate(self.chunks):
+            terms = Counter(tokenize(chunk))
+            self.lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                self.postings.setdefault(term, []).append((position, frequency))
+
+
+class AttachmentRetriever:
+    """
+    Recuperação lexical (BM25) de blocos dos anexos de uma sessão
+
+    Cada anexo é dividido em blocos e indexado no upload. Na análise, a
+    consulta (segmento, produto, público) pontua apenas os blocos que contêm
+    seus termos, usando as estatísticas (df, tamanho médio) de todos os blocos
+    da sessão, e os melhores blocos entram no prompt até max_chars, na ordem
+    original de cada anexo. O custo é proporcional aos termos da consulta,
+    não ao tamanho dos anexos.
+    """
+
+    def __init__(self, chunk_chars: Optional[int] = None, k1: float = 1.5, b: float = 0.75):
+        self.chunk_chars = chunk_chars or int(os.getenv('ATTACHMENT_RETRIEVAL_CHUNK_CHARS', 1200))
+        self.k1 = k1
+        self.b = b
+        self.enabled = os.getenv('ATTACHMENT_RETRIEVAL_ENABLED', 'true').lower() == 'true'
+
+    def build_index(self, content: str) -> ChunkIndex:
+        return ChunkIndex(content, self.chunk_chars)
+
+    def retrieve(self, indexes: List[ChunkIndex], query: str, max_chars: int) -> List[Tuple[int, int, float]]:
+        """
+        Blocos mais relevantes para a consulta dentro do limite de caracteres
+
+        Returns:
+            Lista de (índice do anexo, posição do bloco, score), ordenada por
+            anexo e posição
+        """
+        terms = set(tokenize(query))
+        total_chunks = sum(len(index.chunks) for index in indexes)
+        if not terms or not total_chunks:
+            return []
+
+        average_length = sum(sum(index.lengths) for index in indexes) / total_chunks or 1.0
+        scores: Dict[Tuple[int, int], float] = {}
+
+        for term in terms:
+            document_frequency = sum(len(index.postings.get(term, ())) for index in indexes)
+            if not document_frequency:
+                continue
+            idf = math.log(1 + (total_chunks - document_frequency + 0.5) / (document_frequency + 0.5))
+
+            for attachment_position, index in enumerate(indexes):
+                for chunk_position, frequency in index.postings.get(term, ()):
+                    length = index.lengths[chunk_position]
+                    norm = frequency + self.k1 * (1 - self.b + self.b * length / average_length)
+                    key = (attachment_position, chunk_position)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / norm
+
+        selected = []
+        used_chars = 0
+        for (attachment_position, chunk_position), score in sorted(
+                scores.items(), key=lambda item: item[1], reverse=True):
+            size = len(indexes[attachment_position].chunks[chunk_position])
+            if used_chars + size > max_chars:
+                continue
+            selected.append((attachment_position, chunk_position, score))
+            used_chars += size
+
+        return sorted(selected)
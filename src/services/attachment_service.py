@@ -9,24 +9,64 @@ from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 import mimetypes
 import tempfile
-import shutil
+import threading
+import time
+from services.ttl_cache import TTLCache
+from services.attachment_retrieval import AttachmentRetriever, ChunkIndex
 
 logger = logging.getLogger(__name__)
 
+# Versão do formato das extrações em cache (invalida sidecars antigos)
+EXTRACTION_CACHE_VERSION = 2
+
+
+class ExtractionError(Exception):
+    """Falha ao extrair o conteúdo de um anexo (biblioteca ausente ou arquivo inválido)"""
+
+
 class AttachmentService:
-    """Serviço para processamento e análise de anexos"""
+    """
+    Serviço para processamento e análise de anexos
     
-    def __init__(self):
+    Os arquivos são armazenados uma única vez, endereçados pelo SHA-256 do
+    conteúdo (calculado enquanto o upload é gravado em disco), e as sessões
+    guardam apenas referências. O resultado da extração (conteúdo, tipo e
+    metadados) fica em cache pelo hash, em memória e em um arquivo JSON ao
+    lado do blob (compartilhado entre os workers): reenviar o mesmo arquivo
+    em outra sessão não o processa de novo.
+    """
+    
+    CHUNK_SIZE = 64 * 1024
+    
+    def __init__(self, condenser=None, retriever: Optional[AttachmentRetriever] = None):
         self.upload_folder = os.path.join(tempfile.gettempdir(), 'arqv30_attachments')
+        self.blob_folder = os.path.join(self.upload_folder, 'blobs')
         self.max_file_size = 10 * 1024 * 1024  # 10MB
         self.allowed_extensions = {
             'txt', 'pdf', 'doc', 'docx', 'json', 'csv', 'xlsx', 'xls'
         }
         self.session_storage = {}  # Armazenamento em memória para sessões
         self.session_ttl = timedelta(hours=24)  # TTL de 24 horas para sessões
+        self._lock = threading.Lock()
+        
+        # Resultados de extração por (sha256, extensão, tipo inicial)
+        self.extraction_cache = TTLCache(
+            ttl=self.session_ttl.total_seconds(),
+            max_entries=int(os.getenv('ATTACHMENT_EXTRACTION_CACHE_SIZE', 256))
+        )
+        self._stats = {'uploads': 0, 'deduplicated_blobs': 0, 'extractions': 0}
+        
+        # Condensação map-reduce de anexos grandes (AttachmentCondenser)
+        self.condenser = condenser
+        self.context_max_chars = int(os.getenv('ATTACHMENTS_CONTEXT_MAX_CHARS', 16000))
+        
+        # Índice BM25 dos blocos de cada anexo, por sha256 (fora do dicionário
+        # do anexo, que é devolvido em JSON por /session_attachments)
+        self.retriever = retriever or AttachmentRetriever()
+        self.chunk_indexes = TTLCache(ttl=self.session_ttl.total_seconds(), max_entries=256)
         
         # Criar diretório de upload se não existir
-        os.makedirs(self.upload_folder, exist_ok=True)
+        os.makedirs(self.blob_folder, exist_ok=True)
         
         # Limpar arquivos antigos na inicialização
         self._cleanup_old_files()
@@ -55,47 +95,67 @@ class AttachmentService:
                     'error': validation_result['error']
                 }
             
-            # Salvar arquivo temporariamente
-            file_info = self._save_temp_file(file, session_id)
+            # Gravar o arquivo no armazenamento endereçado por conteúdo
+            file_info = self._store_blob(file)
             if not file_info:
                 return {
                     'success': False,
                     'error': 'Erro ao salvar arquivo temporário'
                 }
             
-            # Analisar conteúdo do arquivo
-            content_analysis = self._analyze_file_content(file_info)
+            # Mesmo arquivo já enviado nesta sessão: reaproveitar o anexo
+            for existing in self.get_session_attachments(session_id):
+                if existing.get('sha256') == file_info['sha256']:
+                    return {
+                        'success': True,
+                        'attachment_id': existing['attachment_id'],
+                        'content_type': existing['content_type'],
+                        'content_preview': self._preview(existing['extracted_content']),
+                        'cached': True
+                    }
+            
+            # Analisar conteúdo do arquivo (ou reutilizar a extração pelo hash)
+            content_analysis, cached = self._get_content_analysis(file_info)
             
-            # Armazenar informações da sessão
+            # Armazenar informações da sessão (referência ao blob)
             attachment_data = {
                 'attachment_id': file_info['attachment_id'],
                 'original_filename': file_info['original_filename'],
+                'sha256': file_info['sha256'],
                 'file_path': file_info['file_path'],
                 'file_size': file_info['file_size'],
                 'mime_type': file_info['mime_type'],
                 'content_type': content_analysis['content_type'],
                 'extracted_content': content_analysis['content'],
                 'metadata': content_analysis['metadata'],
+                'extraction_failed': content_analysis.get('extraction_failed', False),
                 'uploaded_at': datetime.utcnow().isoformat(),
                 'session_id': session_id
             }
             
-            # Adicionar à sessão
-            if session_id not in self.session_storage:
-                self.session_storage[session_id] = {
-                    'created_at': datetime.utcnow(),
-                    'attachments': []
-                }
+            # Indexar os blocos no upload para a recuperação na análise
+            if self.retriever.enabled:
+                self._get_chunk_index(attachment_data)
             
-            self.session_storage[session_id]['attachments'].append(attachment_data)
+            # Adicionar à sessão
+            with self._lock:
+                if session_id not in self.session_storage:
+                    self.session_storage[session_id] = {
+                        'created_at': datetime.utcnow(),
+                        'attachments': []
+                    }
+                
+                self.session_storage[session_id]['attachments'].append(attachment_data)
             
-            logger.info(f"Anexo processado: {file.filename} (Tipo: {content_analysis['content_type']})")
+            logger.info(f"Anexo processado: {file.filename} (Tipo: {content_analysis['content_type']}, "
+                        f"{'cache' if cached else 'extraido'})")
             
             return {
                 'success': True,
                 'attachment_id': file_info['attachment_id'],
                 'content_type': content_analysis['content_type'],
-                'content_preview': content_analysis['content'][:200] + "..." if len(content_analysis['content']) > 200 else content_analysis['content']
+                'content_preview': self._preview(content_analysis['content']),
+                'cached': cached
             }
             
         except Exception as e:
@@ -135,41 +195,123 @@ class AttachmentService:
         
         return {'valid': True}
     
-    def _save_temp_file(self, file: FileStorage, session_id: str) -> Optional[Dict]:
-        """Salva arquivo temporariamente"""
+    @staticmethod
+    def _preview(content: str) -> str:
+        return content[:200] + "..." if len(content) > 200 else content
+    
+    def _blob_path(self, sha256: str) -> str:
+        # Dois níveis de diretório para não concentrar milhares de arquivos
+        return os.path.join(self.blob_folder, sha256[:2], sha256)
+    
+    def _store_blob(self, file: FileStorage) -> Optional[Dict]:
+        """
+        Grava o upload calculando o SHA-256 durante a cópia
+        
+        O arquivo é escrito em um temporário e movido para blobs/<hash>; se o
+        blob já existir, o temporário é descartado (deduplicação).
+        """
+        temp_path = None
         try:
-            # Gerar ID único para o anexo
-            attachment_id = str(uuid.uuid4())
-            
-            # Nome seguro do arquivo
             filename = secure_filename(file.filename)
+            digest = hashlib.sha256()
+            file_size = 0
             
-            # Criar subdiretório para a sessão
-            session_dir = os.path.join(self.upload_folder, session_id)
-            os.makedirs(session_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.blob_folder, suffix='.part')
+            with os.fdopen(fd, 'wb') as output:
+                while True:
+                    chunk = file.stream.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    file_size += len(chunk)
+                    if file_size > self.max_file_size:
+                        raise ValueError(f'Arquivo excede {self.max_file_size // (1024*1024)}MB')
+                    digest.update(chunk)
+                    output.write(chunk)
             
-            # Caminho final do arquivo
-            file_path = os.path.join(session_dir, f"{attachment_id}_{filename}")
+            sha256 = digest.hexdigest()
+            blob_path = self._blob_path(sha256)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
             
-            # Salvar arquivo
-            file.save(file_path)
+            if os.path.exists(blob_path):
+                os.remove(temp_path)
+                # Renova o prazo de limpeza do blob e do cache de extração
+                for path in (blob_path, f"{blob_path}.extractions.json"):
+                    if os.path.exists(path):
+                        os.utime(path)
+                with self._lock:
+                    self._stats['deduplicated_blobs'] += 1
+            else:
+                os.replace(temp_path, blob_path)
+            temp_path = None
+            
+            with self._lock:
+                self._stats['uploads'] += 1
             
-            # Obter informações do arquivo
-            file_size = os.path.getsize(file_path)
-            mime_type, _ = mimetypes.guess_type(file_path)
+            mime_type, _ = mimetypes.guess_type(filename)
             
             return {
-                'attachment_id': attachment_id,
+                'attachment_id': str(uuid.uuid4()),
                 'original_filename': filename,
-                'file_path': file_path,
+                'sha256': sha256,
+                'file_path': blob_path,
                 'file_size': file_size,
                 'mime_type': mime_type or 'application/octet-stream'
             }
             
         except Exception as e:
             logger.error(f"Erro ao salvar arquivo: {str(e)}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
             return None
     
+    def _get_content_analysis(self, file_info: Dict) -> Tuple[Dict, bool]:
+        """
+        Resultado da extração em cache pelo hash do conteúdo
+        
+        A chave inclui a extensão (define o extrator) e o tipo inicial
+        (derivado do nome do arquivo, influencia a classificação).
+        Retorna (análise, veio_do_cache).
+        """
+        filename = file_info['original_filename'].lower()
+        extension = filename.rsplit('.', 1)[-1]
+        cache_key = (f"v{EXTRACTION_CACHE_VERSION}:{file_info['sha256']}:{extension}:"
+                     f"{self._determine_content_type(filename)}")
+        
+        content_analysis = self.extraction_cache.get(cache_key)
+        if content_analysis is not None:
+            return content_analysis, True
+        
+        sidecar_path = f"{file_info['file_path']}.extractions.json"
+        sidecar = {}
+        try:
+            with open(sidecar_path, 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError):
+            pass
+        
+        content_analysis = sidecar.get(cache_key)
+        if content_analysis is not None:
+            self.extraction_cache.set(cache_key, content_analysis)
+            return content_analysis, True
+        
+        content_analysis = self._analyze_file_content(file_info)
+        with self._lock:
+            self._stats['extractions'] += 1
+        
+        # Erros de extração não entram no cache: o próximo envio tenta de novo
+        if not content_analysis.get('extraction_failed'):
+            self.extraction_cache.set(cache_key, content_analysis)
+            sidecar[cache_key] = content_analysis
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(sidecar_path), suffix='.part')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(sidecar, f, ensure_ascii=False)
+                os.replace(temp_path, sidecar_path)
+            except OSError as e:
+                logger.warning(f"Nao foi possivel gravar o cache de extracao: {e}")
+        
+        return content_analysis, False
+    
     def _analyze_file_content(self, file_info: Dict) -> Dict:
         """Analisa o conteúdo do arquivo e determina seu tipo"""
         file_path = file_info['file_path']
@@ -180,20 +322,27 @@ class AttachmentService:
             content_type = self._determine_content_type(filename)
             
             # Extrair conteúdo baseado no tipo de arquivo
-            if filename.endswith('.txt'):
-                content = self._extract_text_content(file_path)
-            elif filename.endswith('.json'):
-                content = self._extract_json_content(file_path)
-            elif filename.endswith('.csv'):
-                content = self._extract_csv_content(file_path)
-            elif filename.endswith(('.pdf')):
-                content = self._extract_pdf_content(file_path)
-            elif filename.endswith(('.doc', '.docx')):
-                content = self._extract_doc_content(file_path)
-            elif filename.endswith(('.xls', '.xlsx')):
-                content = self._extract_excel_content(file_path)
-            else:
-                content = "Tipo de arquivo não suportado para extração de conteúdo"
+            extraction_failed = False
+            try:
+                if filename.endswith('.txt'):
+                    content = self._extract_text_content(file_path)
+                elif filename.endswith('.json'):
+                    content = self._extract_json_content(file_path)
+                elif filename.endswith('.csv'):
+                    content = self._extract_csv_content(file_path)
+                elif filename.endswith(('.pdf')):
+                    content = self._extract_pdf_content(file_path)
+                elif filename.endswith(('.doc', '.docx')):
+                    content = self._extract_doc_content(file_path)
+                elif filename.endswith(('.xls', '.xlsx')):
+                    content = self._extract_excel_content(file_path)
+                else:
+                    content = "Tipo de arquivo não suportado para extração de conteúdo"
+            except ExtractionError as e:
+                # A mensagem vira o conteúdo do anexo, mas o resultado não é cacheado
+                logger.warning(f"Falha na extracao de {filename}: {e}")
+                content = str(e)
+                extraction_failed = True
             
             # Analisar conteúdo para classificação mais específica
             refined_type = self._refine_content_type(content, content_type)
@@ -204,7 +353,8 @@ class AttachmentService:
             return {
                 'content_type': refined_type,
                 'content': content,
-                'metadata': metadata
+                'metadata': metadata,
+                'extraction_failed': extraction_failed
             }
             
         except Exception as e:
@@ -212,7 +362,8 @@ class AttachmentService:
             return {
                 'content_type': 'unknown',
                 'content': f'Erro na análise: {str(e)}',
-                'metadata': {}
+                'metadata': {},
+                'extraction_failed': True
             }
     
     def _determine_content_type(self, filename: str) -> str:
@@ -291,7 +442,7 @@ class AttachmentService:
                 data = json.load(f)
                 return json.dumps(data, indent=2, ensure_ascii=False)
         except Exception as e:
-            return f"Erro ao processar JSON: {str(e)}"
+            raise ExtractionError(f"Erro ao processar JSON: {str(e)}")
     
     def _extract_csv_content(self, file_path: str) -> str:
         """Extrai conteúdo de arquivo CSV"""
@@ -313,7 +464,7 @@ class AttachmentService:
                 lines = f.readlines()[:100]  # Primeiras 100 linhas
                 return ''.join(lines)
         except Exception as e:
-            return f"Erro ao processar CSV: {str(e)}"
+            raise ExtractionError(f"Erro ao processar CSV: {str(e)}")
     
     def _extract_pdf_content(self, file_path: str) -> str:
         """Extrai conteúdo de arquivo PDF"""
@@ -326,9 +477,9 @@ class AttachmentService:
                     text += page.extract_text() + "\n"
                 return text
         except ImportError:
-            return "PyPDF2 não disponível para extração de PDF"
+            raise ExtractionError("PyPDF2 não disponível para extração de PDF")
         except Exception as e:
-            return f"Erro ao processar PDF: {str(e)}"
+            raise ExtractionError(f"Erro ao processar PDF: {str(e)}")
     
     def _extract_doc_content(self, file_path: str) -> str:
         """Extrai conteúdo de arquivo DOC/DOCX"""
@@ -340,9 +491,9 @@ class AttachmentService:
                 text += paragraph.text + "\n"
             return text
         except ImportError:
-            return "python-docx não disponível para extração de DOC/DOCX"
+            raise ExtractionError("python-docx não disponível para extração de DOC/DOCX")
         except Exception as e:
-            return f"Erro ao processar DOC/DOCX: {str(e)}"
+            raise ExtractionError(f"Erro ao processar DOC/DOCX: {str(e)}")
     
     def _extract_excel_content(self, file_path: str) -> str:
         """Extrai conteúdo de arquivo Excel"""
@@ -369,9 +520,9 @@ class AttachmentService:
             
             return "\n".join(content_parts)
         except ImportError:
-            return "pandas não disponível para extração de Excel"
+            raise ExtractionError("pandas não disponível para extração de Excel")
         except Exception as e:
-            return f"Erro ao processar Excel: {str(e)}"
+            raise ExtractionError(f"Erro ao processar Excel: {str(e)}")
     
     def _extract_metadata(self, content: str, content_type: str) -> Dict:
         """Extrai metadados do conteúdo"""
@@ -439,38 +590,97 @@ class AttachmentService:
         
         return session_data['attachments']
     
-    def get_session_attachments_content(self, session_id: str) -> Optional[str]:
-        """Recupera conteúdo consolidado dos anexos de uma sessão"""
+    def _get_chunk_index(self, attachment: Dict) -> ChunkIndex:
+        key = attachment.get('sha256') or attachment['attachment_id']
+        index = self.chunk_indexes.get(key)
+        if index is None:
+            index = self.retriever.build_index(attachment['extracted_content'])
+            # O índice de uma extração que falhou não pode ser reaproveitado pelo hash
+            if not attachment.get('extraction_failed'):
+                self.chunk_indexes.set(key, index)
+        return index
+    
+    def get_session_attachments_content(self, session_id: str, query: Optional[str] = None) -> Optional[str]:
+        """
+        Recupera conteúdo consolidado dos anexos de uma sessão
+        
+        Quando os anexos não cabem em ATTACHMENTS_CONTEXT_MAX_CHARS e há uma
+        consulta (segmento, produto, público), entram apenas os blocos mais
+        relevantes (BM25). Sem consulta, com um condensador configurado, os
+        anexos grandes entram resumidos, com o limite dividido entre eles.
+        """
         attachments = self.get_session_attachments(session_id)
         
         if not attachments:
             return None
         
+        total_chars = sum(len(attachment['extracted_content']) for attachment in attachments)
+        if query and self.retriever.enabled and total_chars > self.context_max_chars:
+            retrieved = self._get_retrieved_content(attachments, query)
+            if retrieved:
+                return retrieved
+        
+        contents = [attachment['extracted_content'] for attachment in attachments]
+        if self.condenser:
+            per_attachment = self.context_max_chars // len(attachments)
+            contents = [
+                self.condenser.condense(content, attachment.get('sha256'))[:per_attachment]
+                for content, attachment in zip(contents, attachments)
+            ]
+        
         content_parts = []
         content_parts.append("=== CONTEÚDO DOS ANEXOS ===\n")
         
-        for attachment in attachments:
+        for attachment, content in zip(attachments, contents):
             content_parts.append(f"📎 ANEXO: {attachment['original_filename']}")
             content_parts.append(f"Tipo: {attachment['content_type']}")
             content_parts.append(f"Tamanho: {attachment['file_size']} bytes")
+            if len(content) < len(attachment['extracted_content']):
+                content_parts.append(f"(Conteúdo condensado: {len(content)} de {len(attachment['extracted_content'])} caracteres)")
             content_parts.append("-" * 50)
-            content_parts.append(attachment['extracted_content'])
+            content_parts.append(content)
+            content_parts.append("\n" + "="*50 + "\n")
+        
+        return "\n".join(content_parts)
+    
+    def _get_retrieved_content(self, attachments: List[Dict], query: str) -> Optional[str]:
+        """Blocos dos anexos mais relevantes para a consulta (None se nenhum termo casar)"""
+        indexes = [self._get_chunk_index(attachment) for attachment in attachments]
+        selected = self.retriever.retrieve(indexes, query, self.context_max_chars)
+        if not selected:
+            return None
+        
+        by_attachment: Dict[int, List[int]] = {}
+        for attachment_position, chunk_position, _ in selected:
+            by_attachment.setdefault(attachment_position, []).append(chunk_position)
+        
+        content_parts = []
+        content_parts.append("=== CONTEÚDO DOS ANEXOS (TRECHOS RELEVANTES) ===\n")
+        
+        for attachment_position, chunk_positions in by_attachment.items():
+            attachment = attachments[attachment_position]
+            index = indexes[attachment_position]
+            content_parts.append(f"📎 ANEXO: {attachment['original_filename']}")
+            content_parts.append(f"Tipo: {attachment['content_type']}")
+            content_parts.append(f"Trechos: {len(chunk_positions)} de {len(index.chunks)} mais relevantes para: {query}")
+            content_parts.append("-" * 50)
+            content_parts.append("\n[...]\n".join(index.chunks[position] for position in chunk_positions))
             content_parts.append("\n" + "="*50 + "\n")
         
         return "\n".join(content_parts)
     
     def clear_session(self, session_id: str) -> bool:
-        """Limpa anexos de uma sessão"""
+        """
+        Limpa anexos de uma sessão
+        
+        Remove apenas as referências: os blobs podem ser compartilhados com
+        outras sessões e são apagados pela limpeza periódica.
+        """
         try:
-            if session_id in self.session_storage:
-                # Remover arquivos físicos
-                session_dir = os.path.join(self.upload_folder, session_id)
-                if os.path.exists(session_dir):
-                    shutil.rmtree(session_dir)
-                
-                # Remover da memória
-                del self.session_storage[session_id]
-                
+            with self._lock:
+                removed = self.session_storage.pop(session_id, None)
+            
+            if removed is not None:
                 logger.info(f"Sessao {session_id} limpa com sucesso")
                 return True
             
@@ -490,6 +700,18 @@ class AttachmentService:
                 if session_data['created_at'] < cutoff_time:
                     self.clear_session(session_id)
             
+            # Blobs sem novos envios há mais que o TTL das sessões não são
+            # mais referenciados (o mtime é renovado a cada reenvio)
+            cutoff_timestamp = time.time() - self.session_ttl.total_seconds()
+            for root, _, files in os.walk(self.blob_folder):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        if os.path.getmtime(path) < cutoff_timestamp:
+                            os.remove(path)
+                    except OSError:
+                        pass
+            
             logger.info("Limpeza de arquivos antigos concluida")
             
         except Exception as e:
@@ -499,9 +721,18 @@ class AttachmentService:
         """Retorna estatísticas do serviço"""
         total_attachments = sum(len(session['attachments']) for session in self.session_storage.values())
         
+        with self._lock:
+            stats = dict(self._stats)
+        
         return {
             'active_sessions': len(self.session_storage),
             'total_attachments': total_attachments,
+            'uploads': stats['uploads'],
+            'deduplicated_blobs': stats['deduplicated_blobs'],
+            'extractions': stats['extractions'],
+            'extraction_cache': self.extraction_cache.get_stats(),
+            'condenser': self.condenser.get_stats() if self.condenser else None,
+            'chunk_indexes': self.chunk_indexes.get_stats(),
             'upload_folder': self.upload_folder,
             'max_file_size_mb': self.max_file_size // (1024 * 1024),
             'allowed_extensions': list(self.allowed_extensions),
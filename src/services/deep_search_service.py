@@ -8,6 +8,8 @@ import time
 import re
 from functools import lru_cache
 
+from services.text_dedup import NearDuplicateFilter
+
 logger = logging.getLogger(__name__)
 
 class DeepSearchService:
@@ -331,11 +333,16 @@ Priorize informações que possam gerar vantagem competitiva.
             consolidated_parts.append(f"Timestamp: {datetime.now(timezone.utc).isoformat()}")
             consolidated_parts.append("\n" + "="*60)
             
+            # Iterações de refinamento repetem boa parte dos parágrafos anteriores
+            dedup = NearDuplicateFilter(source='deep_search')
+            unique_contents = []
+            
             # Consolidar resultados por iteração
             for result in search_results:
                 iteration = result['iteration']
                 query = result['query']
-                content = result['results']
+                content = dedup.dedup_paragraphs(result['results'])
+                unique_contents.append(content)
                 
                 consolidated_parts.append(f"\n🔍 ITERAÇÃO {iteration}")
                 consolidated_parts.append(f"Query: {query}")
@@ -348,7 +355,7 @@ Priorize informações que possam gerar vantagem competitiva.
             consolidated_parts.append("-" * 30)
             
             # Extrair insights principais
-            all_content = " ".join([r['results'] for r in search_results])
+            all_content = " ".join(unique_contents)
             key_insights = self._extract_key_insights(all_content)
             
             if key_insights:
@@ -361,6 +368,8 @@ Priorize informações que possam gerar vantagem competitiva.
             consolidated_parts.append(f"Total de caracteres analisados: {len(all_content):,}")
             consolidated_parts.append(f"Queries utilizadas: {len(search_results)}")
             consolidated_parts.append(f"Tempo de execução: ~{len(search_results) * 2} segundos")
+            # Economia registrada em log e em /status (fora do texto enviado ao modelo)
+            dedup.report()
             
             return "\n".join(consolidated_parts)
             
@@ -1,149 +1,129 @@
 import os
 import json
+import asyncio
 import logging
+import inspect
+import threading
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any
-import google.generativeai as genai
+from typing import Dict, List, Optional, Any, Callable, Tuple
 import time
 import re
+from services.retry_policy import (
+    CircuitBreaker, CircuitOpenError, RetryBudget, backoff_delay,
+    classify_error, extract_retry_after, is_retryable, ERROR_QUOTA
+)
+from services.model_router import ModelRouter, TIER_PRIMARY, TIER_FAST
+from services.lazy_imports import lazy_import
+
+# SDK do Gemini (grpc/protobuf) importado apenas quando o cliente é usado
+genai = lazy_import('google.generativeai')
 
 logger = logging.getLogger(__name__)
 
-class GeminiClient:
-    """Cliente aprimorado para Google Gemini Pro 1.5 com análise ultra-detalhada"""
-    
-    def __init__(self):
-        self.api_key = os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY não configurada")
-        
-        # Configurar Gemini
-        genai.configure(api_key=self.api_key)
-        
-        # Configurações otimizadas do modelo
-        self.generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.8,
-            "top_k": 40,
-            "max_output_tokens": 8192,
-        }
-        
-        self.safety_settings = [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            }
-        ]
-        
-        # Inicializar modelo
-        try:
-            self.model = genai.GenerativeModel(
-                model_name="gemini-1.5-pro",
-                generation_config=self.generation_config,
-                safety_settings=self.safety_settings
-            )
-            logger.info("✅ Cliente Gemini Pro 1.5 inicializado com sucesso")
-        except Exception as e:
-            logger.error(f"❌ Erro ao inicializar Gemini: {e}")
-            raise
-    
-    def generate_ultra_detailed_analysis(self, 
-                                       form_data: Dict,
-                                       search_context: Optional[str] = None,
-                                       websailor_context: Optional[str] = None,
-                                       attachments_context: Optional[str] = None) -> Dict:
-        """
-        Gera análise ultra-detalhada usando todos os contextos disponíveis
-        """
-        try:
-            logger.info("🤖 Iniciando análise ultra-detalhada com Gemini Pro 1.5")
-            
-            # Construir prompt ultra-detalhado
-            prompt = self._build_ultra_detailed_prompt(
-                form_data, search_context, websailor_context, attachments_context
-            )
-            
-            # Gerar resposta com retry
-            response = self._generate_with_retry(prompt)
-            
-            # Processar resposta
-            analysis = self._process_gemini_response(response)
-            
-            # Adicionar metadados
-            analysis['metadata'] = {
-                'generated_at': datetime.now(timezone.utc).isoformat(),
-                'model': 'gemini-1.5-pro',
-                'search_context_used': bool(search_context),
-                'websailor_used': bool(websailor_context),
-                'attachments_used': bool(attachments_context),
-                'form_data_fields': list(form_data.keys()),
-                'analysis_version': '2.0.0'
-            }
-            
-            logger.info("✅ Análise ultra-detalhada gerada com sucesso")
-            return analysis
-            
-        except Exception as e:
-            logger.error(f"❌ Erro na análise Gemini: {e}")
-            return self._generate_fallback_analysis(form_data)
-    
-    def _build_ultra_detailed_prompt(self, 
-                                   form_data: Dict,
-                                   search_context: Optional[str],
-                                   websailor_context: Optional[str],
-                                   attachments_context: Optional[str]) -> str:
-        """Constrói prompt ultra-detalhado para análise"""
-        
-        prompt = f"""
-# ANÁLISE ULTRA-DETALHADA DE MERCADO - ARQV30 ENHANCED v2.0
+# Orçamento de retries e circuit breaker compartilhados por todo o processo
+gemini_retry_budget = RetryBudget(
+    max_tokens=float(os.getenv('GEMINI_RETRY_BUDGET', 20)),
+    refill_per_second=float(os.getenv('GEMINI_RETRY_REFILL_PER_SECOND', 0.5))
+)
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
 
-Você é um especialista sênior em análise de mercado e estratégia de negócios com 20+ anos de experiência. 
-Sua missão é gerar uma análise ULTRA-DETALHADA, PRECISA e ACIONÁVEL baseada nos dados fornecidos.
 
-## DADOS DO PROJETO:
-- **Segmento**: {form_data.get('segmento', 'Não informado')}
-- **Produto/Serviço**: {form_data.get('produto', 'Não informado')}
-- **Público-Alvo**: {form_data.get('publico', 'Não informado')}
-- **Preço**: R$ {form_data.get('preco', 'Não informado')}
-- **Concorrentes**: {form_data.get('concorrentes', 'Não informado')}
-- **Objetivo de Receita**: R$ {form_data.get('objetivoReceita', 'Não informado')}
-- **Orçamento Marketing**: R$ {form_data.get('orcamentoMarketing', 'Não informado')}
-- **Prazo de Lançamento**: {form_data.get('prazoLancamento', 'Não informado')}
-- **Dados Adicionais**: {form_data.get('dadosAdicionais', 'Não informado')}
-"""
+def get_circuit_breaker(model_name: str) -> CircuitBreaker:
+    """Circuit breaker do processo para um modelo Gemini"""
+    breaker = _circuit_breakers.get(model_name)
+    if breaker is None:
+        breaker = _circuit_breakers.setdefault(model_name, CircuitBreaker(
+            model_name,
+            failure_threshold=int(os.getenv('GEMINI_CIRCUIT_FAILURE_THRESHOLD', 5)),
+            reset_timeout=float(os.getenv('GEMINI_CIRCUIT_RESET_TIMEOUT', 30))
+        ))
+    return breaker
 
-        # Adicionar contextos se disponíveis
-        if search_context:
-            prompt += f"""
-## CONTEXTO DE PESQUISA PROFUNDA:
-{search_context}
-"""
+# Seções obrigatórias da análise ultra-detalhada
+ANALYSIS_REQUIRED_KEYS = [
+    'avatar_ultra_detalhado', 'escopo', 'analise_concorrencia_detalhada',
+    'estrategia_palavras_chave', 'metricas_performance_detalhadas',
+    'projecoes_cenarios', 'inteligencia_mercado', 'plano_acao_detalhado',
+    'insights_exclusivos'
+]
 
-        if websailor_context:
-            prompt += f"""
-## CONTEXTO WEBSAILOR (NAVEGAÇÃO WEB AVANÇADA):
-{websailor_context}
-"""
+# Seções que são listas em vez de objetos
+ANALYSIS_ARRAY_KEYS = {'insights_exclusivos'}
 
-        if attachments_context:
-            prompt += f"""
-## CONTEXTO DOS ANEXOS:
-{attachments_context}
-"""
 
-        prompt += """
+def build_analysis_schema(required_keys: List[str]) -> Dict:
+    """Constrói o JSON schema da análise a partir das seções obrigatórias"""
+    properties = {}
+    for key in required_keys:
+        if key in ANALYSIS_ARRAY_KEYS:
+            properties[key] = {'type': 'array', 'items': {'type': 'string'}}
+        else:
+            properties[key] = {'type': 'object'}
+
+    return {
+        'type': 'object',
+        'properties': properties,
+        'required': list(required_keys)
+    }
+
+
+_JSON_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'number': (int, float),
+    'integer': int,
+    'boolean': bool
+}
+
+
+def compile_schema_validator(schema: Dict) -> Callable[[Any], List[str]]:
+    """
+    Compila um validador para o subconjunto de JSON schema usado pela análise
+    (type, properties, required, items). A árvore do schema é percorrida uma
+    única vez; o validador retornado só executa as checagens já resolvidas.
+
+    Returns:
+        Função que recebe o documento e retorna a lista de erros encontrados
+    """
+    expected_type = _JSON_TYPES.get(schema.get('type'))
+    required = tuple(schema.get('required', ()))
+    property_validators = {
+        name: compile_schema_validator(sub_schema)
+        for name, sub_schema in schema.get('properties', {}).items()
+    }
+    items_validator = compile_schema_validator(schema['items']) if 'items' in schema else None
+
+    def validate(value: Any, path: str = '$') -> List[str]:
+        if expected_type and not isinstance(value, expected_type):
+            return [f"{path}: esperado {schema['type']}, recebido {type(value).__name__}"]
+
+        errors = []
+        if isinstance(value, dict):
+            errors.extend(f"{path}.{key}: ausente" for key in required if key not in value)
+            for name, validator in property_validators.items():
+                if name in value:
+                    errors.extend(validator(value[name], f"{path}.{name}"))
+        elif isinstance(value, list) and items_validator:
+            for index, item in enumerate(value):
+                errors.extend(items_validator(item, f"{path}[{index}]"))
+        return errors
+
+    return validate
+
+
+ANALYSIS_SCHEMA = build_analysis_schema(ANALYSIS_REQUIRED_KEYS)
+validate_analysis = compile_schema_validator(ANALYSIS_SCHEMA)
+
+# Prefixo estático do prompt de análise (papel, instruções e esqueleto JSON).
+# Fica no início do prompt para que seja idêntico entre requisições e possa
+# ser reaproveitado pelo cache de contexto do provedor.
+ANALYSIS_PROMPT_PREFIX = """
+# ANÁLISE ULTRA-DETALHADA DE MERCADO - ARQV30 ENHANCED v2.0
+
+Você é um especialista sênior em análise de mercado e estratégia de negócios com 20+ anos de experiência. 
+Sua missão é gerar uma análise ULTRA-DETALHADA, PRECISA e ACIONÁVEL baseada nos dados fornecidos.
+
 ## INSTRUÇÕES PARA ANÁLISE ULTRA-DETALHADA:
 
 Gere uma análise COMPLETA, PRECISA e ACIONÁVEL seguindo EXATAMENTE esta estrutura JSON.
@@ -438,37 +418,485 @@ IMPORTANTE: Responda APENAS com o JSON válido, sem texto adicional.
 6. **FORMATO JSON VÁLIDO**: Responda APENAS com o JSON válido, sem texto adicional antes ou depois.
 
 7. **PRECISÃO**: Baseie-se nos dados fornecidos e contextos para gerar análises precisas e realistas.
+"""
 
+# Parte dinâmica do prompt, preenchida com os dados do formulário
+ANALYSIS_PROMPT_DATA_TEMPLATE = """
+## DADOS DO PROJETO:
+- **Segmento**: {segmento}
+- **Produto/Serviço**: {produto}
+- **Público-Alvo**: {publico}
+- **Preço**: R$ {preco}
+- **Concorrentes**: {concorrentes}
+- **Objetivo de Receita**: R$ {objetivo_receita}
+- **Orçamento Marketing**: R$ {orcamento_marketing}
+- **Prazo de Lançamento**: {prazo_lancamento}
+- **Dados Adicionais**: {dados_adicionais}
+"""
+
+ANALYSIS_PROMPT_CLOSING = """
 GERE A ANÁLISE ULTRA-DETALHADA AGORA:
 """
+
+
+class GeminiClient:
+    """Cliente aprimorado para Google Gemini Pro 1.5 com análise ultra-detalhada"""
+    
+    def __init__(self):
+        self.api_key = os.getenv('GEMINI_API_KEY')
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY não configurada")
         
-        return prompt
+        # O SDK só é importado e configurado na primeira chamada ao modelo
+        self._sdk_ready = False
+        self._sdk_lock = threading.Lock()
+        
+        # Configurações otimizadas do modelo
+        self.generation_config = {
+            "temperature": 0.7,
+            "top_p": 0.8,
+            "top_k": 40,
+            "max_output_tokens": 8192,
+        }
+        
+        # Saída JSON com schema, só na chamada de análise: definida em
+        # _ensure_sdk conforme a versão do SDK (ver _analysis_generation_config)
+        self.json_mode = False
+        self._json_mode_fields: Tuple[str, ...] = ()
+        
+        self.safety_settings = [
+            {
+                "category": "HARM_CATEGORY_HARASSMENT",
+                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+            },
+            {
+                "category": "HARM_CATEGORY_HATE_SPEECH",
+                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+            },
+            {
+                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+            },
+            {
+                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+            }
+        ]
+        
+        # Cache de contexto do provedor para o prefixo estático do prompt
+        self.context_cache_enabled = os.getenv('GEMINI_CONTEXT_CACHE', 'false').lower() == 'true'
+        self._context_cache: Dict[Tuple[str, int], Dict] = {}
+        self._context_cache_lock = threading.Lock()
+        self._context_cache_inflight = set()
+        
+        # Roteador de modelos (instâncias criadas sob demanda)
+        self.router = ModelRouter(self._create_model)
+        logger.info(f"✅ Cliente Gemini inicializado ({self.router.primary_model})")
+    
+    def _ensure_sdk(self):
+        """Importa e configura o SDK do Gemini uma vez, na primeira chamada"""
+        if self._sdk_ready:
+            return
+        with self._sdk_lock:
+            if self._sdk_ready:
+                return
+            genai.configure(api_key=self.api_key)
+            self._json_mode_fields = self._supported_json_mode_fields()
+            self.json_mode = 'response_mime_type' in self._json_mode_fields
+            if self.json_mode:
+                logger.info(f"🧩 Modo de saída JSON estruturado ativado ({', '.join(self._json_mode_fields)})")
+            self._sdk_ready = True
+    
+    def _create_model(self, model_name: str):
+        """Cria uma instância de modelo com a configuração do cliente"""
+        self._ensure_sdk()
+        return genai.GenerativeModel(
+            model_name=model_name,
+            generation_config=self.generation_config,
+            safety_settings=self.safety_settings
+        )
+    
+    @staticmethod
+    def _supported_json_mode_fields() -> Tuple[str, ...]:
+        """
+        Campos de saída estruturada aceitos pela versão instalada do SDK
+        
+        response_mime_type existe a partir do google-generativeai 0.5 e
+        response_schema a partir do 0.6; sem eles o modelo responde texto livre.
+        """
+        if os.getenv('GEMINI_JSON_MODE', 'true').lower() != 'true':
+            return ()
+        try:
+            parameters = inspect.signature(genai.types.GenerationConfig).parameters
+        except (AttributeError, TypeError, ValueError):
+            return ()
+        if 'response_mime_type' not in parameters:
+            return ()
+        return tuple(field for field in ('response_mime_type', 'response_schema') if field in parameters)
+    
+    def _analysis_generation_config(self) -> Optional[Dict]:
+        """
+        Configuração da chamada de análise: JSON validado pelo ANALYSIS_SCHEMA
+        
+        Aplicada por chamada; as demais (resumos, teste de conexão) usam a
+        configuração compartilhada, em texto livre.
+        """
+        self._ensure_sdk()
+        if not self.json_mode:
+            return None
+        config = dict(self.generation_config, response_mime_type='application/json')
+        if 'response_schema' in self._json_mode_fields:
+            config['response_schema'] = ANALYSIS_SCHEMA
+        return config
+    
+    def generate_ultra_detailed_analysis(self, 
+                                       form_data: Dict,
+                                       search_context: Optional[str] = None,
+                                       websailor_context: Optional[str] = None,
+                                       attachments_context: Optional[str] = None,
+                                       reference_context: Optional[str] = None) -> Dict:
+        """
+        Gera análise ultra-detalhada usando todos os contextos disponíveis
+        
+        Args:
+            reference_context: Resumo de análises anteriores semelhantes
+        """
+        try:
+            logger.info("🤖 Iniciando análise ultra-detalhada com Gemini Pro 1.5")
+            
+            # Construir parte dinâmica do prompt (o prefixo estático é pré-compilado)
+            prompt = self._build_prompt_suffix(
+                form_data, search_context, websailor_context, attachments_context, reference_context
+            )
+            
+            # Gerar resposta com retry
+            response, model_name = self._generate_with_retry(
+                prompt, prefix=ANALYSIS_PROMPT_PREFIX, generation_config=self._analysis_generation_config()
+            )
+            
+            return self._finalize_analysis(
+                response, model_name, form_data,
+                search_context, websailor_context, attachments_context, reference_context
+            )
+            
+        except Exception as e:
+            logger.error(f"❌ Erro na análise Gemini: {e}")
+            return self._generate_fallback_analysis(form_data)
+    
+    async def generate_ultra_detailed_analysis_async(self, 
+                                                     form_data: Dict,
+                                                     search_context: Optional[str] = None,
+                                                     websailor_context: Optional[str] = None,
+                                                     attachments_context: Optional[str] = None,
+                                                     reference_context: Optional[str] = None) -> Dict:
+        """Versão assíncrona de generate_ultra_detailed_analysis (para o app ASGI)"""
+        try:
+            logger.info("🤖 Iniciando análise ultra-detalhada assíncrona")
+            
+            prompt = self._build_prompt_suffix(
+                form_data, search_context, websailor_context, attachments_context, reference_context
+            )
+            response, model_name = await self._generate_with_retry_async(
+                prompt, prefix=ANALYSIS_PROMPT_PREFIX, generation_config=self._analysis_generation_config()
+            )
+            
+            return self._finalize_analysis(
+                response, model_name, form_data,
+                search_context, websailor_context, attachments_context, reference_context
+            )
+            
+        except Exception as e:
+            logger.error(f"❌ Erro na análise Gemini: {e}")
+            return self._generate_fallback_analysis(form_data)
+    
+    def _finalize_analysis(self, response: str, model_name: str, form_data: Dict,
+                           search_context: Optional[str], websailor_context: Optional[str],
+                           attachments_context: Optional[str], reference_context: Optional[str]) -> Dict:
+        """Processa a resposta e adiciona os metadados da análise"""
+        analysis = self._process_gemini_response(response)
+        
+        analysis['metadata'] = {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'model': model_name,
+            'search_context_used': bool(search_context),
+            'websailor_used': bool(websailor_context),
+            'attachments_used': bool(attachments_context),
+            'reference_analyses_used': bool(reference_context),
+            'form_data_fields': list(form_data.keys()),
+            'structured_output': self.json_mode,
+            'analysis_version': '2.0.0'
+        }
+        if analysis.get('status') == 'fallback_analysis':
+            # Resposta descartada (JSON inválido ou fora do schema)
+            analysis['metadata']['status'] = 'fallback_analysis'
+        
+        logger.info("✅ Análise ultra-detalhada gerada com sucesso")
+        return analysis
+    
+    def _build_ultra_detailed_prompt(self, 
+                                   form_data: Dict,
+                                   search_context: Optional[str],
+                                   websailor_context: Optional[str],
+                                   attachments_context: Optional[str],
+                                   reference_context: Optional[str] = None) -> str:
+        """Constrói prompt ultra-detalhado para análise (prefixo estático + dados)"""
+        return ANALYSIS_PROMPT_PREFIX + self._build_prompt_suffix(
+            form_data, search_context, websailor_context, attachments_context, reference_context
+        )
+    
+    @staticmethod
+    def _form_value(form_data: Dict, *keys: str) -> Any:
+        """Primeiro valor preenchido entre as chaves (snake_case ou camelCase do formulário)"""
+        for key in keys:
+            value = form_data.get(key)
+            if value not in (None, ''):
+                return value
+        return 'Não informado'
+    
+    def _build_prompt_suffix(self, 
+                             form_data: Dict,
+                             search_context: Optional[str],
+                             websailor_context: Optional[str],
+                             attachments_context: Optional[str],
+                             reference_context: Optional[str] = None) -> str:
+        """Constrói a parte dinâmica do prompt a partir do formulário e dos contextos"""
+        value = self._form_value
+        parts = [ANALYSIS_PROMPT_DATA_TEMPLATE.format(
+            segmento=value(form_data, 'segmento'),
+            produto=value(form_data, 'produto'),
+            publico=value(form_data, 'publico'),
+            preco=value(form_data, 'preco'),
+            concorrentes=value(form_data, 'concorrentes'),
+            objetivo_receita=value(form_data, 'objetivo_receita', 'objetivoReceita'),
+            orcamento_marketing=value(form_data, 'orcamento_marketing', 'orcamentoMarketing'),
+            prazo_lancamento=value(form_data, 'prazo_lancamento', 'prazoLancamento'),
+            dados_adicionais=value(form_data, 'dados_adicionais', 'dadosAdicionais')
+        )]
+        
+        # Adicionar contextos se disponíveis
+        if search_context:
+            parts.append(f"""
+## CONTEXTO DE PESQUISA PROFUNDA:
+{search_context}
+""")
+
+        if websailor_context:
+            parts.append(f"""
+## CONTEXTO WEBSAILOR (NAVEGAÇÃO WEB AVANÇADA):
+{websailor_context}
+""")
+
+        if attachments_context:
+            parts.append(f"""
+## CONTEXTO DOS ANEXOS:
+{attachments_context}
+""")
+
+        if reference_context:
+            parts.append(f"""
+## ANÁLISES ANTERIORES SEMELHANTES (REFERÊNCIA):
+Use apenas como ponto de partida; atualize e adapte ao projeto atual.
+{reference_context}
+""")
+
+        parts.append(ANALYSIS_PROMPT_CLOSING)
+        return "".join(parts)
     
-    def _generate_with_retry(self, prompt: str, max_retries: int = 3) -> str:
-        """Gera resposta com retry em caso de erro"""
+    def _get_prefix_cached_model(self, model_name: str, prefix: str):
+        """
+        Retorna um modelo ligado ao cache de contexto do provedor para o prefixo,
+        criando o cache sob demanda. Retorna None quando o SDK não suporta cache
+        de contexto, quando está desabilitado ou quando a criação falhou.
+        
+        A criação (chamada de rede) acontece fora do lock: enquanto uma thread
+        cria o cache, as outras seguem com o cache anterior, se ainda houver, ou
+        com o prompt completo. Falhas ficam registradas por pouco tempo
+        (GEMINI_CONTEXT_CACHE_RETRY) e a criação é tentada de novo depois.
+        """
+        if not self.context_cache_enabled:
+            return None
+        
+        cache_key = (model_name, hash(prefix))
+        with self._context_cache_lock:
+            entry = self._context_cache.get(cache_key)
+            if entry and entry['expires_at'] > time.monotonic():
+                return entry['model']
+            if cache_key in self._context_cache_inflight:
+                return entry['model'] if entry else None
+            self._context_cache_inflight.add(cache_key)
+        
+        ttl = int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', 3600))
+        try:
+            self._ensure_sdk()
+            from google.generativeai import caching
+            from datetime import timedelta
+            cached_content = caching.CachedContent.create(
+                model=model_name,
+                system_instruction=prefix,
+                ttl=timedelta(seconds=ttl)
+            )
+            model = genai.GenerativeModel.from_cached_content(
+                cached_content=cached_content,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings
+            )
+            # Renovar um pouco antes de o cache expirar no provedor
+            expires_at = time.monotonic() + ttl * 0.9
+            logger.info(f"🗄️ Cache de contexto criado para o prefixo do prompt ({model_name})")
+        except Exception as e:
+            model = None
+            expires_at = time.monotonic() + float(os.getenv('GEMINI_CONTEXT_CACHE_RETRY', 300))
+            logger.warning(f"⚠️ Cache de contexto indisponível para {model_name}: {e}")
+        
+        with self._context_cache_lock:
+            self._context_cache[cache_key] = {'model': model, 'expires_at': expires_at}
+            self._context_cache_inflight.discard(cache_key)
+        return model
+    
+    def _generate_with_retry(self, prompt: str, max_retries: int = 3,
+                             tier: str = TIER_PRIMARY, prefix: str = '',
+                             generation_config: Optional[Dict] = None) -> Tuple[str, str]:
+        """
+        Gera resposta com retry adaptativo e roteamento entre modelos
+        
+        Apenas erros transitórios (quota, 5xx, timeout) são repetidos, com
+        backoff exponencial com jitter que respeita o Retry-After do provedor.
+        Erros de quota trocam imediatamente para o próximo modelo disponível.
+        Os retries consomem o orçamento do processo e o tempo total de espera
+        é limitado; modelos com circuit breaker aberto são pulados.
+        
+        Quando há prefix e o modelo tem cache de contexto, apenas o prompt
+        dinâmico é enviado; caso contrário prefix + prompt. generation_config
+        substitui a configuração do modelo apenas nesta chamada.
+        
+        Returns:
+            Texto gerado e nome do modelo que respondeu
+        """
+        max_total_wait = float(os.getenv('GEMINI_MAX_RETRY_WAIT', 20))
+        waited = 0.0
+        options = {'generation_config': generation_config} if generation_config else {}
         
         for attempt in range(max_retries):
+            model_name = self._select_model(tier, attempt)
+            
             try:
-                logger.info(f"🔄 Tentativa {attempt + 1} de geração com Gemini Pro")
+                logger.info(f"🔄 Tentativa {attempt + 1} de geração com {model_name}")
                 
-                response = self.model.generate_content(prompt)
-                
-                if response.text:
-                    logger.info("✅ Resposta gerada com sucesso")
-                    return response.text
+                cached_model = self._get_prefix_cached_model(model_name, prefix) if prefix else None
+                if cached_model is not None:
+                    text = self.router.call(
+                        model_name, lambda _: cached_model.generate_content(prompt, **options).text
+                    )
                 else:
-                    raise Exception("Resposta vazia do Gemini")
+                    full_prompt = prefix + prompt
+                    text = self.router.call(
+                        model_name, lambda model: model.generate_content(full_prompt, **options).text
+                    )
+                
+                return self._accept_response(text, model_name), model_name
                     
             except Exception as e:
-                logger.warning(f"⚠️ Tentativa {attempt + 1} falhou: {e}")
-                
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt  # Backoff exponencial
-                    logger.info(f"⏳ Aguardando {wait_time}s antes da próxima tentativa...")
+                wait_time = self._retry_wait(e, model_name, attempt, max_retries, tier, waited, max_total_wait)
+                if wait_time:
+                    logger.info(f"⏳ Aguardando {wait_time:.1f}s antes da próxima tentativa...")
                     time.sleep(wait_time)
+                    waited += wait_time
+    
+    async def _generate_with_retry_async(self, prompt: str, max_retries: int = 3,
+                                         tier: str = TIER_PRIMARY, prefix: str = '',
+                                         generation_config: Optional[Dict] = None) -> Tuple[str, str]:
+        """Versão assíncrona de _generate_with_retry (mesma política de retry)"""
+        max_total_wait = float(os.getenv('GEMINI_MAX_RETRY_WAIT', 20))
+        waited = 0.0
+        options = {'generation_config': generation_config} if generation_config else {}
+        
+        for attempt in range(max_retries):
+            model_name = self._select_model(tier, attempt)
+            
+            try:
+                logger.info(f"🔄 Tentativa {attempt + 1} de geração assíncrona com {model_name}")
+                
+                # A criação do cache de contexto é uma chamada de rede bloqueante
+                cached_model = (
+                    await asyncio.to_thread(self._get_prefix_cached_model, model_name, prefix) if prefix else None
+                )
+                if cached_model is not None:
+                    response = await self.router.call_async(
+                        model_name, lambda _: cached_model.generate_content_async(prompt, **options)
+                    )
                 else:
-                    logger.error(f"❌ Todas as tentativas falharam")
-                    raise e
+                    full_prompt = prefix + prompt
+                    response = await self.router.call_async(
+                        model_name, lambda model: model.generate_content_async(full_prompt, **options)
+                    )
+                
+                return self._accept_response(response.text, model_name), model_name
+                    
+            except Exception as e:
+                wait_time = self._retry_wait(e, model_name, attempt, max_retries, tier, waited, max_total_wait)
+                if wait_time:
+                    logger.info(f"⏳ Aguardando {wait_time:.1f}s antes da próxima tentativa...")
+                    await asyncio.sleep(wait_time)
+                    waited += wait_time
+    
+    def _select_model(self, tier: str, attempt: int) -> str:
+        """Primeiro modelo candidato com circuito fechado (ou em teste)"""
+        model_name = next(
+            (name for name in self.router.candidates(tier, attempt)
+             if get_circuit_breaker(name).allow_request()),
+            None
+        )
+        if model_name is None:
+            raise CircuitOpenError("Nenhum modelo Gemini disponível (circuitos abertos ou quota esgotada)")
+        return model_name
+    
+    def _accept_response(self, text: str, model_name: str) -> str:
+        if not text:
+            raise Exception("Resposta vazia do Gemini")
+        get_circuit_breaker(model_name).record_success()
+        gemini_retry_budget.record_success()
+        logger.info("✅ Resposta gerada com sucesso")
+        return text
+    
+    def _retry_wait(self, error: Exception, model_name: str, attempt: int, max_retries: int,
+                    tier: str, waited: float, max_total_wait: float) -> float:
+        """
+        Aplica a política de retry a uma falha
+        
+        Returns:
+            Segundos a aguardar antes da próxima tentativa (0 = trocar de modelo já)
+        
+        Raises:
+            O próprio erro quando não deve haver nova tentativa
+        """
+        category = classify_error(error)
+        get_circuit_breaker(model_name).record_failure(category)
+        logger.warning(f"⚠️ Tentativa {attempt + 1} falhou em {model_name} ({category}): {error}")
+        
+        if not is_retryable(category):
+            logger.error(f"❌ Erro não recuperável ({category}), abortando retries")
+            raise error
+        
+        if attempt >= max_retries - 1:
+            logger.error(f"❌ Todas as tentativas falharam")
+            raise error
+        
+        if not gemini_retry_budget.try_acquire():
+            logger.error("❌ Orçamento de retries do processo esgotado")
+            raise error
+        
+        if category == ERROR_QUOTA:
+            self.router.mark_quota_exhausted(model_name)
+            if not self.router.candidates(tier, attempt + 1):
+                logger.error("❌ Quota esgotada em todos os modelos")
+                raise error
+            return 0.0
+        
+        wait_time = backoff_delay(attempt, retry_after=extract_retry_after(error))
+        if waited + wait_time > max_total_wait:
+            logger.error(f"❌ Tempo máximo de espera por retries excedido ({max_total_wait}s)")
+            raise error
+        return wait_time
     
     def _process_gemini_response(self, response_text: str) -> Dict:
         """Processa resposta do Gemini e extrai JSON"""
@@ -477,7 +905,7 @@ GERE A ANÁLISE ULTRA-DETALHADA AGORA:
             # Limpar resposta
             response_text = response_text.strip()
             
-            # Remover markdown se presente
+            # Remover markdown se presente (SDKs sem modo JSON)
             if response_text.startswith('```json'):
                 response_text = response_text[7:]
             if response_text.startswith('```'):
@@ -488,17 +916,12 @@ GERE A ANÁLISE ULTRA-DETALHADA AGORA:
             # Tentar parsear JSON
             analysis = json.loads(response_text)
             
-            # Validar estrutura básica
-            required_keys = [
-                'avatar_ultra_detalhado', 'escopo', 'analise_concorrencia_detalhada',
-                'estrategia_palavras_chave', 'metricas_performance_detalhadas',
-                'projecoes_cenarios', 'inteligencia_mercado', 'plano_acao_detalhado',
-                'insights_exclusivos'
-            ]
-            
-            missing_keys = [key for key in required_keys if key not in analysis]
-            if missing_keys:
-                logger.warning(f"⚠️ Chaves ausentes na resposta: {missing_keys}")
+            # Validar estrutura com o schema compilado: seções ausentes ou com
+            # tipo errado quebrariam o relatório e a persistência por coluna
+            schema_errors = validate_analysis(analysis)
+            if schema_errors:
+                logger.warning(f"⚠️ Resposta fora do schema, descartada: {schema_errors[:10]}")
+                return self._extract_fallback_analysis(response_text)
             
             logger.info("✅ JSON processado com sucesso")
             return analysis
@@ -757,12 +1180,57 @@ GERE A ANÁLISE ULTRA-DETALHADA AGORA:
             }
         }
     
+    def embed_text(self, text: str, task_type: str = 'semantic_similarity') -> Optional[List[float]]:
+        """Gera o embedding do texto com o modelo de embeddings do Gemini"""
+        self._ensure_sdk()
+        result = genai.embed_content(
+            model=os.getenv('GEMINI_EMBEDDING_MODEL', 'models/embedding-001'),
+            content=text,
+            task_type=task_type
+        )
+        return result.get('embedding') if isinstance(result, dict) else None
+    
+    def summarize_text(self, text: str, max_chars: int = 2000, focus: str = '') -> str:
+        """
+        Resume um trecho de texto com o modelo rápido
+        
+        Usado na condensação de anexos grandes. A resposta vem em JSON
+        ({"resumo": ...}) para funcionar com ou sem o modo JSON do modelo.
+        """
+        prompt = (
+            f"Resuma o texto abaixo em português, em no máximo {max_chars} caracteres, preservando "
+            f"números, nomes, dados de público, preços, concorrentes e conclusões relevantes para "
+            f"uma análise de mercado{f' sobre {focus}' if focus else ''}. Não invente informações.\n"
+            f'Responda apenas com JSON no formato {{"resumo": "..."}}.\n\n'
+            f"TEXTO:\n{text}"
+        )
+        response, _ = self._generate_with_retry(prompt, max_retries=2, tier=TIER_FAST)
+        
+        response = response.strip()
+        if response.startswith('```'):
+            response = response.strip('`').removeprefix('json').strip()
+        try:
+            summary = json.loads(response).get('resumo', '')
+        except (json.JSONDecodeError, AttributeError):
+            summary = response
+        return str(summary).strip()[:max_chars]
+    
+    def get_resilience_stats(self) -> Dict:
+        """Retorna estado do circuit breaker e do orçamento de retries"""
+        return {
+            'circuit_breakers': {name: breaker.get_stats() for name, breaker in list(_circuit_breakers.items())},
+            'retry_budget': gemini_retry_budget.get_stats(),
+            'router': self.router.get_stats()
+        }
+    
     def test_connection(self) -> bool:
         """Testa conexão com Gemini"""
         try:
-            logger.info("🔍 Testando conexão com Gemini Pro 1.5...")
-            response = self.model.generate_content("Teste de conexão. Responda apenas: CONEXÃO OK")
-            result = bool(response.text and "OK" in response.text.upper())
+            logger.info("🔍 Testando conexão com Gemini...")
+            text, _ = self._generate_with_retry(
+                "Teste de conexão. Responda apenas: CONEXÃO OK", max_retries=1, tier=TIER_FAST
+            )
+            result = bool(text and "OK" in text.upper())
             
             if result:
                 logger.info("✅ Conexão com Gemini Pro 1.5 funcionando")
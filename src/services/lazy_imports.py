@@ -0,0 +1,60 @@
+import importlib
+import threading
+import types
+from typing import Optional
+
+
+class LazyModule(types.ModuleType):
+    """
+    Proxy de módulo importado no primeiro acesso a um atributo
+
+    Permite declarar dependências pesadas no topo do arquivo
+    (ex.: ``genai = lazy_import('google.generativeai')``) sem pagar o custo
+    de importação no boot da aplicação. Erros de importação aparecem no
+    primeiro uso, como ImportError.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_lock'] = threading.Lock()
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with self.__dict__['_lazy_lock']:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'carregado' if self.__dict__['_lazy_module'] is not None else 'não carregado'
+        return f"<módulo lazy '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Retorna um proxy que importa o módulo no primeiro uso"""
+    return LazyModule(name)
+
+
+def optional_import(name: str) -> Optional[types.ModuleType]:
+    """Importa o módulo agora, retornando None se não estiver instalado"""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def is_loaded(module) -> bool:
+    """Indica se um LazyModule já foi importado (módulos comuns: sempre True)"""
+    if isinstance(module, LazyModule):
+        return module.__dict__['_lazy_module'] is not None
+    return True
@@ -0,0 +1,215 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TIER_PRIMARY = 'primary'
+TIER_FAST = 'fast'
+
+
+def _env_list(name: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, '').split(',') if item.strip()]
+
+
+class ModelRouter:
+    """
+    Roteador de modelos Gemini
+
+    - Seleciona o modelo por tier (primary para a análise completa, fast para
+      tarefas mais baratas e para retries quando GEMINI_RETRY_ON_FAST=true)
+    - Em erro de quota o modelo entra em cooldown e a próxima tentativa usa o
+      próximo modelo da lista de fallback
+    - Opcionalmente dispara uma requisição "hedged" quando a primeira passa do
+      p95 de latência observado, ficando com a que terminar primeiro
+    """
+
+    def __init__(self,
+                 model_factory: Callable[[str], Any],
+                 primary_model: Optional[str] = None,
+                 fast_model: Optional[str] = None,
+                 fallback_models: Optional[List[str]] = None):
+        self.model_factory = model_factory
+        self.primary_model = primary_model or os.getenv('GEMINI_MODEL', 'gemini-1.5-pro')
+        self.fast_model = fast_model or os.getenv('GEMINI_FAST_MODEL', 'gemini-1.5-flash')
+        self.fallback_models = fallback_models if fallback_models is not None else _env_list('GEMINI_FALLBACK_MODELS')
+        self.retry_on_fast = os.getenv('GEMINI_RETRY_ON_FAST', 'false').lower() == 'true'
+        self.quota_cooldown = float(os.getenv('GEMINI_QUOTA_COOLDOWN', 60))
+
+        # Hedged requests
+        self.hedge_enabled = os.getenv('GEMINI_HEDGE_ENABLED', 'false').lower() == 'true'
+        self.hedge_default_delay = float(os.getenv('GEMINI_HEDGE_DELAY', 45))
+        self.hedge_min_samples = int(os.getenv('GEMINI_HEDGE_MIN_SAMPLES', 20))
+        self.hedge_percentile = float(os.getenv('GEMINI_HEDGE_PERCENTILE', 0.95))
+        self._hedge_executor = None
+        if self.hedge_enabled:
+            self._hedge_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=int(os.getenv('GEMINI_HEDGE_MAX_WORKERS', 16)),
+                thread_name_prefix='gemini-hedge'
+            )
+
+        self._models: Dict[str, Any] = {}
+        self._quota_exhausted_until: Dict[str, float] = {}
+        self._latencies: Dict[str, deque] = {}
+        self._stats = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'quota_fallbacks': 0}
+        self._lock = threading.Lock()
+
+    def get_model(self, model_name: str) -> Any:
+        """Retorna (criando sob demanda) a instância do modelo"""
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self.model_factory(model_name)
+                self._models[model_name] = model
+            return model
+
+    def candidates(self, tier: str = TIER_PRIMARY, attempt: int = 0) -> List[str]:
+        """Lista ordenada de modelos a tentar para o tier e a tentativa"""
+        if tier == TIER_FAST or (attempt > 0 and self.retry_on_fast):
+            ordered = [self.fast_model, self.primary_model]
+        else:
+            ordered = [self.primary_model, self.fast_model]
+        ordered += self.fallback_models
+
+        now = time.monotonic()
+        seen = set()
+        result = []
+        for name in ordered:
+            if not name or name in seen:
+                continue
+            seen.add(name)
+            if self._quota_exhausted_until.get(name, 0) > now:
+                continue
+            result.append(name)
+        return result
+
+    def mark_quota_exhausted(self, model_name: str):
+        """Coloca o modelo em cooldown após erro de quota"""
+        with self._lock:
+            self._quota_exhausted_until[model_name] = time.monotonic() + self.quota_cooldown
+            self._stats['quota_fallbacks'] += 1
+        logger.warning(f"⚠️ Quota esgotada em {model_name}, usando fallback por {self.quota_cooldown:.0f}s")
+
+    def record_latency(self, model_name: str, seconds: float):
+        with self._lock:
+            window = self._latencies.setdefault(model_name, deque(maxlen=200))
+            window.append(seconds)
+
+    def latency_percentile(self, model_name: str, percentile: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies.get(model_name, ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile * (len(samples) - 1))))
+        return samples[index]
+
+    def hedge_delay(self, model_name: str) -> float:
+        """Tempo após o qual a requisição hedged é disparada"""
+        observed = self.latency_percentile(model_name, self.hedge_percentile)
+        return observed if observed is not None else self.hedge_default_delay
+
+    def _timed_call(self, model_name: str, call: Callable[[Any], Any]) -> Any:
+        start = time.monotonic()
+        result = call(self.get_model(model_name))
+        self.record_latency(model_name, time.monotonic() - start)
+        return result
+
+    def call(self, model_name: str, call: Callable[[Any], Any]) -> Any:
+        """
+        Executa call(model) no modelo indicado, com hedging quando habilitado
+
+        Args:
+            model_name: Nome do modelo
+            call: Função que recebe a instância do modelo e faz a requisição
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+
+        if not self._hedge_executor:
+            return self._timed_call(model_name, call)
+
+        first = self._hedge_executor.submit(self._timed_call, model_name, call)
+        delay = self.hedge_delay(model_name)
+        done, _ = concurrent.futures.wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        logger.info(f"🏁 {model_name} passou de {delay:.1f}s, disparando requisição hedged")
+        with self._lock:
+            self._stats['hedged'] += 1
+        second = self._hedge_executor.submit(self._timed_call, model_name, call)
+
+        pending = {first, second}
+        last_error = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self._lock:
+                            self._stats['hedge_wins'] += 1
+                    return future.result()
+                last_error = future.exception()
+        raise last_error
+
+    async def _timed_call_async(self, model_name: str, call: Callable[[Any], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        result = await call(self.get_model(model_name))
+        self.record_latency(model_name, time.monotonic() - start)
+        return result
+
+    async def call_async(self, model_name: str, call: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Versão assíncrona de call(): call(model) retorna um awaitable"""
+        with self._lock:
+            self._stats['calls'] += 1
+
+        if not self.hedge_enabled:
+            return await self._timed_call_async(model_name, call)
+
+        first = asyncio.ensure_future(self._timed_call_async(model_name, call))
+        delay = self.hedge_delay(model_name)
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        logger.info(f"🏁 {model_name} passou de {delay:.1f}s, disparando requisição hedged")
+        with self._lock:
+            self._stats['hedged'] += 1
+        second = asyncio.ensure_future(self._timed_call_async(model_name, call))
+
+        pending = {first, second}
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is second:
+                            with self._lock:
+                                self._stats['hedge_wins'] += 1
+                        return future.result()
+                    last_error = future.exception()
+            raise last_error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            'primary_model': self.primary_model,
+            'fast_model': self.fast_model,
+            'fallback_models': self.fallback_models,
+            'hedge_enabled': self.hedge_enabled,
+            'available_models': self.candidates(),
+            'p95_latency': {
+                name: self.latency_percentile(name, 0.95) for name in list(self._latencies)
+            }
+        })
+        return stats
@@ -0,0 +1,198 @@
+import os
+import io
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import concurrent.futures
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class PDFArtifactCache:
+    """
+    Cache em disco de PDFs renderizados, endereçado por conteúdo
+
+    A chave é o SHA-256 de (analysis_id, versão do template). Os PDFs são
+    renderizados em segundo plano quando a análise termina, e o download serve
+    o arquivo pronto (com ETag e Range via send_file). Uma nova análise com o
+    mesmo analysis_uid (reprocessamento em lote, por exemplo) descarta o PDF
+    anterior e renderiza de novo; o ETag inclui o mtime do arquivo.
+
+    O diretório é limpo a cada PDF_ARTIFACT_CLEANUP_EVERY renderizações:
+    saem os PDFs renderizados há mais de PDF_ARTIFACT_TTL_DAYS e, acima de
+    PDF_ARTIFACT_MAX_MB, os mais antigos. Um PDF removido volta a ser
+    renderizado no próximo download.
+    """
+
+    def __init__(self,
+                 render_fn: Callable[[Dict], io.BytesIO],
+                 template_version: Union[str, Callable[[], str]],
+                 directory: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        self.render_fn = render_fn
+        self._template_version = template_version
+        self.directory = directory or os.getenv(
+            'PDF_ARTIFACT_DIR',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'artifacts', 'pdf')
+        )
+        self.enabled = os.getenv('PDF_PRERENDER_ENABLED', 'true').lower() == 'true'
+        self.ttl_seconds = float(os.getenv('PDF_ARTIFACT_TTL_DAYS', 30)) * 86400
+        self.max_bytes = int(float(os.getenv('PDF_ARTIFACT_MAX_MB', 1024)) * 1024 * 1024)
+        self.cleanup_every = int(os.getenv('PDF_ARTIFACT_CLEANUP_EVERY', 20))
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv('PDF_PRERENDER_WORKERS', 2)),
+            thread_name_prefix='pdf-prerender'
+        )
+        self._in_flight: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'rendered': 0, 'errors': 0, 'invalidated': 0, 'evicted': 0}
+
+    @property
+    def template_version(self) -> str:
+        # Aceita uma função para não importar o gerador de PDF no boot
+        if callable(self._template_version):
+            self._template_version = self._template_version()
+        return self._template_version
+
+    def key_for(self, analysis_id: str) -> str:
+        """Chave (e ETag) do artefato de uma análise"""
+        raw = f"{analysis_id}:{self.template_version}".encode('utf-8')
+        return hashlib.sha256(raw).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        # Dois níveis de diretório para não concentrar milhares de arquivos
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def etag_for(self, analysis_id: str, path: str) -> str:
+        """ETag do arquivo servido: muda quando o PDF é renderizado de novo"""
+        return f"{self.key_for(analysis_id)}-{os.stat(path).st_mtime_ns:x}"
+
+    def get(self, analysis_id: str) -> Optional[str]:
+        """Caminho do PDF em cache (None se ainda não renderizado)"""
+        path = self.path_for(self.key_for(analysis_id))
+        found = os.path.exists(path)
+        with self._lock:
+            self._stats['hits' if found else 'misses'] += 1
+        return path if found else None
+
+    def invalidate(self, analysis_id: str) -> bool:
+        """Remove o PDF de uma análise (refeita com o mesmo analysis_uid)"""
+        try:
+            os.remove(self.path_for(self.key_for(analysis_id)))
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self._stats['invalidated'] += 1
+        return True
+
+    def render(self, analysis_id: str, report: Dict, replace: bool = False) -> str:
+        """Renderiza o PDF (se necessário, ou sempre com replace) e retorna o caminho"""
+        key = self.key_for(analysis_id)
+        path = self.path_for(key)
+        if not replace and os.path.exists(path):
+            return path
+
+        buffer = self.render_fn(report)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Escrita atômica: leitores nunca veem um PDF parcial
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buffer.getbuffer())
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._lock:
+            self._stats['rendered'] += 1
+            cleanup = self.cleanup_every > 0 and self._stats['rendered'] % self.cleanup_every == 0
+        if cleanup:
+            self.cleanup()
+        return path
+
+    def cleanup(self) -> int:
+        """Remove PDFs expirados e, acima do limite de espaço, os mais antigos"""
+        cutoff = time.time() - self.ttl_seconds
+        files: List[Tuple[float, int, str]] = []
+        removed = 0
+
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                    # Arquivos .part antigos são sobras de escritas interrompidas
+                    if stat.st_mtime < cutoff or (name.endswith('.part') and stat.st_mtime < time.time() - 3600):
+                        os.remove(path)
+                        removed += 1
+                    elif name.endswith('.pdf'):
+                        files.append((stat.st_mtime, stat.st_size, path))
+                except OSError:
+                    pass
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+                total -= size
+            except OSError:
+                pass
+
+        if removed:
+            with self._lock:
+                self._stats['evicted'] += removed
+            logger.info(f"Limpeza de PDFs: {removed} artefatos removidos")
+        return removed
+
+    def render_async(self, analysis_id: str, report: Dict,
+                     replace: bool = False) -> Optional[concurrent.futures.Future]:
+        """Agenda a renderização em segundo plano (uma por análise)"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            future = self._in_flight.get(analysis_id)
+            if future is not None and not replace:
+                return future
+            future = self._executor.submit(self._render_in_background, analysis_id, report, replace)
+            self._in_flight[analysis_id] = future
+        future.add_done_callback(lambda done: self._forget(analysis_id, done))
+        return future
+
+    def _forget(self, analysis_id: str, future: concurrent.futures.Future):
+        # Uma renderização mais recente (replace) pode ter ocupado a vaga
+        with self._lock:
+            if self._in_flight.get(analysis_id) is future:
+                del self._in_flight[analysis_id]
+
+    def _render_in_background(self, analysis_id: str, report: Dict, replace: bool = False) -> Optional[str]:
+        try:
+            path = self.render(analysis_id, report, replace=replace)
+            logger.info(f"PDF da analise {analysis_id} pre-renderizado")
+            return path
+        except Exception as e:
+            with self._lock:
+                self._stats['errors'] += 1
+            logger.error(f"Erro ao pre-renderizar PDF da analise {analysis_id}: {e}")
+            return None
+
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                'in_flight': len(self._in_flight),
+                'template_version': None if callable(self._template_version) else self._template_version,
+                'enabled': self.enabled
+            }
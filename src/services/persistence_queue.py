@@ -0,0 +1,151 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PersistenceQueue:
+    """
+    Fila write-behind para gravações na tabela do Supabase
+
+    As gravações são enfileiradas sem bloquear a requisição e uma thread em
+    segundo plano as envia em lote com um único upsert por grupo de colunas.
+    Gravações pendentes para a mesma chave são combinadas (a inicial e a de
+    conclusão de uma análise rápida viram uma única linha). Falhas são
+    repetidas com backoff antes de a linha ser descartada.
+
+    write_fn (opcional) substitui o upsert do cliente Supabase, recebendo as
+    linhas de um lote (ex.: o repositório de análises em Postgres direto).
+    """
+
+    def __init__(self,
+                 client,
+                 table: str = 'analyses',
+                 conflict_column: str = 'analysis_uid',
+                 batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None,
+                 max_retries: Optional[int] = None,
+                 write_fn: Optional[Callable[[List[Dict]], None]] = None):
+        self.client = client
+        self.write_fn = write_fn
+        self.table = table
+        self.conflict_column = conflict_column
+        self.batch_size = batch_size or int(os.getenv('PERSISTENCE_BATCH_SIZE', 50))
+        self.flush_interval = flush_interval or float(os.getenv('PERSISTENCE_FLUSH_INTERVAL', 1.0))
+        self.max_retries = max_retries or int(os.getenv('PERSISTENCE_MAX_RETRIES', 5))
+
+        self._pending: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._in_flight = 0
+        self._flush_waiters = 0
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+        self._stats = {'enqueued': 0, 'written': 0, 'batches': 0, 'retries': 0, 'dropped': 0}
+
+    def enqueue(self, record: Dict):
+        """Enfileira uma linha (combinando com gravações pendentes da mesma chave)"""
+        key = record[self.conflict_column]
+        with self._condition:
+            self._ensure_worker()
+            pending = self._pending.get(key)
+            self._pending[key] = {**pending, **record} if pending else dict(record)
+            self._stats['enqueued'] += 1
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _ensure_worker(self):
+        # Threads não sobrevivem a fork (gunicorn --preload): iniciar por processo
+        if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+            return
+        self._worker_pid = os.getpid()
+        self._worker = threading.Thread(target=self._run, name=f'persistence-{self.table}', daemon=True)
+        self._worker.start()
+
+    def _take_batch(self) -> List[Dict]:
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            _, record = self._pending.popitem(last=False)
+            batch.append(record)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                # Com um flush() aguardando, gravar já: a notificação dele pode
+                # ter chegado antes de a thread começar a esperar
+                if len(self._pending) < self.batch_size and not (self._flush_waiters and self._pending):
+                    self._condition.wait(timeout=self.flush_interval)
+                batch = self._take_batch()
+                self._in_flight += len(batch)
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                finally:
+                    with self._condition:
+                        self._in_flight -= len(batch)
+                        self._condition.notify_all()
+
+    def _write_batch(self, batch: List[Dict]):
+        # O upsert em lote do PostgREST exige as mesmas colunas em todas as linhas
+        groups: Dict[tuple, List[Dict]] = {}
+        for record in batch:
+            groups.setdefault(tuple(sorted(record)), []).append(record)
+
+        for rows in groups.values():
+            for attempt in range(self.max_retries):
+                try:
+                    if self.write_fn:
+                        self.write_fn(rows)
+                    else:
+                        self.client.table(self.table).upsert(rows, on_conflict=self.conflict_column).execute()
+                    with self._condition:
+                        self._stats['written'] += len(rows)
+                        self._stats['batches'] += 1
+                    logger.info(f"Lote de {len(rows)} registros gravado em '{self.table}'")
+                    break
+                except Exception as e:
+                    with self._condition:
+                        self._stats['retries'] += 1
+                    if attempt >= self.max_retries - 1:
+                        with self._condition:
+                            self._stats['dropped'] += len(rows)
+                        logger.error(f"Lote de {len(rows)} registros descartado após {self.max_retries} tentativas: {e}")
+                        break
+                    wait_time = random.uniform(0, min(30, 2 ** attempt))
+                    logger.warning(f"Erro ao gravar lote em '{self.table}' (tentativa {attempt + 1}): {e}")
+                    time.sleep(wait_time)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Aguarda a gravação das linhas pendentes; retorna False no timeout"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            if self._pending:
+                self._ensure_worker()
+            self._flush_waiters += 1
+            try:
+                self._condition.notify_all()
+                while self._pending or self._in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(timeout=min(remaining, self.flush_interval))
+                    self._condition.notify_all()
+            finally:
+                self._flush_waiters -= 1
+        return True
+
+    def get_stats(self) -> Dict:
+        with self._condition:
+            return {
+                **self._stats,
+                'pending': len(self._pending),
+                'in_flight': self._in_flight,
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval
+            }
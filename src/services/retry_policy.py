@@ -0,0 +1,278 @@
+import re
+import time
+import random
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Categorias de erro retornadas por classify_error
+ERROR_QUOTA = 'quota'
+ERROR_SERVER = 'server'
+ERROR_TIMEOUT = 'timeout'
+ERROR_SAFETY = 'safety'
+ERROR_AUTH = 'auth'
+ERROR_INVALID = 'invalid_request'
+ERROR_UNKNOWN = 'unknown'
+
+RETRYABLE_ERRORS = {ERROR_QUOTA, ERROR_SERVER, ERROR_TIMEOUT, ERROR_UNKNOWN}
+
+# Erros que indicam indisponibilidade do provedor (contam para o circuit breaker)
+OUTAGE_ERRORS = {ERROR_QUOTA, ERROR_SERVER, ERROR_TIMEOUT}
+
+# Nomes (em minúsculas) das exceções do SDK/requests por categoria
+_SAFETY_NAMES = {'blockedpromptexception', 'stopcandidateexception', 'blockedprompt', 'stopcandidate'}
+_AUTH_NAMES = {'unauthenticated', 'permissiondenied'}
+_QUOTA_NAMES = {'resourceexhausted', 'toomanyrequests'}
+_TIMEOUT_NAMES = {'deadlineexceeded', 'timeout', 'readtimeout', 'connecttimeout'}
+_SERVER_NAMES = {'internalservererror', 'serviceunavailable', 'badgateway'}
+_INVALID_NAMES = {'invalidargument', 'notfound', 'failedprecondition'}
+
+# Fallbacks pela mensagem, com limites de palavra: números e palavras
+# soltas (um "500" em um limite de tokens) não mudam a classificação
+_SAFETY_PATTERN = re.compile(
+    r'\b(?:(?:prompt|response|content|candidate) (?:was )?blocked|block_reason|safety[ _]ratings?'
+    r'|finish_reason\W+(?:is\W+)?(?:safety|3))\b'
+)
+_AUTH_PATTERN = re.compile(r'\b(?:api key not valid|api_key_invalid|permission denied|unauthenticated)\b')
+_QUOTA_PATTERN = re.compile(r'\b(?:quota|resource[ _]exhausted|rate[ _-]?limit(?:ed)?|429)\b')
+_TIMEOUT_PATTERN = re.compile(r'\b(?:timeout|timed out|deadline[ _]exceeded)\b')
+_SERVER_PATTERN = re.compile(r'\b(?:internal (?:server )?error|service unavailable|bad gateway|50[0234])\b')
+
+_RETRY_AFTER_PATTERN = re.compile(
+    r'(?:retry[ _-]?(?:after|in|delay)[^0-9]{0,20})(\d+(?:\.\d+)?)\s*s', re.IGNORECASE
+)
+
+
+class CircuitOpenError(Exception):
+    """Erro lançado quando o circuit breaker está aberto"""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Extrai o código HTTP de exceções do google-api-core ou do requests"""
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Classifica uma exceção de chamada ao LLM
+
+    O tipo da exceção e o código HTTP têm prioridade. A mensagem só decide
+    quando não há código (exceções genéricas); bloqueio de segurança e chave
+    inválida também são reconhecidos pela mensagem porque o provedor os
+    devolve como 400.
+
+    Returns:
+        Uma das categorias ERROR_*
+    """
+    name = type(error).__name__.lower()
+    message = str(error).lower()
+    status = _status_code(error)
+
+    if name in _SAFETY_NAMES or _SAFETY_PATTERN.search(message):
+        return ERROR_SAFETY
+
+    if status in (401, 403) or name in _AUTH_NAMES or _AUTH_PATTERN.search(message):
+        return ERROR_AUTH
+
+    if status == 429 or name in _QUOTA_NAMES:
+        return ERROR_QUOTA
+
+    if status in (408, 504) or name in _TIMEOUT_NAMES or isinstance(error, TimeoutError):
+        return ERROR_TIMEOUT
+
+    if (status is not None and status >= 500) or name in _SERVER_NAMES:
+        return ERROR_SERVER
+
+    if status in (400, 404, 422) or name in _INVALID_NAMES:
+        return ERROR_INVALID
+
+    if status is None:
+        if _QUOTA_PATTERN.search(message):
+            return ERROR_QUOTA
+        if _TIMEOUT_PATTERN.search(message):
+            return ERROR_TIMEOUT
+        if _SERVER_PATTERN.search(message):
+            return ERROR_SERVER
+
+    return ERROR_UNKNOWN
+
+
+def is_retryable(category: str) -> bool:
+    """Indica se a categoria de erro vale uma nova tentativa"""
+    return category in RETRYABLE_ERRORS
+
+
+def extract_retry_after(error: Exception) -> Optional[float]:
+    """Obtém o tempo de espera sugerido pelo provedor (Retry-After / retry_delay)"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        value = headers.get('Retry-After') or headers.get('retry-after')
+        if value:
+            try:
+                return max(0.0, float(value))
+            except (TypeError, ValueError):
+                pass
+
+    match = _RETRY_AFTER_PATTERN.search(str(error))
+    if match:
+        return float(match.group(1))
+
+    # google.rpc.RetryInfo: "retry_delay { seconds: 30 }"
+    match = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', str(error))
+    if match:
+        return float(match.group(1))
+
+    return None
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0,
+                  retry_after: Optional[float] = None) -> float:
+    """
+    Calcula a espera antes da próxima tentativa usando full jitter
+    (uniforme entre 0 e min(cap, base * 2^attempt)). Quando o provedor
+    informa Retry-After, ele é respeitado como piso.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class RetryBudget:
+    """
+    Orçamento de retries por processo (token bucket)
+
+    Cada retry consome um token. Os tokens são recompostos com o tempo e a
+    cada chamada bem-sucedida, limitando a fração de tráfego extra gerada por
+    retries durante uma degradação do provedor.
+    """
+
+    def __init__(self, max_tokens: float = 20.0, refill_per_second: float = 0.5,
+                 success_refill: float = 0.1):
+        self.max_tokens = max_tokens
+        self.refill_per_second = refill_per_second
+        self.success_refill = success_refill
+        self._tokens = max_tokens
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._tokens = min(self.max_tokens, self._tokens + elapsed * self.refill_per_second)
+        self._updated_at = now
+
+    def try_acquire(self) -> bool:
+        """Consome um token de retry; retorna False se o orçamento acabou"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def record_success(self):
+        """Recompõe parte do orçamento após uma chamada bem-sucedida"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.success_refill)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            self._refill()
+            return {
+                'available_tokens': round(self._tokens, 2),
+                'max_tokens': self.max_tokens
+            }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com estados closed / open / half_open
+
+    Após failure_threshold falhas consecutivas de indisponibilidade o circuito
+    abre e as chamadas falham imediatamente durante reset_timeout segundos.
+    Em seguida uma única chamada de teste é liberada (half_open).
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Indica se uma chamada pode ser feita agora"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def check(self):
+        """Lança CircuitOpenError se o circuito não permitir a chamada"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuito '{self.name}' aberto - chamada bloqueada")
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, category: str = ERROR_UNKNOWN):
+        """Registra uma falha; apenas erros de indisponibilidade abrem o circuito"""
+        with self._lock:
+            state = self._current_state()
+            if category not in OUTAGE_ERRORS:
+                self._probe_in_flight = False
+                return
+
+            self._failures += 1
+            if state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != self.OPEN:
+                    logger.warning(f"⚡ Circuito '{self.name}' aberto após {self._failures} falhas")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': self._current_state(),
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout
+            }
@@ -0,0 +1,130 @@
+import os
+import json
+import logging
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SimilarAnalysisService:
+    """
+    Recupera análises passadas semelhantes a partir do índice vetorial (pgvector)
+
+    O embedding é calculado sobre os dados de entrada (segmento, produto,
+    público, descrição, concorrentes) e gravado com a análise. Em uma nova
+    análise as mais semelhantes viram contexto de referência compacto no
+    prompt; quando uma delas é praticamente idêntica e do mesmo segmento ela
+    pode ser servida diretamente, sem nova geração.
+    """
+
+    def __init__(self, supabase_client, embed_fn: Optional[Callable[[str], Optional[List[float]]]] = None):
+        self.supabase = supabase_client
+        self.embed_fn = embed_fn
+        self.enabled = os.getenv('SIMILAR_ANALYSIS_ENABLED', 'true').lower() == 'true'
+        self.top_k = int(os.getenv('SIMILAR_ANALYSIS_TOP_K', 3))
+        self.min_similarity = float(os.getenv('SIMILAR_ANALYSIS_MIN_SIMILARITY', 0.80))
+        self.duplicate_threshold = float(os.getenv('SIMILAR_ANALYSIS_DUPLICATE_THRESHOLD', 0.97))
+        self.serve_duplicates = os.getenv('SIMILAR_ANALYSIS_SERVE_DUPLICATES', 'true').lower() == 'true'
+        self.max_context_chars = int(os.getenv('SIMILAR_ANALYSIS_MAX_CONTEXT_CHARS', 4000))
+
+    def is_available(self) -> bool:
+        """Verifica se o serviço está configurado"""
+        return bool(self.enabled and self.supabase and self.embed_fn)
+
+    @staticmethod
+    def build_input_text(analysis_data: Dict) -> str:
+        """Texto canônico dos dados de entrada usado para o embedding"""
+        fields = [
+            ('Segmento', analysis_data.get('segmento')),
+            ('Produto', analysis_data.get('produto')),
+            ('Público', analysis_data.get('publico')),
+            ('Descrição', analysis_data.get('descricao')),
+            ('Concorrentes', analysis_data.get('concorrentes')),
+            ('Preço', analysis_data.get('preco_float'))
+        ]
+        return "\n".join(f"{label}: {value}" for label, value in fields if value not in (None, ''))
+
+    def embed_analysis_input(self, analysis_data: Dict) -> Optional[List[float]]:
+        """Calcula o embedding dos dados de entrada; None em caso de erro"""
+        if not self.is_available():
+            return None
+        try:
+            return self.embed_fn(self.build_input_text(analysis_data))
+        except Exception as e:
+            logger.warning(f"Erro ao calcular embedding da analise: {e}")
+            return None
+
+    def find_similar(self, embedding: Optional[List[float]]) -> List[Dict]:
+        """Top-k análises concluídas mais semelhantes ao embedding"""
+        if not embedding or not self.is_available():
+            return []
+        try:
+            result = self.supabase.rpc('match_analyses', {
+                'query_embedding': embedding,
+                'match_count': self.top_k,
+                'min_similarity': self.min_similarity
+            }).execute()
+            matches = result.data or []
+            if matches:
+                logger.info(f"{len(matches)} analises semelhantes encontradas "
+                            f"(melhor similaridade: {matches[0]['similarity']:.3f})")
+            return matches
+        except Exception as e:
+            logger.warning(f"Erro ao buscar analises semelhantes: {e}")
+            return []
+
+    def get_near_duplicate(self, matches: List[Dict], analysis_data: Dict) -> Optional[Dict]:
+        """
+        Retorna a análise completa armazenada quando a mais semelhante é uma
+        quase duplicata do mesmo segmento; None caso contrário
+        """
+        if not self.serve_duplicates or not matches:
+            return None
+
+        best = matches[0]
+        same_segment = (best.get('nicho') or '').strip().lower() == analysis_data.get('segmento', '').strip().lower()
+        if best.get('similarity', 0) < self.duplicate_threshold or not same_segment:
+            return None
+
+        try:
+            result = self.supabase.table('analyses').select('comprehensive_analysis') \
+                .eq('analysis_uid', best['analysis_uid']).limit(1).execute()
+            if result.data and result.data[0].get('comprehensive_analysis'):
+                return {
+                    'analysis_uid': best['analysis_uid'],
+                    'similarity': best['similarity'],
+                    'analysis': result.data[0]['comprehensive_analysis']
+                }
+        except Exception as e:
+            logger.warning(f"Erro ao carregar analise quase duplicada: {e}")
+        return None
+
+    def build_reference_context(self, matches: List[Dict]) -> Optional[str]:
+        """Resumo compacto das análises semelhantes para o prompt"""
+        if not matches:
+            return None
+
+        parts = []
+        for match in matches:
+            avatar = match.get('avatar_data') or {}
+            competition = match.get('competition_data') or {}
+            competitors = [
+                item.get('nome') for item in competition.get('concorrentes_diretos', [])
+                if isinstance(item, dict) and item.get('nome')
+            ]
+            summary = {
+                'segmento': match.get('nicho'),
+                'produto': match.get('produto'),
+                'publico': match.get('publico'),
+                'similaridade': round(match.get('similarity', 0), 3),
+                'perfil_demografico': avatar.get('perfil_demografico'),
+                'dores_especificas': (avatar.get('dores_especificas') or [])[:3],
+                'concorrentes_diretos': competitors[:5],
+                'insights': (match.get('insights') or [])[:3]
+            }
+            parts.append(json.dumps(summary, ensure_ascii=False))
+
+        context = "\n".join(parts)
+        if len(context) > self.max_context_chars:
+            context = context[:self.max_context_chars] + "\n[Referências truncadas]"
+        return context
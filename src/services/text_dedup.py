@@ -0,0 +1,122 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+_PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+
+# Estimativa usada nos relatórios (~4 caracteres por token em português)
+CHARS_PER_TOKEN = 4
+
+
+def _tokens(text: str) -> List[str]:
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    normalized = ''.join(char for char in normalized if not unicodedata.combining(char))
+    return _TOKEN_PATTERN.findall(normalized)
+
+
+def simhash(text: str) -> int:
+    """
+    Impressão SimHash de 64 bits sobre as palavras do texto
+
+    Palavras isoladas (e não shingles) porque os trechos comparados são
+    curtos, como snippets de busca: trocar uma palavra em 20 muda poucos bits.
+    """
+    weights = [0] * 64
+    for token in _tokens(text):
+        value = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class DedupStats:
+    """Totais do processo por origem (busca, WebSailor, busca profunda)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources: Dict[str, Dict[str, int]] = {}
+
+    def record(self, source: str, checked: int, dropped: int, tokens_saved: int):
+        with self._lock:
+            totals = self._sources.setdefault(source, {'checked': 0, 'dropped': 0, 'tokens_saved': 0})
+            totals['checked'] += checked
+            totals['dropped'] += dropped
+            totals['tokens_saved'] += tokens_saved
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {source: dict(totals) for source, totals in self._sources.items()}
+
+
+dedup_stats = DedupStats()
+
+
+class NearDuplicateFilter:
+    """
+    Filtro de textos quase duplicados (SimHash) que mantém a primeira ocorrência
+
+    Dois textos são duplicados quando as impressões diferem em até
+    max_distance bits: cópias com pequenas edições ficam abaixo de 10,
+    textos diferentes sobre o mesmo assunto ficam perto de 20. Textos com
+    menos de min_tokens palavras (títulos, separadores) nunca são descartados.
+    Cada formatação compara dezenas de trechos, então a busca é linear.
+    """
+
+    def __init__(self, source: str = 'default', max_distance: Optional[int] = None,
+                 min_tokens: Optional[int] = None):
+        self.source = source
+        self.max_distance = max_distance if max_distance is not None else int(os.getenv('TEXT_DEDUP_MAX_DISTANCE', 10))
+        self.min_tokens = min_tokens or int(os.getenv('TEXT_DEDUP_MIN_TOKENS', 8))
+        self.enabled = os.getenv('TEXT_DEDUP_ENABLED', 'true').lower() == 'true'
+        self._fingerprints: List[int] = []
+        self.checked = 0
+        self.dropped = 0
+        self.chars_saved = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.chars_saved // CHARS_PER_TOKEN
+
+    def is_duplicate(self, text: str) -> bool:
+        """Verifica o texto e o registra quando não for duplicado"""
+        if not self.enabled or len(_tokens(text)) < self.min_tokens:
+            return False
+
+        self.checked += 1
+        fingerprint = simhash(text)
+        for candidate in self._fingerprints:
+            if bin(candidate ^ fingerprint).count('1') <= self.max_distance:
+                self.dropped += 1
+                self.chars_saved += len(text)
+                return True
+
+        self._fingerprints.append(fingerprint)
+        return False
+
+    def filter(self, texts: List[str]) -> List[str]:
+        return [text for text in texts if not self.is_duplicate(text)]
+
+    def dedup_paragraphs(self, text: str) -> str:
+        """Remove os parágrafos (blocos separados por linha em branco) já vistos"""
+        paragraphs = _PARAGRAPH_SPLIT.split(text)
+        return '\n\n'.join(self.filter(paragraphs))
+
+    def report(self) -> Dict:
+        """Registra os totais no processo e devolve o resumo deste filtro"""
+        dedup_stats.record(self.source, self.checked, self.dropped, self.tokens_saved)
+        if self.dropped:
+            logger.info(f"Dedup ({self.source}): {self.dropped} trechos quase duplicados removidos, "
+                        f"~{self.tokens_saved} tokens economizados")
+        return {'checked': self.checked, 'dropped': self.dropped, 'tokens_saved': self.tokens_saved}
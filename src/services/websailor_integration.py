@@ -4,6 +4,8 @@ from typing import Dict, Optional, Any
 import json
 from datetime import datetime
 
+from services.text_dedup import NearDuplicateFilter
+
 logger = logging.getLogger(__name__)
 
 class WebSailorIntegrationService:
@@ -140,6 +142,10 @@ class WebSailorIntegrationService:
         
         formatted_parts.append("=== PESQUISA PROFUNDA COM WEBSAILOR ===\n")
         
+        # Um filtro para buscas e páginas: o mesmo trecho costuma reaparecer em
+        # várias buscas e nas páginas visitadas a partir delas
+        dedup = NearDuplicateFilter(source='websailor')
+        
         # Resposta final
         if result.get('final_answer'):
             formatted_parts.append("📋 ANÁLISE PRINCIPAL:")
@@ -151,13 +157,14 @@ class WebSailorIntegrationService:
             formatted_parts.append("\n🔍 RESULTADOS DE BUSCA:")
             for i, search_result in enumerate(result['search_results'], 1):
                 formatted_parts.append(f"\n--- Busca {i} ---")
-                formatted_parts.append(search_result)
+                formatted_parts.append(dedup.dedup_paragraphs(search_result))
         
         # Páginas visitadas
         if result.get('visited_pages'):
             formatted_parts.append("\n📄 PÁGINAS ANALISADAS:")
             for i, page_content in enumerate(result['visited_pages'], 1):
                 formatted_parts.append(f"\n--- Página {i} ---")
+                page_content = dedup.dedup_paragraphs(page_content)
                 # Limitar conteúdo da página para evitar texto muito longo
                 if len(page_content) > 1000:
                     page_content = page_content[:1000] + "...\n[Conteúdo truncado]"
@@ -168,6 +175,8 @@ class WebSailorIntegrationService:
         formatted_parts.append(f"Total de iterações: {result.get('total_iterations', 0)}")
         formatted_parts.append(f"Buscas realizadas: {len(result.get('search_results', []))}")
         formatted_parts.append(f"Páginas visitadas: {len(result.get('visited_pages', []))}")
+        # Economia registrada em log e em /status (fora do texto enviado ao modelo)
+        dedup.report()
         
         return "\n".join(formatted_parts)
     
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced - Entry point WSGI para produção
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from run import create_app
+
+app = create_app()
@@ -0,0 +1,23 @@
+-- Chave estável para gravações write-behind (upsert em lote)
+-- A aplicação gera o analysis_uid antes da primeira gravação, então a linha
+-- inicial e a de conclusão podem ser enviadas em qualquer ordem e agrupadas.
+
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS analysis_uid UUID;
+
+-- Colunas gravadas pela aplicação que ainda não constavam nas migrações
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS user_query TEXT;
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS session_id VARCHAR(100);
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS search_context_used BOOLEAN DEFAULT false;
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS websailor_used BOOLEAN DEFAULT false;
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS attachments_used BOOLEAN DEFAULT false;
+
+-- Preencher registros antigos para que todos tenham chave
+UPDATE analyses SET analysis_uid = gen_random_uuid() WHERE analysis_uid IS NULL;
+
+ALTER TABLE analyses ALTER COLUMN analysis_uid SET DEFAULT gen_random_uuid();
+ALTER TABLE analyses ALTER COLUMN analysis_uid SET NOT NULL;
+
+-- Índice único exigido pelo ON CONFLICT (analysis_uid) do upsert
+CREATE UNIQUE INDEX IF NOT EXISTS idx_analyses_analysis_uid ON analyses(analysis_uid);
+
+COMMENT ON COLUMN analyses.analysis_uid IS 'Identificador gerado pela aplicação, usado como chave do upsert write-behind';
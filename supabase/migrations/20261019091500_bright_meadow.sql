@@ -0,0 +1,58 @@
+-- Tabela materializada de segmentos (valores distintos de analyses.nicho)
+-- Mantida por trigger, evita varrer a tabela analyses a cada /api/segmentos
+-- e permite busca por prefixo para autocomplete.
+
+CREATE TABLE IF NOT EXISTS analysis_segmentos (
+    nicho VARCHAR(255) PRIMARY KEY,
+    nicho_busca VARCHAR(255) GENERATED ALWAYS AS (lower(nicho)) STORED,
+    analyses_count INTEGER NOT NULL DEFAULT 0,
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Índice para busca por prefixo (LIKE 'abc%') na forma minúscula
+CREATE INDEX IF NOT EXISTS idx_analysis_segmentos_busca
+ON analysis_segmentos (nicho_busca text_pattern_ops);
+
+-- Popular com os segmentos já existentes (usa idx_analyses_nicho)
+INSERT INTO analysis_segmentos (nicho, analyses_count, last_used_at)
+SELECT nicho, COUNT(*), MAX(created_at)
+FROM analyses
+WHERE nicho IS NOT NULL AND nicho <> ''
+GROUP BY nicho
+ON CONFLICT (nicho) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION sync_analysis_segmentos()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.nicho IS NULL OR NEW.nicho = '' THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO analysis_segmentos (nicho, analyses_count, last_used_at)
+    VALUES (NEW.nicho, 1, NOW())
+    ON CONFLICT (nicho) DO UPDATE
+        SET analyses_count = analysis_segmentos.analyses_count + 1,
+            last_used_at = NOW();
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS sync_analysis_segmentos_insert ON analyses;
+CREATE TRIGGER sync_analysis_segmentos_insert
+    AFTER INSERT ON analyses
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_analysis_segmentos();
+
+DROP TRIGGER IF EXISTS sync_analysis_segmentos_update ON analyses;
+CREATE TRIGGER sync_analysis_segmentos_update
+    AFTER UPDATE OF nicho ON analyses
+    FOR EACH ROW
+    WHEN (OLD.nicho IS DISTINCT FROM NEW.nicho)
+    EXECUTE FUNCTION sync_analysis_segmentos();
+
+ALTER TABLE analysis_segmentos ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow read on analysis_segmentos" ON analysis_segmentos
+    FOR SELECT USING (true);
+
+COMMENT ON TABLE analysis_segmentos IS 'Segmentos distintos de analyses.nicho, mantidos por trigger';
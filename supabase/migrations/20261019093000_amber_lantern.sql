@@ -0,0 +1,18 @@
+-- Busca textual (português) sobre as análises armazenadas
+-- Coluna tsvector gerada a partir de segmento, produto, descrição e insights
+
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese', coalesce(nicho, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(produto, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(descricao, '')), 'B') ||
+        setweight(to_tsvector('portuguese', coalesce((comprehensive_analysis -> 'insights_exclusivos')::text, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_analyses_search_vector
+ON analyses USING GIN (search_vector);
+
+-- Os filtros de contenção (@>) usam os índices GIN já existentes em
+-- comprehensive_analysis, market_intelligence e action_plan
+
+COMMENT ON COLUMN analyses.search_vector IS 'Vetor de busca textual (config portuguese) sobre segmento, produto, descrição e insights';
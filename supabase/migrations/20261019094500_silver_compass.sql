@@ -0,0 +1,50 @@
+-- Índice vetorial (pgvector) para recuperar análises semelhantes
+-- O embedding (768 dimensões, Gemini embedding-001) é calculado a partir dos
+-- dados de entrada da análise e gravado junto com o registro.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS embedding vector(768);
+
+CREATE INDEX IF NOT EXISTS idx_analyses_embedding
+ON analyses USING hnsw (embedding vector_cosine_ops);
+
+-- Top-k análises concluídas mais semelhantes (similaridade de cosseno)
+CREATE OR REPLACE FUNCTION match_analyses(
+    query_embedding vector(768),
+    match_count INTEGER DEFAULT 3,
+    min_similarity FLOAT DEFAULT 0.75
+)
+RETURNS TABLE (
+    id INTEGER,
+    analysis_uid UUID,
+    nicho VARCHAR,
+    produto VARCHAR,
+    publico VARCHAR,
+    created_at TIMESTAMP WITH TIME ZONE,
+    avatar_data JSONB,
+    competition_data JSONB,
+    insights JSONB,
+    similarity FLOAT
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        a.id,
+        a.analysis_uid,
+        a.nicho,
+        a.produto,
+        a.publico,
+        a.created_at,
+        a.avatar_data,
+        a.competition_data,
+        a.comprehensive_analysis -> 'insights_exclusivos',
+        1 - (a.embedding <=> query_embedding) AS similarity
+    FROM analyses a
+    WHERE a.embedding IS NOT NULL
+      AND a.status = 'completed'
+      AND 1 - (a.embedding <=> query_embedding) >= min_similarity
+    ORDER BY a.embedding <=> query_embedding
+    LIMIT match_count;
+$$;
+
+COMMENT ON COLUMN analyses.embedding IS 'Embedding dos dados de entrada da análise, usado para recuperar análises semelhantes';
@@ -0,0 +1,51 @@
+-- analysis_segmentos: descontar o segmento antigo em DELETE e na troca de nicho
+-- O trigger anterior só incrementava: segmentos apagados ou renomeados ficavam
+-- no autocomplete de /api/segmentos e analyses_count divergia.
+
+CREATE OR REPLACE FUNCTION sync_analysis_segmentos()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Linha antiga: decrementar e remover o segmento que ficou sem análises
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.nicho IS NOT NULL AND OLD.nicho <> '' THEN
+            UPDATE analysis_segmentos
+                SET analyses_count = analyses_count - 1
+                WHERE nicho = OLD.nicho;
+            DELETE FROM analysis_segmentos
+                WHERE nicho = OLD.nicho AND analyses_count <= 0;
+        END IF;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.nicho IS NOT NULL AND NEW.nicho <> '' THEN
+            INSERT INTO analysis_segmentos (nicho, analyses_count, last_used_at)
+            VALUES (NEW.nicho, 1, NOW())
+            ON CONFLICT (nicho) DO UPDATE
+                SET analyses_count = analysis_segmentos.analyses_count + 1,
+                    last_used_at = NOW();
+        END IF;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS sync_analysis_segmentos_delete ON analyses;
+CREATE TRIGGER sync_analysis_segmentos_delete
+    AFTER DELETE ON analyses
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_analysis_segmentos();
+
+-- Corrigir as contagens acumuladas pelo trigger anterior
+UPDATE analysis_segmentos s
+SET analyses_count = c.total
+FROM (
+    SELECT nicho, COUNT(*) AS total
+    FROM analyses
+    WHERE nicho IS NOT NULL AND nicho <> ''
+    GROUP BY nicho
+) c
+WHERE s.nicho = c.nicho AND s.analyses_count <> c.total;
+
+DELETE FROM analysis_segmentos s
+WHERE NOT EXISTS (SELECT 1 FROM analyses a WHERE a.nicho = s.nicho);
@@ -0,0 +1,12 @@
+-- analysis_segmentos: trigger executado com os privilégios do dono da função
+-- A tabela tem RLS e só uma policy de leitura; inserts em analyses feitos por
+-- papéis sem bypass de RLS (anon/authenticated) falhavam no trigger ao
+-- gravar o segmento. SECURITY DEFINER executa a função como o dono da
+-- tabela, e search_path fixo evita que outro schema sequestre os nomes.
+
+ALTER FUNCTION sync_analysis_segmentos()
+    SECURITY DEFINER
+    SET search_path = public;
+
+-- A função só deve rodar pelo trigger
+REVOKE EXECUTE ON FUNCTION sync_analysis_segmentos() FROM PUBLIC;
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Os módulos da aplicação são importados como em src/ (from services.x import Y)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
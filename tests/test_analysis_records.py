@@ -0,0 +1,36 @@
+import string
+
+import pytest
+
+from services.analysis_records import (
+    KEYSET_COLUMNS, decode_keyset_cursor, encode_keyset_cursor, resolve_analysis_columns
+)
+
+
+def test_keyset_cursor_round_trip():
+    row = {'created_at': '2026-10-19T10:00:00.123456+00:00', 'id': 42, 'nicho': 'Fitness'}
+
+    cursor = encode_keyset_cursor(row)
+
+    # Seguro para query string sem escape
+    assert set(cursor) <= set(string.ascii_letters + string.digits + '-_=')
+    assert decode_keyset_cursor(cursor) == ('2026-10-19T10:00:00.123456+00:00', 42)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-base64!', 'WyJhIl0=', 'eyJhIjogMX0='])
+def test_invalid_keyset_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_keyset_cursor(cursor)
+
+
+def test_projection_always_includes_keyset_columns():
+    columns = resolve_analysis_columns('nicho,status')
+
+    assert columns[:2] == ['nicho', 'status']
+    assert all(column in columns for column in KEYSET_COLUMNS)
+    assert resolve_analysis_columns('full') is None
+
+
+def test_unknown_projection_column_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_analysis_columns('nicho,senha')
@@ -0,0 +1,132 @@
+import json
+
+import pytest
+
+from services.analysis_repository import (
+    PostgresAnalysisRepository,
+    SupabaseAnalysisRepository,
+    _id_filter,
+)
+
+
+class SelectBuilder:
+    """Builder de select do postgrest 0.10 com os métodos usados na busca"""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def _record(self, *call):
+        self.calls.append(call)
+        return self
+
+    def select(self, columns):
+        return self._record('select', columns)
+
+    def filter(self, column, operator, criteria):
+        return self._record('filter', column, operator, criteria)
+
+    def eq(self, column, value):
+        return self._record('eq', column, value)
+
+    def order(self, column, desc=False):
+        return self._record('order', column, desc)
+
+    def limit(self, size):
+        return self._record('limit', size)
+
+    def execute(self):
+        self.calls.append(('execute',))
+        return type('Response', (), {'data': [{'id': 1}]})()
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def table(self, name):
+        self.calls.append(('table', name))
+        return SelectBuilder(self.calls)
+
+
+def test_supabase_search_chains_all_filters():
+    client = FakeClient()
+    repository = SupabaseAnalysisRepository(client)
+
+    data = repository.search(
+        ['id', 'nicho'], 10, text_query='"curso online" -gratis',
+        containment={'comprehensive_analysis': {'escopo': {'nicho_especifico': 'Fitness'}},
+                     'action_plan': ['lançamento']},
+        segmento='Fitness'
+    )
+
+    assert data == [{'id': 1}]
+    assert client.calls == [
+        ('table', 'analyses'),
+        ('select', 'id,nicho'),
+        ('filter', 'search_vector', 'wfts(portuguese)', '"curso online" -gratis'),
+        ('filter', 'comprehensive_analysis', 'cs', '{"escopo": {"nicho_especifico": "Fitness"}}'),
+        ('filter', 'action_plan', 'cs', '["lançamento"]'),
+        ('eq', 'nicho', 'Fitness'),
+        ('order', 'created_at', True),
+        ('limit', 10),
+        ('execute',),
+    ]
+
+
+def test_supabase_search_query_string_with_postgrest():
+    postgrest = pytest.importorskip('postgrest')
+    client = postgrest.SyncPostgrestClient('http://localhost')
+
+    class Client:
+        def table(self, name):
+            return client.from_(name)
+
+    captured = {}
+
+    def execute(builder):
+        captured['params'] = str(builder.params)
+        return type('Response', (), {'data': []})()
+
+    original = postgrest.SyncSelectRequestBuilder.execute
+    postgrest.SyncSelectRequestBuilder.execute = execute
+    try:
+        SupabaseAnalysisRepository(Client()).search(
+            None, 5, text_query='fitness', containment={'action_plan': ['a']}, segmento='Saúde'
+        )
+    finally:
+        postgrest.SyncSelectRequestBuilder.execute = original
+
+    assert captured['params'] == (
+        'select=%2A&search_vector=wfts%28portuguese%29.fitness'
+        '&action_plan=cs.%5B%22a%22%5D&nicho=eq.Sa%C3%BAde&order=created_at.desc&limit=5'
+    )
+
+
+def test_postgres_search_builds_parameterized_sql():
+    repository = PostgresAnalysisRepository.__new__(PostgresAnalysisRepository)
+    executed = []
+    repository._run = lambda sql, params=(): executed.append((sql, params)) or []
+
+    repository.search(['id'], 20, text_query='curso', containment={'action_plan': {'fase': 1}}, segmento='Fitness')
+
+    sql, params = executed[0]
+    assert sql == (
+        'SELECT "id" FROM analyses WHERE '
+        "search_vector @@ websearch_to_tsquery('portuguese', $1) AND "
+        '"action_plan" @> $2::jsonb AND nicho = $3 '
+        'ORDER BY created_at DESC LIMIT $4'
+    )
+    assert params == ('curso', json.dumps({'fase': 1}), 'Fitness', 20)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('42', ('id', '42')),
+    ('0042', ('id', '42')),
+    ('0', None),
+    (str(2 ** 31), None),
+    ('٣', None),
+    ('3F2504E0-4F89-11D3-9A0C-0305E82C3301', ('analysis_uid', '3f2504e0-4f89-11d3-9a0c-0305e82c3301')),
+    ('abc', None),
+])
+def test_id_filter(value, expected):
+    assert _id_filter(value) == expected
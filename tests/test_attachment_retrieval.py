@@ -0,0 +1,46 @@
+from services.attachment_retrieval import AttachmentRetriever, build_query, tokenize
+
+PRICING = "Tabela de preços do curso de yoga online: plano mensal R$ 49 e plano anual R$ 399."
+AUDIENCE = "Público-alvo: mulheres de 30 a 45 anos que praticam yoga em casa."
+HISTORY = "A empresa foi fundada em 2012 e mudou de sede duas vezes desde então."
+
+
+def build(retriever, *paragraphs):
+    return retriever.build_index('\n\n'.join(paragraphs))
+
+
+def test_tokenize_drops_accents_and_stopwords():
+    assert tokenize('O Público da Análise') == ['publico', 'analise']
+
+
+def test_build_query_uses_form_fields():
+    assert build_query({'segmento': 'Yoga', 'produto': 'Curso online', 'publico': None}) == 'Yoga Curso online'
+
+
+def test_retrieve_returns_matching_chunks_in_document_order():
+    retriever = AttachmentRetriever(chunk_chars=100)
+    index = build(retriever, PRICING, HISTORY, AUDIENCE)
+    assert len(index.chunks) == 3
+
+    selected = retriever.retrieve([index], 'yoga publico', max_chars=1000)
+
+    assert [(attachment, position) for attachment, position, _ in selected] == [(0, 0), (0, 2)]
+    assert selected[1][2] > selected[0][2]
+
+
+def test_retrieve_respects_the_character_budget():
+    retriever = AttachmentRetriever(chunk_chars=100)
+    index = build(retriever, PRICING, HISTORY, AUDIENCE)
+
+    selected = retriever.retrieve([index], 'yoga publico', max_chars=len(AUDIENCE))
+
+    assert [(attachment, position) for attachment, position, _ in selected] == [(0, 2)]
+
+
+def test_retrieve_across_attachments_and_without_matches():
+    retriever = AttachmentRetriever(chunk_chars=100)
+    indexes = [build(retriever, HISTORY), build(retriever, PRICING)]
+
+    assert [item[:2] for item in retriever.retrieve(indexes, 'preços plano', 1000)] == [(1, 0)]
+    assert retriever.retrieve(indexes, 'blockchain', 1000) == []
+    assert retriever.retrieve(indexes, 'de a o', 1000) == []
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip('dotenv')
+
+import batch_cli
+
+
+def test_analyze_item_forces_new_analysis():
+    received = {}
+
+    def pipeline(item, persist=True):
+        received.update(item, persist=persist)
+        return item, {'metadata': {'status': 'completed'}}
+
+    record = batch_cli.analyze_item(pipeline, {'segmento': 'Fitness'}, 'abc')
+
+    assert received['force_new'] is True
+    assert received['persist'] is False
+    assert record['analysis_uid'] == batch_cli.item_analysis_uid({'segmento': 'Fitness'}, 'abc')
+
+
+def test_analyze_item_rejects_fallback_report():
+    def pipeline(item, persist=True):
+        return item, {'metadata': {'status': 'fallback_analysis'}}
+
+    with pytest.raises(RuntimeError):
+        batch_cli.analyze_item(pipeline, {'segmento': 'Fitness'}, 'abc')
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from db_pool import compute_pool_settings
+
+
+@pytest.fixture
+def pool_env(monkeypatch):
+    for name in ('DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'ANALYSIS_REPOSITORY_POOL_SIZE', 'DB_WORKER_CONCURRENCY'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    monkeypatch.setenv('GUNICORN_THREADS', '16')
+    monkeypatch.setenv('DB_CONNECTION_BUDGET', '60')
+    monkeypatch.setenv('DB_RESERVED_CONNECTIONS', '10')
+    monkeypatch.setenv('ANALYSIS_REPOSITORY', 'supabase')
+    monkeypatch.setenv('DATABASE_URL', 'postgresql://localhost/arqv30')
+    return monkeypatch
+
+
+def test_sqlalchemy_pool_uses_the_worker_slice(pool_env):
+    settings = compute_pool_settings()
+
+    assert settings['per_worker_connections'] == 12
+    assert settings['pool_size'] + settings['max_overflow'] == 12
+    assert settings['analysis_repository_pool_size'] == 0
+
+
+def test_postgres_repository_pool_comes_out_of_the_slice(pool_env):
+    pool_env.setenv('ANALYSIS_REPOSITORY', 'postgres')
+
+    settings = compute_pool_settings()
+
+    assert settings['analysis_repository_pool_size'] == 4
+    assert settings['pool_size'] + settings['max_overflow'] + settings['analysis_repository_pool_size'] == 12
+
+
+def test_repository_pool_override_is_clamped(pool_env):
+    pool_env.setenv('ANALYSIS_REPOSITORY', 'postgres')
+    pool_env.setenv('ANALYSIS_REPOSITORY_POOL_SIZE', '50')
+
+    settings = compute_pool_settings()
+
+    assert settings['analysis_repository_pool_size'] == 11
+    assert settings['pool_size'] + settings['max_overflow'] == 1
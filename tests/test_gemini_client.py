@@ -0,0 +1,63 @@
+import json
+import types
+
+import pytest
+
+from services import gemini_client as gemini_module
+from services.gemini_client import ANALYSIS_REQUIRED_KEYS, ANALYSIS_SCHEMA, GeminiClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+    monkeypatch.delenv('GEMINI_JSON_MODE', raising=False)
+    return GeminiClient()
+
+
+def fake_sdk(monkeypatch, *fields):
+    """SDK falso cujo GenerationConfig aceita os campos informados"""
+    namespace = {name: None for name in ('temperature', 'top_p', 'top_k', 'max_output_tokens', *fields)}
+    signature = ', '.join(f'{name}=None' for name in namespace)
+    exec(f'def GenerationConfig({signature}): pass', namespace)
+    sdk = types.SimpleNamespace(
+        configure=lambda api_key: None,
+        types=types.SimpleNamespace(GenerationConfig=namespace['GenerationConfig'])
+    )
+    monkeypatch.setattr(gemini_module, 'genai', sdk)
+
+
+def complete_analysis():
+    return {key: ([] if key == 'insights_exclusivos' else {}) for key in ANALYSIS_REQUIRED_KEYS}
+
+
+def test_json_schema_only_on_the_analysis_call(client, monkeypatch):
+    fake_sdk(monkeypatch, 'response_mime_type', 'response_schema')
+
+    config = client._analysis_generation_config()
+
+    assert config['response_mime_type'] == 'application/json'
+    assert config['response_schema'] is ANALYSIS_SCHEMA
+    assert 'response_mime_type' not in client.generation_config
+
+
+def test_old_sdk_keeps_free_text(client, monkeypatch):
+    fake_sdk(monkeypatch)
+
+    assert client._analysis_generation_config() is None
+    assert client.json_mode is False
+
+
+def test_response_with_all_sections_is_accepted(client):
+    analysis = client._process_gemini_response('```json\n' + json.dumps(complete_analysis()) + '\n```')
+
+    assert 'status' not in analysis
+
+
+def test_response_missing_sections_is_rejected(client):
+    analysis = complete_analysis()
+    del analysis['plano_acao_detalhado']
+
+    result = client._finalize_analysis(json.dumps(analysis), 'gemini-test', {}, None, None, None, None)
+
+    assert result['status'] == 'fallback_analysis'
+    assert result['metadata']['status'] == 'fallback_analysis'
@@ -0,0 +1,60 @@
+import io
+import os
+import time
+
+import pytest
+
+from services.pdf_artifact_cache import PDFArtifactCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    renders = []
+
+    def render(report):
+        renders.append(report)
+        return io.BytesIO(report['body'].encode('utf-8'))
+
+    artifacts = PDFArtifactCache(render, 'v1', directory=str(tmp_path), max_workers=1)
+    artifacts.renders = renders
+    return artifacts
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_render_reuses_existing_artifact(cache):
+    path = cache.render('a1', {'body': 'primeira'})
+    assert cache.render('a1', {'body': 'segunda'}) == path
+    assert read(path) == 'primeira'
+    assert len(cache.renders) == 1
+
+
+def test_reanalysis_replaces_artifact_and_etag(cache):
+    path = cache.render('a1', {'body': 'primeira'})
+    etag = cache.etag_for('a1', path)
+    os.utime(path, (time.time() - 10, time.time() - 10))
+
+    assert cache.invalidate('a1')
+    assert cache.get('a1') is None
+    cache.render_async('a1', {'body': 'segunda'}, replace=True).result()
+
+    assert read(cache.get('a1')) == 'segunda'
+    assert cache.etag_for('a1', path) != etag
+
+
+def test_cleanup_removes_expired_then_oldest(cache):
+    cache.ttl_seconds = 3600
+    cache.max_bytes = 10
+    now = time.time()
+    paths = {}
+    for index, (analysis_id, age) in enumerate([('old', 7200), ('a', 300), ('b', 200), ('c', 100)]):
+        paths[analysis_id] = cache.render(analysis_id, {'body': f'pdf-{index}'})
+        os.utime(paths[analysis_id], (now - age, now - age))
+
+    # 5 bytes por PDF: sai o expirado e depois o mais antigo até caber em 10
+    assert cache.cleanup() == 2
+    assert [analysis_id for analysis_id, path in paths.items() if os.path.exists(path)] == ['b', 'c']
+    assert cache.get_stats()['evicted'] == 2
@@ -0,0 +1,57 @@
+import threading
+
+from services.persistence_queue import PersistenceQueue
+
+
+def make_queue(write_fn, **options):
+    options.setdefault('batch_size', 50)
+    options.setdefault('flush_interval', 60)
+    return PersistenceQueue(None, write_fn=write_fn, max_retries=2, **options)
+
+
+def test_pending_writes_for_the_same_key_are_coalesced():
+    batches = []
+    queue = make_queue(batches.append)
+
+    queue.enqueue({'analysis_uid': 'a', 'status': 'processing', 'nicho': 'Fitness'})
+    queue.enqueue({'analysis_uid': 'b', 'status': 'processing'})
+    queue.enqueue({'analysis_uid': 'a', 'status': 'completed', 'comprehensive_analysis': {}})
+
+    assert queue.flush(timeout=5)
+    rows = [row for batch in batches for row in batch]
+    assert len(rows) == 2
+    assert {'analysis_uid': 'a', 'status': 'completed', 'nicho': 'Fitness', 'comprehensive_analysis': {}} in rows
+    assert queue.get_stats()['enqueued'] == 3
+    assert queue.get_stats()['written'] == 2
+
+
+def test_rows_are_grouped_by_column_set():
+    batches = []
+    queue = make_queue(batches.append)
+
+    queue.enqueue({'analysis_uid': 'a', 'status': 'processing'})
+    queue.enqueue({'analysis_uid': 'b', 'status': 'processing'})
+    queue.enqueue({'analysis_uid': 'c', 'status': 'completed', 'nicho': 'Saúde'})
+
+    assert queue.flush(timeout=5)
+    assert sorted(len(batch) for batch in batches) == [1, 2]
+    assert all(len({tuple(sorted(row)) for row in batch}) == 1 for batch in batches)
+
+
+def test_failed_batch_is_retried_then_dropped(monkeypatch):
+    monkeypatch.setattr('services.persistence_queue.time.sleep', lambda seconds: None)
+    calls = []
+    failed = threading.Event()
+
+    def write(rows):
+        calls.append(rows)
+        failed.set()
+        raise RuntimeError('banco fora do ar')
+
+    queue = make_queue(write)
+    queue.enqueue({'analysis_uid': 'a', 'status': 'processing'})
+
+    assert queue.flush(timeout=5)
+    assert failed.is_set()
+    assert len(calls) == 2
+    assert queue.get_stats()['dropped'] == 1
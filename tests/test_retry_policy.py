@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+from services.retry_policy import (
+    CircuitBreaker, RetryBudget, classify_error, extract_retry_after, is_retryable,
+    ERROR_AUTH, ERROR_INVALID, ERROR_QUOTA, ERROR_SAFETY, ERROR_SERVER, ERROR_TIMEOUT, ERROR_UNKNOWN
+)
+
+
+class APIError(Exception):
+    def __init__(self, message='', code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class BlockedPromptException(Exception):
+    pass
+
+
+@pytest.mark.parametrize('error, expected', [
+    (APIError('quota exceeded', code=429), ERROR_QUOTA),
+    (ResourceExhausted('limit'), ERROR_QUOTA),
+    (APIError('boom', code=503), ERROR_SERVER),
+    (APIError('API key not valid', code=400), ERROR_AUTH),
+    (APIError('forbidden', code=403), ERROR_AUTH),
+    (BlockedPromptException('blocked'), ERROR_SAFETY),
+    (APIError('response was blocked by safety', code=400), ERROR_SAFETY),
+    (DeadlineExceeded('slow'), ERROR_TIMEOUT),
+    (TimeoutError(), ERROR_TIMEOUT),
+    # Com código, a mensagem não muda a categoria
+    (APIError('max_output_tokens must be below 500', code=400), ERROR_INVALID),
+    (APIError('quota project not found', code=404), ERROR_INVALID),
+    # Sem código, a mensagem decide com limites de palavra
+    (Exception('Rate limit reached, retry later'), ERROR_QUOTA),
+    (Exception('request timed out'), ERROR_TIMEOUT),
+    (Exception('502 Bad Gateway'), ERROR_SERVER),
+    (Exception('token count 5000 exceeded'), ERROR_UNKNOWN),
+])
+def test_classify_error(error, expected):
+    assert classify_error(error) == expected
+
+
+def test_retryable_categories():
+    assert is_retryable(ERROR_QUOTA) and is_retryable(ERROR_SERVER) and is_retryable(ERROR_TIMEOUT)
+    assert not is_retryable(ERROR_SAFETY) and not is_retryable(ERROR_AUTH) and not is_retryable(ERROR_INVALID)
+
+
+def test_extract_retry_after():
+    assert extract_retry_after(Exception('Please retry in 12.5s')) == 12.5
+    assert extract_retry_after(Exception('retry_delay { seconds: 30 }')) == 30.0
+    assert extract_retry_after(Exception('no hint')) is None
+
+
+def test_retry_budget_runs_out_and_refills():
+    budget = RetryBudget(max_tokens=2, refill_per_second=0, success_refill=0.5)
+
+    assert budget.try_acquire() and budget.try_acquire()
+    assert not budget.try_acquire()
+
+    budget.record_success()
+    budget.record_success()
+    assert budget.try_acquire()
+    assert budget.get_stats()['available_tokens'] == 0
+
+
+def test_circuit_breaker_opens_on_outages_only():
+    breaker = CircuitBreaker('gemini', failure_threshold=2, reset_timeout=60)
+
+    breaker.record_failure(ERROR_INVALID)
+    breaker.record_failure(ERROR_SAFETY)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure(ERROR_SERVER)
+    breaker.record_failure(ERROR_TIMEOUT)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_circuit_breaker_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker('gemini', failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure(ERROR_QUOTA)
+    time.sleep(0.02)
+
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_failure(ERROR_SERVER)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.02)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,66 @@
+import importlib.util
+import os
+import sqlite3
+
+import pytest
+
+# Carregado pelo caminho: importar o pacote webagent carrega o qwen_agent
+_spec = importlib.util.spec_from_file_location(
+    'search_cache_under_test',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'webagent', 'tools', 'search_cache.py')
+)
+search_cache = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(search_cache)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.delenv('SEARCH_CACHE_ENABLED', raising=False)
+    return search_cache.SearchCache(path=str(tmp_path / 'cache.sqlite3'), ttls={'news': 60, 'general': 600})
+
+
+def test_query_type_follows_news_keywords():
+    assert search_cache.classify_query('Últimas notícias do mercado fitness') == 'news'
+    assert search_cache.classify_query('tamanho do mercado fitness no Brasil') == 'general'
+
+
+def test_hit_after_set_with_normalized_query(cache):
+    cache.set('serper', 'Mercado  Fitness', {'organic': [1]}, num=10, gl='br')
+
+    assert cache.get('serper', 'mercado fitness', num=10, gl='br') == {'organic': [1]}
+    assert cache.get('serper', 'mercado fitness', num=20, gl='br') is None
+    assert cache.get('duckduckgo', 'mercado fitness', num=10, gl='br') is None
+
+    stats = cache.get_stats()
+    assert stats['general'] == {'hits': 1, 'misses': 2}
+    assert stats['entries'] == 1
+
+
+def test_expired_entry_is_a_miss(cache, monkeypatch):
+    now = search_cache.time.time()
+    cache.set('serper', 'notícias hoje', {'organic': []})
+
+    monkeypatch.setattr(search_cache.time, 'time', lambda: now + 61)
+
+    assert cache.get('serper', 'notícias hoje') is None
+
+
+def test_corrupted_entry_is_dropped(cache):
+    cache.set('serper', 'mercado fitness', {'organic': []})
+    connection = sqlite3.connect(cache.path)
+    connection.execute("UPDATE search_cache SET response = '{invalid'")
+    connection.commit()
+    connection.close()
+
+    assert cache.get('serper', 'mercado fitness') is None
+    assert cache.get_stats()['errors'] == 1
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_prune_keeps_newest_entries(tmp_path):
+    cache = search_cache.SearchCache(path=str(tmp_path / 'cache.sqlite3'), max_entries=3)
+    for index in range(100):
+        cache.set('serper', f'consulta {index}', {'index': index})
+
+    assert cache.get_stats()['entries'] == 3
+    assert cache.get('serper', 'consulta 99') == {'index': 99}
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+flask = pytest.importorskip('flask')
+
+
+class FakeRepository:
+    backend = 'fake'
+
+    def __init__(self):
+        self.calls = []
+
+    def search(self, columns, limit, text_query='', containment=None, segmento=None):
+        self.calls.append({'columns': columns, 'limit': limit, 'text_query': text_query,
+                           'containment': containment, 'segmento': segmento})
+        return [{'id': 1, 'nicho': 'Fitness', 'created_at': '2026-10-19T10:00:00+00:00'}]
+
+
+@pytest.fixture
+def analysis_routes(monkeypatch, tmp_path):
+    for name in ('SUPABASE_URL', 'SUPABASE_SERVICE_ROLE_KEY', 'GEMINI_API_KEY', 'DATABASE_URL'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('PDF_ARTIFACT_DIR', str(tmp_path / 'pdf'))
+
+    from routes import analysis
+    monkeypatch.setattr(analysis, 'analysis_repository', FakeRepository())
+    return analysis
+
+
+@pytest.fixture
+def client(analysis_routes):
+    app = flask.Flask(__name__)
+    app.register_blueprint(analysis_routes.analysis_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def test_search_passes_filters_to_the_repository(client, analysis_routes):
+    contains = json.dumps({'escopo': {'nicho_especifico': 'Fitness'}})
+
+    response = client.get('/api/analyses/search', query_string={
+        'q': '"curso online" -gratis', 'contains': contains, 'segmento': 'Fitness',
+        'fields': 'nicho', 'limit': 500
+    })
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == 1
+    assert body['filters'] == ['comprehensive_analysis']
+    assert response.headers['ETag']
+
+    call = analysis_routes.analysis_repository.calls[0]
+    assert call == {
+        'columns': ['nicho', 'created_at', 'id'],
+        'limit': 100,
+        'text_query': '"curso online" -gratis',
+        'containment': {'comprehensive_analysis': {'escopo': {'nicho_especifico': 'Fitness'}}},
+        'segmento': 'Fitness'
+    }
+
+
+@pytest.mark.parametrize('query_string, message', [
+    ({}, "Informe 'q'"),
+    ({'contains': '{invalid'}, 'JSON inválido'),
+    ({'contains': '"texto"'}, 'objeto ou lista'),
+    ({'q': 'yoga', 'fields': 'senha'}, 'Campos desconhecidos'),
+])
+def test_search_rejects_invalid_parameters(client, analysis_routes, query_string, message):
+    response = client.get('/api/analyses/search', query_string=query_string)
+
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+    assert analysis_routes.analysis_repository.calls == []
+
+
+def test_search_without_database(client, analysis_routes, monkeypatch):
+    monkeypatch.setattr(analysis_routes, 'analysis_repository', None)
+
+    assert client.get('/api/analyses/search?q=yoga').status_code == 500
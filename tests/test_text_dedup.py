@@ -0,0 +1,44 @@
+import pytest
+
+from services.text_dedup import NearDuplicateFilter, dedup_stats, simhash
+
+ARTICLE = ("O mercado brasileiro de cursos online de fitness cresceu 35% em 2025, "
+           "puxado por programas de treino em casa e assinaturas mensais de baixo custo.")
+EDITED = ("O mercado brasileiro de cursos online de fitness cresceu 35% em 2025, "
+          "puxado por programas de treino em casa e assinaturas mensais baratas.")
+OTHER = ("Consultorias de nutrição esportiva passaram a vender planos personalizados "
+         "por aplicativo, com acompanhamento semanal e integração a relógios inteligentes.")
+
+
+@pytest.fixture(autouse=True)
+def dedup_enabled(monkeypatch):
+    monkeypatch.setenv('TEXT_DEDUP_ENABLED', 'true')
+
+
+def test_simhash_ignores_case_and_accents():
+    assert simhash('Nutrição Esportiva') == simhash('nutricao esportiva')
+
+
+def test_filter_keeps_first_occurrence_of_near_duplicates():
+    dedup = NearDuplicateFilter('test', max_distance=10, min_tokens=8)
+
+    assert dedup.filter([ARTICLE, EDITED, OTHER, ARTICLE]) == [ARTICLE, OTHER]
+    assert dedup.dropped == 2
+    assert dedup.tokens_saved == (len(EDITED) + len(ARTICLE)) // 4
+
+
+def test_short_texts_are_never_dropped():
+    dedup = NearDuplicateFilter('test', min_tokens=8)
+
+    assert dedup.filter(['Fonte: Google', 'Fonte: Google']) == ['Fonte: Google', 'Fonte: Google']
+    assert dedup.checked == 0
+
+
+def test_dedup_paragraphs_and_report():
+    dedup = NearDuplicateFilter('test-report', min_tokens=8)
+
+    text = dedup.dedup_paragraphs(f"{ARTICLE}\n\n{OTHER}\n\n{EDITED}")
+
+    assert text == f"{ARTICLE}\n\n{OTHER}"
+    assert dedup.report() == {'checked': 3, 'dropped': 1, 'tokens_saved': len(EDITED) // 4}
+    assert dedup_stats.get_stats()['test-report']['dropped'] == 1
@@ -6,12 +6,15 @@ used by the WebSailor agent.
 """
 
 from .search_tool import GoogleSearchTool, AlternativeSearchTool, create_search_tool
+from .search_cache import SearchCache, search_cache
 from .visit_tool import WebVisitTool, AlternativeWebVisitTool, create_visit_tool
 
 __all__ = [
     'GoogleSearchTool',
     'AlternativeSearchTool', 
     'create_search_tool',
+    'SearchCache',
+    'search_cache',
     'WebVisitTool',
     'AlternativeWebVisitTool',
     'create_visit_tool'
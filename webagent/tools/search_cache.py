@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+# Queries about recent events go stale quickly; everything else is cached longer
+NEWS_PATTERN = re.compile(
+    r'\b(news|noticias?|notícias?|hoje|ontem|today|latest|últimas?|ultimas?|agora|recentes?)\b'
+)
+
+DEFAULT_TTLS = {
+    'news': 3600,
+    'general': 86400
+}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share an entry"""
+    return ' '.join(query.lower().split())
+
+
+def classify_query(query: str) -> str:
+    return 'news' if NEWS_PATTERN.search(normalize_query(query)) else 'general'
+
+
+class SearchCache:
+    """
+    SQLite-backed TTL cache for raw search API responses
+
+    The database runs in WAL mode, so every gunicorn worker (and the
+    WebSailor agent threads inside them) shares the same entries: a query
+    costs one API call per TTL window instead of one per worker. Keys hash
+    the provider, the normalized query and the request parameters (num,
+    gl, hl). The TTL is chosen per query type when the entry is written
+    (SEARCH_CACHE_TTL_NEWS, SEARCH_CACHE_TTL_GENERAL). Any SQLite error is
+    treated as a miss, and an entry that no longer decodes is deleted, so a
+    broken cache file never breaks a search.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttls: Optional[Dict[str, int]] = None,
+                 max_entries: Optional[int] = None):
+        self.path = path or os.getenv(
+            'SEARCH_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'arqv30_search_cache.sqlite3')
+        )
+        self.ttls = ttls or {
+            query_type: int(os.getenv(f'SEARCH_CACHE_TTL_{query_type.upper()}', default))
+            for query_type, default in DEFAULT_TTLS.items()
+        }
+        self.max_entries = max_entries or int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 20000))
+        self.enabled = os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+
+        # One connection per thread and per process (workers after the fork)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized_pid: Optional[int] = None
+        self._writes = 0
+        self._stats = {query_type: {'hits': 0, 'misses': 0} for query_type in self.ttls}
+        self._stats['errors'] = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return connection
+
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        with self._lock:
+            if self._initialized_pid != os.getpid():
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS search_cache ('
+                    'key TEXT PRIMARY KEY, query_type TEXT NOT NULL, response TEXT NOT NULL, '
+                    'created_at REAL NOT NULL, expires_at REAL NOT NULL)'
+                )
+                connection.execute('CREATE INDEX IF NOT EXISTS search_cache_expires ON search_cache (expires_at)')
+                self._initialized_pid = os.getpid()
+
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def make_key(provider: str, query: str, **params) -> str:
+        raw = json.dumps([provider, normalize_query(query), params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _record(self, query_type: str, outcome: str):
+        with self._lock:
+            self._stats.setdefault(query_type, {'hits': 0, 'misses': 0})[outcome] += 1
+
+    def _record_error(self):
+        with self._lock:
+            self._stats['errors'] += 1
+
+    def get(self, provider: str, query: str, **params) -> Optional[Any]:
+        """Cached response for the query, or None when missing or expired"""
+        if not self.enabled:
+            return None
+
+        query_type = classify_query(query)
+        key = self.make_key(provider, query, **params)
+        try:
+            connection = self._connect()
+            row = connection.execute(
+                'SELECT response FROM search_cache WHERE key = ? AND expires_at > ?',
+                (key, time.time())
+            ).fetchone()
+            response = json.loads(row[0]) if row else None
+        except ValueError:
+            # Corrupted entry: drop it so the next call refreshes it
+            self._record_error()
+            self._record(query_type, 'misses')
+            try:
+                connection.execute('DELETE FROM search_cache WHERE key = ?', (key,))
+            except sqlite3.Error:
+                pass
+            return None
+        except sqlite3.Error:
+            self._record_error()
+            return None
+
+        self._record(query_type, 'hits' if row else 'misses')
+        return response
+
+    def set(self, provider: str, query: str, response: Any, **params):
+        if not self.enabled:
+            return
+
+        query_type = classify_query(query)
+        now = time.time()
+        try:
+            connection = self._connect()
+            connection.execute(
+                'INSERT OR REPLACE INTO search_cache (key, query_type, response, created_at, expires_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (self.make_key(provider, query, **params), query_type,
+                 json.dumps(response, ensure_ascii=False), now, now + self.ttls.get(query_type, DEFAULT_TTLS['general']))
+            )
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % 100 == 0
+            if prune:
+                self._prune(connection, now)
+        except sqlite3.Error:
+            self._record_error()
+
+    def _prune(self, connection: sqlite3.Connection, now: float):
+        """Drop expired entries and, past max_entries, the oldest ones"""
+        connection.execute('DELETE FROM search_cache WHERE expires_at <= ?', (now,))
+        connection.execute(
+            'DELETE FROM search_cache WHERE key IN ('
+            'SELECT key FROM search_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = {key: dict(value) if isinstance(value, dict) else value for key, value in self._stats.items()}
+
+        hits = sum(value['hits'] for value in stats.values() if isinstance(value, dict))
+        misses = sum(value['misses'] for value in stats.values() if isinstance(value, dict))
+        stats['hit_rate'] = round(hits / (hits + misses), 3) if hits + misses else None
+
+        try:
+            stats['entries'] = self._connect().execute(
+                'SELECT COUNT(*) FROM search_cache WHERE expires_at > ?', (time.time(),)
+            ).fetchone()[0]
+        except sqlite3.Error:
+            stats['entries'] = None
+
+        stats['ttls'] = dict(self.ttls)
+        stats['path'] = self.path
+        stats['enabled'] = self.enabled
+        return stats
+
+
+# Shared by every search tool instance in the process
+search_cache = SearchCache()
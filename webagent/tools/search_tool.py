@@ -6,6 +6,15 @@ import requests
 from typing import Dict, List, Optional
 from qwen_agent.tools.base import BaseTool, register_tool
 
+from .search_cache import search_cache
+
+# Near-duplicate filtering lives in the main app (src/services); standalone
+# webagent runs simply skip it
+try:
+    from services.text_dedup import NearDuplicateFilter
+except ImportError:
+    NearDuplicateFilter = None
+
 # Configurar encoding UTF-8 no Windows
 if sys.platform.startswith('win'):
     try:
@@ -75,11 +84,6 @@ class GoogleSearchTool(BaseTool):
             return "Error: Search query is required"
         
         try:
-            headers = {
-                'X-API-KEY': self.api_key,
-                'Content-Type': 'application/json'
-            }
-            
             payload = {
                 'q': query,
                 'num': num_results,
@@ -87,6 +91,17 @@ class GoogleSearchTool(BaseTool):
                 'hl': 'pt'   # Portuguese
             }
             
+            # Each Serper request is billed: reuse the raw response within its TTL
+            cache_params = {'num': num_results, 'gl': payload['gl'], 'hl': payload['hl']}
+            data = search_cache.get('serper', query, **cache_params)
+            if data is not None:
+                return self._format_search_results(data, query)
+            
+            headers = {
+                'X-API-KEY': self.api_key,
+                'Content-Type': 'application/json'
+            }
+            
             response = requests.post(
                 self.base_url,
                 headers=headers,
@@ -96,6 +111,7 @@ class GoogleSearchTool(BaseTool):
             response.raise_for_status()
             
             data = response.json()
+            search_cache.set('serper', query, data, **cache_params)
             return self._format_search_results(data, query)
             
         except requests.exceptions.RequestException as e:
@@ -134,10 +150,16 @@ class GoogleSearchTool(BaseTool):
                     results.append(f"{key}: {value}")
             results.append("")
         
+        # Syndicated copies of the same story are dropped by snippet similarity
+        dedup = NearDuplicateFilter(source='google_search') if NearDuplicateFilter else None
+
         # Organic results
         if 'organic' in data:
             results.append("[SEARCH RESULTS]:")
-            for i, result in enumerate(data['organic'][:10], 1):
+            organic = data['organic'][:10]
+            if dedup:
+                organic = [r for r in organic if not dedup.is_duplicate(f"{r.get('title', '')} {r.get('snippet', '')}")]
+            for i, result in enumerate(organic, 1):
                 results.append(f"\n{i}. {result.get('title', 'No title')}")
                 results.append(f"   URL: {result.get('link', 'No URL')}")
                 if 'snippet' in result:
@@ -154,13 +176,20 @@ class GoogleSearchTool(BaseTool):
         # News results (if available)
         if 'news' in data:
             results.append("\n[NEWS RESULTS]:")
-            for news in data['news'][:3]:
+            news_items = data['news'][:3]
+            if dedup:
+                news_items = [n for n in news_items if not dedup.is_duplicate(f"{n.get('title', '')} {n.get('snippet', '')}")]
+            for news in news_items:
                 results.append(f"- {news.get('title', 'No title')}")
                 results.append(f"  Source: {news.get('source', 'Unknown')}")
                 results.append(f"  Date: {news.get('date', 'Unknown')}")
                 results.append(f"  URL: {news.get('link', 'No URL')}")
                 results.append("")
         
+        if dedup:
+            # Savings go to the log and /status, not into the agent's context
+            dedup.report()
+        
         return "\n".join(results)
 
 class AlternativeSearchTool(BaseTool):
@@ -195,6 +224,10 @@ class AlternativeSearchTool(BaseTool):
             return "Error: Search query is required"
         
         try:
+            data = search_cache.get('duckduckgo', query)
+            if data is not None:
+                return self._format_ddg_results(data, query)
+            
             # Use DuckDuckGo Instant Answer API
             url = "https://api.duckduckgo.com/"
             params_ddg = {
@@ -208,6 +241,7 @@ class AlternativeSearchTool(BaseTool):
             response.raise_for_status()
             
             data = response.json()
+            search_cache.set('duckduckgo', query, data)
             return self._format_ddg_results(data, query)
             
         except Exception as e:
@@ -4,8 +4,11 @@ import sys
 import json
 from typing import Dict, List, Optional, Union, Iterator
 import copy
-from openai import OpenAI
-import tiktoken
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 # Configurar encoding UTF-8 no Windows
 if sys.platform.startswith('win'):
@@ -33,6 +36,12 @@ MAX_TOKEN_LENGTH = int(os.getenv("MAX_LENGTH", 31 * 1024 - 500))
 
 safe_print(f"Running with MAX_LLM_CALL_PER_RUN = {MAX_LLM_CALL_PER_RUN}")
 
+@lru_cache(maxsize=1)
+def _get_encoding():
+    # tiktoken is imported and its encoding loaded on first use only
+    import tiktoken
+    return tiktoken.get_encoding("cl100k_base")
+
 class Message:
     def __init__(self, role: str, content: str = None, function_call: Dict = None, name: str = None):
         self.role = role
@@ -46,7 +55,7 @@ class Message:
 class MultiTurnReactAgent:
     def __init__(self,
                  function_list: Optional[List[Union[str, Dict]]] = None,
-                 llm: Optional[OpenAI] = None,
+                 llm: Optional['OpenAI'] = None,
                  system_message: Optional[str] = None,
                  name: Optional[str] = None,
                  description: Optional[str] = None,
@@ -68,8 +77,7 @@ class MultiTurnReactAgent:
     def _need_truncate_messages(self, messages: List[Message]) -> bool:
         # Simplified truncation check
         text = " ".join([msg.content for msg in messages if msg.content])
-        encoding = tiktoken.get_encoding("cl100k_base")
-        tokens = encoding.encode(text)
+        tokens = _get_encoding().encode(text)
         return len(tokens) > MAX_TOKEN_LENGTH
 
     def _truncate_messages(self, messages: List[Message]) -> List[Message]:
@@ -139,6 +147,8 @@ class WebSailorAgent:
     
     def _initialize_llm(self):
         """Initialize the language model"""
+        from openai import OpenAI
+        
         if self.model_path and os.path.exists(self.model_path):
             # Local model
             safe_print("Warning: Local model path provided, but qwen_agent is not used. Using OpenAI client.")